@@ -4,11 +4,39 @@ Vulnerable Web Application - Path Traversal / File Disclosure
 This application allows reading files via path traversal vulnerability
 """
 
-from flask import Flask, render_template_string, jsonify, request, send_file
+from flask import Flask, jsonify, request, send_file
+from functools import lru_cache
 import os
+import stat
+import sys
+from pathlib import Path
+
+# Shared challenge modules ship next to app.py in the ConfigMap; when running
+# from a checkout they are picked up from challenges/common
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent / 'common'))
+from ctf_json import FastJSONProvider
+from ctf_metrics import Metrics
+from ctf_probes import Probes
+from ctf_ratelimit import RateLimiter
+from ctf_render import StaticPage
 
 app = Flask(__name__)
 
+# jsonify() through orjson when installed (stdlib json otherwise)
+app.json = FastJSONProvider(app)
+
+# Prometheus metrics at /metrics; created first so throttled requests are timed too
+metrics = Metrics(app, challenge='file-disclosure')
+
+# Per-client token buckets and concurrency caps (see ctf_ratelimit.py)
+limiter = RateLimiter(app)
+
+# /livez and /readyz for the kubelet (dependency checks run in the background)
+probes = Probes(app)
+
+# Use /tmp/data instead of /app/data since /app is read-only (ConfigMap mount)
+DATA_DIR = '/tmp/data'
+
 # HTML template for the web interface
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -44,7 +72,7 @@ HTML_TEMPLATE = """
             <h3>API Endpoints</h3>
             <ul>
                 <li><code>/api/read?file=path/to/file</code> - Read a file</li>
-                <li><code>/api/list?dir=path</code> - List directory contents</li>
+                <li><code>/api/list?dir=path</code> - List directory contents (add <code>&amp;page=1&amp;per_page=100</code> to paginate)</li>
             </ul>
         </div>
         
@@ -56,10 +84,13 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# Rendered once: the page is static
+index_page = StaticPage(app, HTML_TEMPLATE)
+
 @app.route('/')
 def index():
     """Main page"""
-    return render_template_string(HTML_TEMPLATE)
+    return index_page.response()
 
 @app.route('/api/read')
 def read_file():
@@ -73,8 +104,7 @@ def read_file():
     # The application only checks if the path starts with "public/"
     # but doesn't prevent path traversal sequences like "../"
     
-    # Use /tmp/data instead of /app/data since /app is read-only (ConfigMap mount)
-    base_dir = '/tmp/data'
+    base_dir = DATA_DIR
     
     # Naive protection that can be bypassed
     if not file_path.startswith('public/'):
@@ -114,13 +144,57 @@ def read_file():
     except Exception as e:
         return jsonify({'error': f'Error reading file: {str(e)}'}), 500
 
+# Pagination for the directory listing API; without page or per_page the
+# whole directory is returned
+LIST_DEFAULT_PAGE_SIZE = 100
+LIST_MAX_PAGE_SIZE = 1000
+
+@lru_cache(maxsize=64)
+def scan_directory(path, mtime_ns):
+    """Scan a directory once per (path, mtime) and return sorted entry metadata.
+    
+    The directory mtime changes whenever an entry is added, removed or renamed,
+    so it is part of the cache key and stale listings fall out on their own.
+    In-place edits to a file don't touch the directory mtime, so the size/mtime
+    reported for an entry may lag until the directory itself changes.
+    """
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                # lstat-style: don't follow symlinks out of the listed directory
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                # Entry vanished between readdir and stat
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                entry_type = 'directory'
+            elif stat.S_ISLNK(st.st_mode):
+                entry_type = 'symlink'
+            elif stat.S_ISREG(st.st_mode):
+                entry_type = 'file'
+            else:
+                entry_type = 'other'
+            entries.append((entry.name, entry_type, st.st_size, st.st_mtime))
+    entries.sort()
+    return tuple(entries)
+
 @app.route('/api/list')
 def list_directory():
-    """List directory endpoint"""
+    """List directory endpoint (optionally paginated, cached per directory mtime)"""
     dir_path = request.args.get('dir', 'public')
     
-    # Use /tmp/data instead of /app/data since /app is read-only (ConfigMap mount)
-    base_dir = '/tmp/data'
+    paginated = 'page' in request.args or 'per_page' in request.args
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', LIST_DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+    if page < 1 or per_page < 1:
+        return jsonify({'error': 'page and per_page must be positive'}), 400
+    per_page = min(per_page, LIST_MAX_PAGE_SIZE)
+    
+    base_dir = DATA_DIR
     full_path = os.path.join(base_dir, dir_path)
     normalized_path = os.path.normpath(full_path)
     
@@ -128,23 +202,51 @@ def list_directory():
         return jsonify({'error': 'Access denied'}), 403
     
     try:
-        files = os.listdir(normalized_path)
-        return jsonify({
-            'directory': dir_path,
-            'files': files
-        })
+        # A single stat() per request; the full scan only happens on a cache miss
+        dir_stat = os.stat(normalized_path)
+        if not stat.S_ISDIR(dir_stat.st_mode):
+            return jsonify({'error': 'Not a directory'}), 400
+        entries = scan_directory(normalized_path, dir_stat.st_mtime_ns)
+    except FileNotFoundError:
+        return jsonify({'error': 'Directory not found'}), 404
     except Exception as e:
         return jsonify({'error': f'Error listing directory: {str(e)}'}), 500
+    
+    if paginated:
+        start = (page - 1) * per_page
+        page_entries = entries[start:start + per_page]
+    else:
+        page_entries = entries
+    
+    result = {
+        'directory': dir_path,
+        'files': [name for name, _, _, _ in page_entries],
+        'entries': [
+            {'name': name, 'type': entry_type, 'size': size, 'mtime': mtime}
+            for name, entry_type, size, mtime in page_entries
+        ],
+        'total': len(entries),
+    }
+    if paginated:
+        result.update(page=page, per_page=per_page, has_more=start + per_page < len(entries))
+    return jsonify(result)
 
 @app.route('/health')
+@limiter.exempt
 def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy'}), 200
 
+@probes.check('data_dir')
+def data_dir_ready():
+    """The public files and the flag are in place (created at startup)"""
+    for path in (f'{DATA_DIR}/public', f'{DATA_DIR}/private/flag.txt'):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'{path} is missing')
+
 if __name__ == '__main__':
     # Create data directory structure
-    # Use /tmp/data instead of /app/data since /app is mounted read-only from ConfigMap
-    data_dir = '/tmp/data'
+    data_dir = DATA_DIR
     os.makedirs(f'{data_dir}/public', exist_ok=True)
     os.makedirs(f'{data_dir}/private', exist_ok=True)
     
@@ -160,5 +262,6 @@ if __name__ == '__main__':
     with open(f'{data_dir}/private/flag.txt', 'w') as f:
         f.write(flag)
     
+    probes.start()
     app.run(host='0.0.0.0', port=8080, debug=True)
 
@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# app.py is imported by bare name, as in /app
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app as file_disclosure
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty DATA_DIR with a public/ directory and a cold listing cache"""
+    (tmp_path / 'public').mkdir()
+    monkeypatch.setattr(file_disclosure, 'DATA_DIR', str(tmp_path))
+    file_disclosure.scan_directory.cache_clear()
+    return tmp_path
+
+
+@pytest.fixture
+def client():
+    return file_disclosure.app.test_client()
@@ -0,0 +1,78 @@
+"""/api/list pagination bounds and the per-mtime listing cache"""
+
+import os
+
+import pytest
+
+import app as file_disclosure
+
+
+def add_files(directory, count):
+    for i in range(count):
+        (directory / f'file{i:04d}.txt').write_text('x')
+
+
+def bump_mtime(directory):
+    """Move the directory mtime forward, whatever the filesystem's timestamp granularity"""
+    mtime_ns = directory.stat().st_mtime_ns + 1_000_000_000
+    os.utime(directory, ns=(mtime_ns, mtime_ns))
+
+
+def test_unpaginated_by_default(client, data_dir):
+    add_files(data_dir / 'public', 150)
+    body = client.get('/api/list').get_json()
+    assert len(body['files']) == 150
+    assert body['total'] == 150
+    assert 'page' not in body and 'has_more' not in body
+
+
+def test_pages(client, data_dir):
+    add_files(data_dir / 'public', 25)
+    body = client.get('/api/list?page=3&per_page=10').get_json()
+    assert body['files'] == [f'file{i:04d}.txt' for i in range(20, 25)]
+    assert (body['page'], body['per_page'], body['total'], body['has_more']) == (3, 10, 25, False)
+    body = client.get('/api/list?page=1').get_json()
+    assert body['per_page'] == file_disclosure.LIST_DEFAULT_PAGE_SIZE
+    assert body['has_more'] is False
+
+
+@pytest.mark.parametrize('query', ['page=0', 'page=-1', 'per_page=0', 'per_page=-5'])
+def test_rejects_non_positive(client, data_dir, query):
+    response = client.get(f'/api/list?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'page and per_page must be positive'
+
+
+@pytest.mark.parametrize('query', ['page=abc', 'per_page=1.5', 'page='])
+def test_rejects_non_integer(client, data_dir, query):
+    response = client.get(f'/api/list?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'page and per_page must be integers'
+
+
+def test_caps_page_size(client, data_dir):
+    add_files(data_dir / 'public', file_disclosure.LIST_MAX_PAGE_SIZE + 5)
+    body = client.get('/api/list?per_page=5000').get_json()
+    assert body['per_page'] == file_disclosure.LIST_MAX_PAGE_SIZE
+    assert len(body['files']) == file_disclosure.LIST_MAX_PAGE_SIZE
+    assert body['has_more'] is True
+
+
+def test_cache_follows_directory_changes(client, data_dir):
+    public = data_dir / 'public'
+    add_files(public, 2)
+    assert client.get('/api/list').get_json()['total'] == 2
+    assert client.get('/api/list').get_json()['total'] == 2
+    info = file_disclosure.scan_directory.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+    (public / 'new.txt').write_text('x')
+    bump_mtime(public)
+    body = client.get('/api/list').get_json()
+    assert body['total'] == 3
+    assert 'new.txt' in body['files']
+    assert file_disclosure.scan_directory.cache_info().misses == 2
+
+    (public / 'file0000.txt').unlink()
+    bump_mtime(public)
+    assert 'file0000.txt' not in client.get('/api/list').get_json()['files']
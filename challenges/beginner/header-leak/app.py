@@ -4,11 +4,36 @@ Vulnerable Web Application - Header Information Disclosure
 This application leaks sensitive information through HTTP headers
 """
 
-from flask import Flask, render_template_string, jsonify, Response
+from flask import Flask, jsonify, Response, request
+import itertools
 import os
+import time
+import sys
+from pathlib import Path
+
+# Shared challenge modules ship next to app.py in the ConfigMap; when running
+# from a checkout they are picked up from challenges/common
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent / 'common'))
+from ctf_json import FastJSONProvider
+from ctf_metrics import Metrics
+from ctf_probes import Probes
+from ctf_ratelimit import RateLimiter
+from ctf_render import StaticPage
 
 app = Flask(__name__)
 
+# jsonify() through orjson when installed (stdlib json otherwise)
+app.json = FastJSONProvider(app)
+
+# Prometheus metrics at /metrics; created first so throttled requests are timed too
+metrics = Metrics(app, challenge='header-leak')
+
+# Per-client token buckets and concurrency caps (see ctf_ratelimit.py)
+limiter = RateLimiter(app)
+
+# /livez and /readyz for the kubelet (dependency checks run in the background)
+probes = Probes(app)
+
 # HTML template for the web interface
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -51,40 +76,144 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# Leaked headers and where their values come from: (header, variable, default)
+LEAK_HEADER_SOURCES = (
+    ('X-Server-Version', 'APP_VERSION', '1.0.0'),
+    ('X-Environment', 'ENVIRONMENT', 'production'),
+    ('X-Internal-Token', 'INTERNAL_TOKEN', 'dev-token-12345'),
+    ('X-Database-Path', 'DATABASE_PATH', '/var/lib/db/data.sqlite'),
+    ('X-Flag', 'FLAG', 'FLAG{not_set}'),
+    ('X-Pod-Name', 'POD_NAME', 'unknown'),
+)
+
+# Optional ConfigMap volume (one file per key) that overrides the environment.
+# Kubelet swaps the files atomically on ConfigMap edits, which bumps the
+# directory mtime, so the headers can be reloaded without restarting the pod.
+HEADERS_CONFIG_DIR = os.getenv('HEADERS_CONFIG_DIR', '')
+HEADERS_RELOAD_INTERVAL = float(os.getenv('HEADERS_RELOAD_INTERVAL', '5'))
+
+# Endpoints that don't get the debug headers (see skip_debug_headers);
+# the kubelet probes (ctf_probes), /metrics (ctf_metrics) and /ratelimit
+# (ctf_ratelimit) are registered by the shared modules, so they are listed by name
+SKIP_HEADER_ENDPOINTS = {'livez', 'readyz', 'metrics', 'ratelimit_stats'}
+
+def load_config_dir(path):
+    """Read a ConfigMap volume into a dict of key -> value"""
+    values = {}
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                # Skip kubelet's ..data / ..timestamp bookkeeping entries
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                with open(entry.path, 'r') as f:
+                    values[entry.name] = f.read().strip()
+    except OSError as e:
+        print(f"Warning: could not read header config from {path}: {e}")
+    return values
+
+def config_dir_mtime():
+    """mtime of the config directory, or None if it isn't configured/readable"""
+    if not HEADERS_CONFIG_DIR:
+        return None
+    try:
+        return os.stat(HEADERS_CONFIG_DIR).st_mtime_ns
+    except OSError:
+        return None
+
+def build_header_block():
+    """Resolve every static header once into an immutable tuple of (name, value),
+    paired with the version it reports"""
+    overrides = load_config_dir(HEADERS_CONFIG_DIR) if HEADERS_CONFIG_DIR else {}
+    block = [
+        ('X-Powered-By', 'Flask/3.0.0'),
+        # CRITICAL: Exposing sensitive debug information!
+        ('X-Debug-Mode', 'enabled'),
+    ]
+    for header, variable, default in LEAK_HEADER_SOURCES:
+        block.append((header, overrides.get(variable, os.getenv(variable, default))))
+    return tuple(block), dict(block)['X-Server-Version']
+
+# Resolved at startup; rebinding the (block, version) pair on reload is
+# atomic for readers
+header_block = build_header_block()
+header_config_mtime = config_dir_mtime()
+next_reload_check = time.monotonic() + HEADERS_RELOAD_INTERVAL
+
+def maybe_reload_headers(now):
+    """Rebuild the header block if the config directory changed"""
+    global header_block, header_config_mtime, next_reload_check
+    next_reload_check = now + HEADERS_RELOAD_INTERVAL
+    mtime = config_dir_mtime()
+    if mtime != header_config_mtime:
+        header_config_mtime = mtime
+        header_block = build_header_block()
+
+def current_headers():
+    """(block, version), reloaded first if the config directory may have changed"""
+    if HEADERS_CONFIG_DIR:
+        now = time.monotonic()
+        if now >= next_reload_check:
+            maybe_reload_headers(now)
+    return header_block
+
+def current_header_block():
+    """The (name, value) header tuple"""
+    return current_headers()[0]
+
+def current_version():
+    """APP_VERSION as the headers currently report it (follows ConfigMap reloads)"""
+    return current_headers()[1]
+
+# Request IDs: random per-process prefix + counter (next() on count is atomic)
+request_id_prefix = os.urandom(4).hex()
+request_counter = itertools.count(1)
+
+def next_request_id():
+    """16 hex chars, unique per process, without a syscall per request"""
+    return f'{request_id_prefix}{next(request_counter) & 0xffffffff:08x}'
+
+def skip_debug_headers(view):
+    """Decorator: don't add the debug headers to this route's responses"""
+    SKIP_HEADER_ENDPOINTS.add(view.__name__)
+    return view
+
 @app.after_request
 def add_headers(response):
     """Add custom headers to all responses - OOPS! This leaks sensitive info"""
-    # Security misconfiguration: exposing debug information in headers
-    response.headers['X-Powered-By'] = 'Flask/3.0.0'
-    response.headers['X-Server-Version'] = os.getenv('APP_VERSION', '1.0.0')
-    response.headers['X-Environment'] = os.getenv('ENVIRONMENT', 'production')
-    
-    # CRITICAL: Exposing sensitive debug information!
-    response.headers['X-Debug-Mode'] = 'enabled'
-    response.headers['X-Internal-Token'] = os.getenv('INTERNAL_TOKEN', 'dev-token-12345')
-    response.headers['X-Database-Path'] = os.getenv('DATABASE_PATH', '/var/lib/db/data.sqlite')
+    if request.endpoint in SKIP_HEADER_ENDPOINTS:
+        return response
     
-    # The flag is leaked in a header!
-    response.headers['X-Flag'] = os.getenv('FLAG', 'FLAG{not_set}')
+    # Security misconfiguration: exposing debug information in headers
+    # (version, environment, internal token, database path and the flag!)
+    headers = response.headers
+    for name, value in current_header_block():
+        headers[name] = value
     
     # Additional debug headers that might be useful
-    response.headers['X-Request-ID'] = os.urandom(8).hex()
-    response.headers['X-Pod-Name'] = os.getenv('POD_NAME', 'unknown')
+    headers['X-Request-ID'] = next_request_id()
     
     return response
 
+# Rendered once per version: the page only shows APP_VERSION, which a
+# header ConfigMap reload may change
+index_page = (current_version(), StaticPage(app, HTML_TEMPLATE, version=current_version()))
+
 @app.route('/')
 def index():
     """Main portal page"""
-    version = os.getenv('APP_VERSION', '1.0.0')
-    return render_template_string(HTML_TEMPLATE, version=version)
+    global index_page
+    version = current_version()
+    if index_page[0] != version:
+        index_page = (version, StaticPage(app, HTML_TEMPLATE, version=version))
+    return index_page[1].response()
 
 @app.route('/api/status')
 def api_status():
     """API endpoint for system status"""
     status = {
         'status': 'operational',
-        'version': os.getenv('APP_VERSION', '1.0.0'),
+        'version': current_version(),
         'uptime': '99.9%'
     }
     return jsonify(status)
@@ -107,10 +236,13 @@ def api_users():
     return jsonify(users)
 
 @app.route('/health')
+@limiter.exempt
+@skip_debug_headers
 def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy'}), 200
 
 if __name__ == '__main__':
+    probes.start()
     app.run(host='0.0.0.0', port=8080, debug=True)
 
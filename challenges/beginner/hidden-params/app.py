@@ -4,11 +4,34 @@ Vulnerable Web Application - Hidden Parameters / Authentication Bypass
 This application has hidden parameters that bypass authentication
 """
 
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, jsonify, request
 import os
+import sys
+from pathlib import Path
+
+# Shared challenge modules ship next to app.py in the ConfigMap; when running
+# from a checkout they are picked up from challenges/common
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent / 'common'))
+from ctf_json import FastJSONProvider
+from ctf_metrics import Metrics
+from ctf_probes import Probes
+from ctf_ratelimit import RateLimiter
+from ctf_render import StaticPage
 
 app = Flask(__name__)
 
+# jsonify() through orjson when installed (stdlib json otherwise)
+app.json = FastJSONProvider(app)
+
+# Prometheus metrics at /metrics; created first so throttled requests are timed too
+metrics = Metrics(app, challenge='hidden-params')
+
+# Per-client token buckets and concurrency caps (see ctf_ratelimit.py)
+limiter = RateLimiter(app)
+
+# /livez and /readyz for the kubelet (dependency checks run in the background)
+probes = Probes(app)
+
 # HTML template for the web interface
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -59,10 +82,13 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# Rendered once: the page is static
+index_page = StaticPage(app, HTML_TEMPLATE)
+
 @app.route('/')
 def index():
     """Main login page"""
-    return render_template_string(HTML_TEMPLATE)
+    return index_page.response()
 
 @app.route('/api/info')
 def api_info():
@@ -75,6 +101,7 @@ def api_info():
     })
 
 @app.route('/api/login', methods=['POST'])
+@limiter.limit(rate=2, burst=10)  # brute-force target: tighter per-client budget
 def api_login():
     """Login endpoint - but has hidden parameters!"""
     username = request.form.get('username', '')
@@ -155,10 +182,12 @@ def api_admin():
     }), 401
 
 @app.route('/health')
+@limiter.exempt
 def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy'}), 200
 
 if __name__ == '__main__':
+    probes.start()
     app.run(host='0.0.0.0', port=8080, debug=True)
 
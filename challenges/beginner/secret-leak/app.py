@@ -4,11 +4,34 @@ Vulnerable Web Application
 This application has several security issues - can you find them?
 """
 
-from flask import Flask, render_template_string, jsonify
+from flask import Flask, jsonify
 import os
+import sys
+from pathlib import Path
+
+# Shared challenge modules ship next to app.py in the ConfigMap; when running
+# from a checkout they are picked up from challenges/common
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent / 'common'))
+from ctf_json import FastJSONProvider
+from ctf_metrics import Metrics
+from ctf_probes import Probes
+from ctf_ratelimit import RateLimiter
+from ctf_render import StaticPage
 
 app = Flask(__name__)
 
+# jsonify() through orjson when installed (stdlib json otherwise)
+app.json = FastJSONProvider(app)
+
+# Prometheus metrics at /metrics; created first so throttled requests are timed too
+metrics = Metrics(app, challenge='secret-leak')
+
+# Per-client token buckets and concurrency caps (see ctf_ratelimit.py)
+limiter = RateLimiter(app)
+
+# /livez and /readyz for the kubelet (dependency checks run in the background)
+probes = Probes(app)
+
 # HTML template for the web interface
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -51,12 +74,14 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# Rendered once: the page only depends on the environment
+index_page = StaticPage(app, HTML_TEMPLATE, env_name=os.getenv('ENVIRONMENT', 'production'),
+                        version=os.getenv('APP_VERSION', '1.0.0'))
+
 @app.route('/')
 def index():
     """Main dashboard page"""
-    env_name = os.getenv('ENVIRONMENT', 'production')
-    version = os.getenv('APP_VERSION', '1.0.0')
-    return render_template_string(HTML_TEMPLATE, env_name=env_name, version=version)
+    return index_page.response()
 
 
 @app.route('/api/info')
@@ -90,11 +115,13 @@ def api_config():
 
 
 @app.route('/health')
+@limiter.exempt
 def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy'}), 200
 
 
 if __name__ == '__main__':
+    probes.start()
     app.run(host='0.0.0.0', port=8080, debug=True)
 
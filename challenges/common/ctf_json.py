@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Fast JSON provider for the challenge Flask apps
+Serializes jsonify() responses with orjson when it is installed, straight to
+the bytes of the response body, and falls back to Flask's stdlib provider
+otherwise (or for values orjson cannot encode)
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using orjson, output-compatible with DefaultJSONProvider
+
+    Keys are sorted and dates go through Flask's default() (HTTP dates) as
+    with the stdlib provider, and debug mode still pretty-prints; non-ASCII
+    text is written as UTF-8 rather than escaped.
+    """
+
+    def options(self, compact, newline=False) -> int:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, compact, newline=False) -> bytes:
+        return orjson.dumps(obj, default=self.default, option=self.options(compact, newline))
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return self.dumps_bytes(obj, True).decode()
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # Raise the stdlib error (a ValueError too) that callers expect
+            return super().loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        compact = self.compact if self.compact is not None else not self._app.debug
+        try:
+            # Trailing newline like the stdlib provider, added by orjson (no copy)
+            body = self.dumps_bytes(obj, compact, newline=True)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Prometheus instrumentation for the challenge Flask apps
+Records per-route request counts, latency, response sizes and in-flight
+requests, labeled by challenge and (team) namespace, and serves /metrics
+"""
+
+from flask import request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge,
+                               Histogram, generate_latest)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+import os
+import time
+
+# Challenge pages are small and fast; fewer buckets keep observe() cheap
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+SERVICEACCOUNT_NAMESPACE = '/var/run/secrets/kubernetes.io/serviceaccount/namespace'
+
+# WSGI environ keys holding the request start time, and the duration and
+# size series (plus Content-Length) to observe once the body has been sent
+START_KEY = 'ctf_metrics.start'
+OBSERVE_KEY = 'ctf_metrics.observe'
+
+# Requests that didn't match a route (404s, scanners) share one label value
+UNMATCHED_ENDPOINT = 'none'
+
+
+class ResponseBody:
+    """The app's response iterable; the request ends when the server closes it
+
+    A streamed response is still in flight while its body is being sent, so
+    the in-flight gauge, the duration and the (counted) size are settled in
+    close(), which WSGI servers call after the last chunk or when the client
+    goes away.
+    """
+
+    __slots__ = ('body', 'environ', 'on_close', 'sent', 'closed')
+
+    def __init__(self, body, environ, on_close):
+        self.body = body
+        self.environ = environ
+        self.on_close = on_close
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.body:
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            close = getattr(self.body, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self.on_close(self.environ, self.sent)
+
+
+def pod_namespace():
+    """Namespace of this pod: downward API env var, then the serviceaccount mount"""
+    namespace = os.getenv('POD_NAMESPACE')
+    if namespace:
+        return namespace
+    try:
+        with open(SERVICEACCOUNT_NAMESPACE, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return 'unknown'
+
+
+class RateLimitCollector:
+    """Exports the ctf_ratelimit counters of an app at scrape time"""
+
+    def __init__(self, app, labels):
+        self.app = app
+        self.labels = labels
+
+    def collect(self):
+        limiter = self.app.extensions.get('ctf_ratelimit')
+        if limiter is None:
+            return
+        stats = limiter.stats()
+        label_names = ['challenge', 'namespace']
+        requests = CounterMetricFamily(
+            'ctf_ratelimit_requests', 'Requests seen by the rate limiter by outcome',
+            labels=label_names + ['outcome'])
+        for outcome in ('allowed', 'throttled_rate', 'throttled_concurrency'):
+            requests.add_metric(self.labels + [outcome], stats[outcome])
+        yield requests
+        evicted = CounterMetricFamily(
+            'ctf_ratelimit_evictions', 'Client buckets evicted from the limiter store',
+            labels=label_names)
+        evicted.add_metric(self.labels, stats['evicted'])
+        yield evicted
+        tracked = GaugeMetricFamily(
+            'ctf_ratelimit_tracked_clients', 'Client buckets currently held by the limiter',
+            labels=label_names)
+        tracked.add_metric(self.labels, stats['tracked_clients'])
+        yield tracked
+
+
+class Metrics:
+    """Per-route request instrumentation for a challenge app
+
+    Timing and the in-flight gauge live in a thin WSGI wrapper, so requests
+    short-circuited by other extensions (e.g. a rate limiter 429) are timed
+    too. Labels are applied in one after_request hook that touches the
+    request proxy once; label children are resolved per (endpoint, method,
+    status) on first use and cached, so the steady-state cost is a dict
+    lookup plus the inc/observe calls (see tools/benchmarks).
+    """
+
+    def __init__(self, app=None, challenge=None, namespace=None, registry=REGISTRY):
+        self.challenge = challenge or os.getenv('CHALLENGE_NAME', 'unknown')
+        self.namespace = namespace or pod_namespace()
+        self.registry = registry
+
+        self.requests_total = Counter(
+            'ctf_http_requests_total', 'HTTP requests handled by a challenge app',
+            ['challenge', 'namespace', 'endpoint', 'method', 'status'], registry=registry)
+        self.request_duration = Histogram(
+            'ctf_http_request_duration_seconds', 'Time spent handling HTTP requests',
+            ['challenge', 'namespace', 'endpoint', 'method'], buckets=LATENCY_BUCKETS, registry=registry)
+        self.response_size = Histogram(
+            'ctf_http_response_size_bytes', 'Size of HTTP response bodies',
+            ['challenge', 'namespace', 'endpoint'], buckets=SIZE_BUCKETS, registry=registry)
+        self.in_flight = Gauge(
+            'ctf_http_requests_in_flight', 'HTTP requests currently being handled',
+            ['challenge', 'namespace'], registry=registry).labels(self.challenge, self.namespace)
+
+        # (endpoint, method, status) -> (counter, duration, size) children
+        self.children = {}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Wrap the WSGI app, register the labeling hook and the /metrics endpoint"""
+        app.wsgi_app = self.wrap_wsgi(app.wsgi_app)
+        app.after_request(self.after_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        self.registry.register(RateLimitCollector(app, [self.challenge, self.namespace]))
+        app.extensions['ctf_metrics'] = self
+
+    def wrap_wsgi(self, wsgi_app):
+        in_flight = self.in_flight
+        perf_counter = time.perf_counter
+
+        def finish(environ, sent):
+            in_flight.dec()
+            observe = environ.get(OBSERVE_KEY)
+            if observe is not None:
+                duration, size, length = observe
+                duration.observe(perf_counter() - environ[START_KEY])
+                size.observe(length if length is not None else sent)
+
+        def instrumented_wsgi_app(environ, start_response):
+            environ[START_KEY] = perf_counter()
+            in_flight.inc()
+            try:
+                body = wsgi_app(environ, start_response)
+            except BaseException:
+                in_flight.dec()
+                raise
+            return ResponseBody(body, environ, finish)
+
+        return instrumented_wsgi_app
+
+    def series(self, endpoint, method, status):
+        key = (endpoint, method, status)
+        children = self.children.get(key)
+        if children is None:
+            labels = (self.challenge, self.namespace, endpoint)
+            children = (
+                self.requests_total.labels(*labels, method, status),
+                self.request_duration.labels(*labels, method),
+                self.response_size.labels(*labels),
+            )
+            self.children[key] = children
+        return children
+
+    def after_request(self, response):
+        # Resolve the context-local proxy once; every later access is a plain attribute
+        req = request._get_current_object()
+        start = req.environ.get(START_KEY)
+        endpoint = req.endpoint
+        if start is None or endpoint == 'metrics':
+            return response
+        requests_total, duration, size = self.series(
+            endpoint or UNMATCHED_ENDPOINT, req.method, response.status_code)
+        requests_total.inc()
+        # Duration and size are observed when the body is done (ResponseBody.close)
+        req.environ[OBSERVE_KEY] = (duration, size, response.content_length)
+        return response
+
+    def metrics_view(self):
+        return generate_latest(self.registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
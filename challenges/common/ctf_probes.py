@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Liveness and readiness endpoints for the challenge Flask apps
+/livez only says the process is serving; /readyz reports whether the app's
+dependencies are usable. The dependency checks run in a background thread
+on an interval and /readyz serves the last verdict, so frequent probes
+never touch the dependencies themselves
+"""
+
+from flask import jsonify
+import os
+import threading
+import time
+
+
+class Probes:
+    """/livez and /readyz with cached, periodically refreshed dependency checks
+
+    Checks are registered with the check() decorator; one that raises is
+    failing, with the exception message as the reason (returning a string
+    adds a detail to a passing check). /readyz answers 200 when every check
+    passed on the last run, 503 before the first run completes, when a check
+    failed, or when the checker has not run for several intervals.
+    """
+
+    def __init__(self, app=None, interval=None):
+        self.interval = float(interval if interval is not None else os.getenv('READINESS_INTERVAL', '10'))
+        self.checks = {}
+        self.verdict = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+        self.thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.add_url_rule('/livez', 'livez', self.livez)
+        app.add_url_rule('/readyz', 'readyz', self.readyz)
+        # Probes are never rate limited
+        limiter = app.extensions.get('ctf_ratelimit')
+        if limiter is not None:
+            limiter.exempt_endpoints.update(('livez', 'readyz'))
+        app.extensions['ctf_probes'] = self
+
+    def check(self, name):
+        """Decorator: register a dependency check"""
+        def decorator(fn):
+            self.checks[name] = fn
+            return fn
+        return decorator
+
+    def run_checks(self):
+        results = {}
+        for name, fn in self.checks.items():
+            try:
+                detail = fn()
+                results[name] = {'ok': True, 'detail': detail} if detail else {'ok': True}
+            except Exception as e:
+                results[name] = {'ok': False, 'error': str(e) or type(e).__name__}
+        with self.lock:
+            self.verdict = results
+            self.checked_at = time.monotonic()
+
+    def loop(self):
+        while True:
+            self.run_checks()
+            time.sleep(self.interval)
+
+    def start(self):
+        """Start the checker thread (also done by the first /readyz request)"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.loop, name='readiness-checks', daemon=True)
+                self.thread.start()
+
+    def livez(self):
+        return jsonify({'status': 'alive'})
+
+    def readyz(self):
+        if self.thread is None:
+            self.start()
+        with self.lock:
+            verdict, checked_at = self.verdict, self.checked_at
+        if verdict is None:
+            return jsonify({'status': 'starting'}), 503
+        age = time.monotonic() - checked_at
+        ready = all(result['ok'] for result in verdict.values())
+        body = {'status': 'ready' if ready else 'not ready', 'checks': verdict, 'age_seconds': round(age, 1)}
+        if age > max(self.interval * 3, 30):
+            # The checker is stuck (a check hanging), so the verdict can't be trusted
+            body['status'] = 'stale'
+            ready = False
+        return jsonify(body), 200 if ready else 503
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Per-client rate limiting and concurrency caps for the challenge Flask apps
+Shared by every challenge in challenges/beginner (shipped next to app.py in
+each challenge's app-code ConfigMap)
+"""
+
+from collections import OrderedDict
+from flask import g, jsonify, request
+import os
+import threading
+import time
+
+
+class Bucket:
+    """Token bucket plus in-flight counter for one client (or client+route)"""
+    __slots__ = ('tokens', 'updated', 'in_flight')
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.in_flight = 0
+
+
+class RateLimiter:
+    """Token-bucket rate limiter with per-client concurrency caps
+
+    Every request takes one token from the client's bucket, which refills at
+    `rate` tokens per second up to `burst`. A client may also have at most
+    `max_concurrent` requests in flight; requests over that cap are rejected
+    before taking a token. Rejected requests get a 429 straight
+    from before_request, so an abusive client costs one dict lookup and never
+    reaches the view.
+
+    Buckets live in an LRU-ordered dict: buckets idle for `idle_ttl` seconds
+    are swept from the cold end, and the dict never grows past `max_clients`.
+    """
+
+    def __init__(self, app=None, rate=None, burst=None, max_concurrent=None,
+                 idle_ttl=None, max_clients=None, trust_proxy=None):
+        self.rate = float(rate if rate is not None else os.getenv('RATE_LIMIT_RATE', '10'))
+        self.burst = float(burst if burst is not None else os.getenv('RATE_LIMIT_BURST', '20'))
+        self.max_concurrent = int(max_concurrent if max_concurrent is not None
+                                  else os.getenv('RATE_LIMIT_MAX_CONCURRENT', '4'))
+        self.idle_ttl = float(idle_ttl if idle_ttl is not None else os.getenv('RATE_LIMIT_IDLE_TTL', '300'))
+        self.max_clients = int(max_clients if max_clients is not None
+                               else os.getenv('RATE_LIMIT_MAX_CLIENTS', '10000'))
+        if trust_proxy is None:
+            trust_proxy = os.getenv('RATE_LIMIT_TRUST_PROXY', 'false').lower() == 'true'
+        self.trust_proxy = trust_proxy
+        self.enabled = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+        self.next_sweep = 0.0
+
+        # endpoint -> (rate, burst) for routes with their own, stricter limit
+        self.route_limits = {}
+        self.exempt_endpoints = set()
+
+        # Throttling counters (exported by /ratelimit and the metrics module)
+        self.counters = {
+            'allowed': 0,
+            'throttled_rate': 0,
+            'throttled_concurrency': 0,
+            'evicted': 0,
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the request hooks and the /ratelimit stats endpoint"""
+        app.before_request(self.before_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule('/ratelimit', 'ratelimit_stats', self.stats_view)
+        self.exempt_endpoints.add('ratelimit_stats')
+        # Prometheus scrapes every pod from one source IP: never throttle /metrics
+        # (ctf_metrics registers it before the limiter exists)
+        if 'ctf_metrics' in app.extensions:
+            self.exempt_endpoints.add('metrics')
+        app.extensions['ctf_ratelimit'] = self
+
+    def limit(self, rate, burst):
+        """Decorator: give a route its own (usually stricter) bucket per client"""
+        def decorator(view):
+            self.route_limits[view.__name__] = (float(rate), float(burst))
+            return view
+        return decorator
+
+    def exempt(self, view):
+        """Decorator: never limit this route (health checks, probes)"""
+        self.exempt_endpoints.add(view.__name__)
+        return view
+
+    def client_key(self):
+        """Identify the client: first X-Forwarded-For hop if trusted, else peer IP"""
+        if self.trust_proxy:
+            forwarded = request.headers.get('X-Forwarded-For', '')
+            if forwarded:
+                return forwarded.split(',', 1)[0].strip()
+        return request.remote_addr or 'unknown'
+
+    def bucket(self, key, burst, now):
+        """key's bucket, created full if new (and moved to the hot end of the LRU order)"""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = Bucket(burst, now)
+            self.buckets[key] = bucket
+            if len(self.buckets) > self.max_clients:
+                self.evict_one()
+        else:
+            self.buckets.move_to_end(key)
+        return bucket
+
+    def take(self, key, rate, burst, now):
+        """Take one token from key's bucket; returns (bucket, retry_after or 0)"""
+        bucket = self.bucket(key, burst, now)
+        bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+        bucket.updated = now
+
+        if bucket.tokens < 1.0:
+            return bucket, (1.0 - bucket.tokens) / rate if rate > 0 else 1.0
+        bucket.tokens -= 1.0
+        return bucket, 0
+
+    def evict_one(self):
+        """Drop the least recently used bucket that has nothing in flight"""
+        for key, bucket in self.buckets.items():
+            if bucket.in_flight == 0:
+                del self.buckets[key]
+                self.counters['evicted'] += 1
+                return
+
+    def sweep(self, now):
+        """Evict idle buckets from the cold end of the LRU order"""
+        cutoff = now - self.idle_ttl
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if bucket.updated > cutoff:
+                break
+            if bucket.in_flight:
+                # Long-running request: keep it, but stop it blocking the sweep
+                self.buckets.move_to_end(key)
+                bucket.updated = now
+                continue
+            del self.buckets[key]
+            self.counters['evicted'] += 1
+
+    def before_request(self):
+        if not self.enabled or request.endpoint in self.exempt_endpoints:
+            return None
+
+        client = self.client_key()
+        now = time.monotonic()
+
+        with self.lock:
+            if now >= self.next_sweep:
+                self.sweep(now)
+                self.next_sweep = now + min(self.idle_ttl, 30.0)
+
+            # Concurrency first: a request rejected for it must not cost a token
+            bucket = self.bucket(client, self.burst, now)
+            if bucket.in_flight >= self.max_concurrent:
+                self.counters['throttled_concurrency'] += 1
+                return self.reject('Too many concurrent requests', 1.0)
+
+            # Global per-client bucket, shared by every route
+            _, retry_after = self.take(client, self.rate, self.burst, now)
+            if not retry_after:
+                route_limit = self.route_limits.get(request.endpoint)
+                if route_limit:
+                    _, retry_after = self.take((client, request.endpoint), route_limit[0], route_limit[1], now)
+                    if retry_after:
+                        # Refund the global token: only the route bucket was exceeded
+                        bucket.tokens = min(self.burst, bucket.tokens + 1.0)
+
+            if retry_after:
+                self.counters['throttled_rate'] += 1
+                return self.reject('Rate limit exceeded', retry_after)
+
+            bucket.in_flight += 1
+            self.counters['allowed'] += 1
+
+        g.ratelimit_bucket = bucket
+        return None
+
+    def teardown_request(self, exc=None):
+        bucket = g.pop('ratelimit_bucket', None)
+        if bucket is not None:
+            with self.lock:
+                bucket.in_flight -= 1
+
+    def reject(self, message, retry_after):
+        response = jsonify({'error': 'Too Many Requests', 'message': message})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+        return response
+
+    def stats(self):
+        """Snapshot of the throttling counters and store size"""
+        with self.lock:
+            snapshot = dict(self.counters)
+            snapshot['tracked_clients'] = len(self.buckets)
+        return snapshot
+
+    def stats_view(self):
+        return jsonify({
+            'limits': {
+                'rate': self.rate,
+                'burst': self.burst,
+                'max_concurrent': self.max_concurrent,
+                'routes': {name: {'rate': r, 'burst': b} for name, (r, b) in self.route_limits.items()},
+            },
+            'counters': self.stats(),
+        })
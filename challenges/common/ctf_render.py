@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Template rendering for the challenge Flask apps
+Templates are compiled once at startup instead of on every request as
+render_template_string does; pages that only depend on values fixed at
+startup (environment variables) are rendered once and served as
+precomputed bytes with an ETag
+"""
+
+from flask import request
+import hashlib
+
+
+def compile_template(app, source):
+    """Compile a template string with the app's Jinja environment (same autoescaping as render_template_string)"""
+    return app.jinja_env.from_string(source)
+
+
+class StaticPage:
+    """An HTML page rendered once from startup-time values
+
+    response() returns the stored bytes, or a bodyless 304 when the client
+    already holds the current ETag.
+    """
+
+    def __init__(self, app, source, **context):
+        self.app = app
+        self.body = compile_template(app, source).render(**context).encode()
+        self.etag = hashlib.sha1(self.body).hexdigest()
+
+    def response(self):
+        if self.etag in request.if_none_match:
+            response = self.app.response_class(status=304)
+        else:
+            response = self.app.response_class(self.body, mimetype='text/html')
+        response.set_etag(self.etag)
+        return response
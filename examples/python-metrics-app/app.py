@@ -1,19 +1,31 @@
 #!/usr/bin/env python3
 """
 Simple Python application that exposes Prometheus metrics
+
+Single process:  python app.py
+Multi-worker:    PROMETHEUS_MULTIPROC_DIR=/tmp/prometheus-multiproc \
+                 gunicorn -c gunicorn.conf.py app:app
 """
 from flask import Flask
-from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import (Counter, Histogram, Gauge, CollectorRegistry, generate_latest,
+                               multiprocess, CONTENT_TYPE_LATEST)
+import os
 import random
 import time
 
 app = Flask(__name__)
 
+# With PROMETHEUS_MULTIPROC_DIR set, every worker process writes its values to
+# mmap-backed files in that directory and /metrics aggregates all of them.
+# Without it, each worker would only ever report its own numbers.
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
 # Define metrics
 http_requests_total = Counter('http_requests_total', 'Total HTTP requests', ['method', 'status'])
 http_request_duration_seconds = Histogram('http_request_duration_seconds', 'HTTP request duration', ['method'])
-active_connections = Gauge('active_connections', 'Number of active connections')
-requests_per_second = Gauge('requests_per_second', 'Requests per second')
+# Gauges need a multiprocess mode; livesum adds up the workers that are still alive
+active_connections = Gauge('active_connections', 'Number of active connections', multiprocess_mode='livesum')
+requests_per_second = Gauge('requests_per_second', 'Requests per second', multiprocess_mode='livesum')
 
 @app.route('/')
 def index():
@@ -48,6 +60,11 @@ def health():
 
 @app.route('/metrics')
 def metrics():
+    if MULTIPROC_DIR:
+        # A fresh registry per scrape, as the multiprocess collector requires
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=MULTIPROC_DIR)
+        return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
     return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
 
 if __name__ == '__main__':
@@ -0,0 +1,58 @@
+"""
+Gunicorn settings for multi-worker serving of the metrics demo
+Workers share metrics through PROMETHEUS_MULTIPROC_DIR (see app.py); the
+hooks below keep that directory from filling up with dead workers' files
+"""
+
+import glob
+import os
+
+from prometheus_client import multiprocess
+from prometheus_client.mmap_dict import MmapedDict
+
+bind = '0.0.0.0:8080'
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+
+# Counter and histogram values of exited workers are folded into one archive
+# file per type, so scrape cost tracks the live worker count, not restarts
+ARCHIVED_TYPES = ('counter', 'histogram')
+
+
+def on_starting(server):
+    """Start from an empty multiprocess directory
+
+    Files left by a previous master belong to pids that no longer exist and
+    would otherwise be summed into every scrape forever.
+    """
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+
+
+def archive_worker_files(directory, pid):
+    """Merge an exited worker's counter/histogram values into the archive files"""
+    for typ in ARCHIVED_TYPES:
+        worker_file = os.path.join(directory, f'{typ}_{pid}.db')
+        if not os.path.exists(worker_file):
+            continue
+        archive = MmapedDict(os.path.join(directory, f'{typ}_archive.db'))
+        try:
+            for key, value, timestamp, _ in MmapedDict.read_all_values_from_file(worker_file):
+                current, _ = archive.read_value(key)
+                archive.write_value(key, current + value, timestamp)
+        finally:
+            archive.close()
+        os.remove(worker_file)
+
+
+def child_exit(server, worker):
+    """Clean up after a worker that exited (crash, timeout or max_requests)"""
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not directory:
+        return
+    # Live gauges (livesum/liveall) must stop counting this worker
+    multiprocess.mark_process_dead(worker.pid, directory)
+    archive_worker_files(directory, worker.pid)
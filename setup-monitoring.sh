@@ -69,6 +69,11 @@ kubectl wait --for=condition=available --timeout=300s deployment/grafana -n moni
     kubectl get pods -n monitoring -l app=grafana
 }
 
+# Deploy the challenge health exporter
+echo ""
+echo "Deploying challenge health exporter..."
+kubectl apply -f monitoring/challenge-exporter/
+
 # Deploy Status Page
 echo ""
 echo "Deploying Status Page..."
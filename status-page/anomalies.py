@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Restart-spike and rollout-stall detection for the status page
+AnomalyDetector follows pod restart counters, pod readiness and deployment
+rollout progress over time with a small state record per object. Like the
+health cache, an object whose resourceVersion did not move costs one dict
+lookup; only changed objects update their state, and reporting only looks
+at the objects currently in an abnormal state:
+
+- CrashLoop: a pod restarted ANOMALY_RESTARTS times within ANOMALY_WINDOW
+- ReadinessFlapping: a pod changed readiness ANOMALY_FLAPS times within the
+  window (without restarting)
+- RolloutStalled: a rollout made no progress for ROLLOUT_STALL_SECONDS, or
+  passed its progress deadline
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from health import classify
+
+ANOMALY_WINDOW = float(os.getenv('ANOMALY_WINDOW', '600'))
+ANOMALY_RESTARTS = int(os.getenv('ANOMALY_RESTARTS', '3'))
+ANOMALY_FLAPS = int(os.getenv('ANOMALY_FLAPS', '4'))
+ROLLOUT_STALL_SECONDS = float(os.getenv('ROLLOUT_STALL_SECONDS', '300'))
+
+
+def isoformat(seconds):
+    return datetime.utcfromtimestamp(seconds).isoformat()
+
+
+class PodState:
+    """Restart and readiness history of one pod (the last few changes only)"""
+
+    __slots__ = ('resource_version', 'restarts', 'ready', 'restart_times', 'ready_changes',
+                 'crashloop_since', 'flapping_since', 'seen_at')
+
+    def __init__(self, pod, restarts, flaps, now):
+        self.resource_version = pod.resource_version
+        self.restarts = pod.restarts
+        self.ready = pod.ready
+        self.restart_times = deque(maxlen=restarts)
+        self.ready_changes = deque(maxlen=flaps)
+        self.crashloop_since = None
+        self.flapping_since = None
+        # When the restart count was last read: later restarts happened after it
+        self.seen_at = now
+
+
+class RolloutState:
+    """Rollout state of one deployment: steady, rolling or failed (progress deadline exceeded)"""
+
+    __slots__ = ('resource_version', 'state', 'since', 'progress', 'last_progress')
+
+    def __init__(self, now):
+        self.resource_version = None
+        self.state = 'steady'
+        self.since = now
+        self.progress = None
+        self.last_progress = now
+
+
+class AnomalyDetector:
+    """Per-object state machines over pod and deployment records
+
+    observe_*() fold in one record and forget_*() drop a deleted object;
+    apply() does either for a watch event and sync() for full lists.
+    Objects per namespace are counted, so sync() only looks for deleted
+    objects when the list is shorter than what is tracked. anomalies()
+    reports the current ones; only pods with recent restarts or readiness
+    changes and deployments in a rollout are looked at.
+    """
+
+    def __init__(self, window=ANOMALY_WINDOW, restarts=ANOMALY_RESTARTS, flaps=ANOMALY_FLAPS,
+                 stall_seconds=ROLLOUT_STALL_SECONDS):
+        self.window = window
+        self.restarts = restarts
+        self.flaps = flaps
+        self.stall_seconds = stall_seconds
+        self.lock = threading.Lock()
+        self.pods = {}
+        self.deployments = {}
+        # Tracked objects per namespace
+        self.pod_counts = {}
+        self.deployment_counts = {}
+        # Keys of pods with restarts or readiness changes within the window,
+        # and of deployments in a rollout
+        self.active_pods = set()
+        self.rolling = set()
+
+    def observe_pod(self, pod, now):
+        key = (pod.namespace, pod.name)
+        state = self.pods.get(key)
+        if state is None:
+            # First sight: counters so far are history, not a spike
+            self.pods[key] = PodState(pod, self.restarts, self.flaps, now)
+            self.pod_counts[pod.namespace] = self.pod_counts.get(pod.namespace, 0) + 1
+            return
+        seen_at, state.seen_at = state.seen_at, now
+        if pod.resource_version is not None and state.resource_version == pod.resource_version:
+            return
+        state.resource_version = pod.resource_version
+
+        if pod.restarts > state.restarts:
+            # Only the newest restart has a time (lastState.terminated, or now if
+            # the pod doesn't say or the time predates the last look). The ones
+            # before it are only known to be after the last look, so they are
+            # dated then: several restarts between two distant looks never
+            # fit in the window by accident
+            when = now
+            if pod.last_terminated is not None and seen_at <= pod.last_terminated <= now:
+                when = pod.last_terminated
+            new = min(pod.restarts - state.restarts, self.restarts)
+            state.restart_times.extend([seen_at] * (new - 1) + [when])
+            if (state.crashloop_since is None and len(state.restart_times) == self.restarts
+                    and when - state.restart_times[0] <= self.window):
+                state.crashloop_since = when
+            self.active_pods.add(key)
+        state.restarts = pod.restarts
+
+        if pod.ready != state.ready:
+            state.ready = pod.ready
+            state.ready_changes.append(now)
+            if (state.flapping_since is None and len(state.ready_changes) == self.flaps
+                    and now - state.ready_changes[0] <= self.window):
+                state.flapping_since = now
+            self.active_pods.add(key)
+
+    def observe_deployment(self, deployment, now):
+        key = (deployment.namespace, deployment.name)
+        state = self.deployments.get(key)
+        if state is None:
+            state = self.deployments[key] = RolloutState(now)
+            self.deployment_counts[key[0]] = self.deployment_counts.get(key[0], 0) + 1
+        elif deployment.resource_version is not None and state.resource_version == deployment.resource_version:
+            return
+        state.resource_version = deployment.resource_version
+
+        facts = deployment.facts
+        progress = (facts.observed_generation, facts.updated, facts.ready, facts.available)
+        if progress != state.progress:
+            state.progress = progress
+            state.last_progress = now
+
+        update_status = classify(facts).update_status
+        if update_status == 'Update Failed':
+            new_state = 'failed'
+        elif update_status == 'Updating':
+            new_state = 'rolling'
+        else:
+            new_state = 'steady'
+        if new_state != state.state:
+            if state.state == 'steady':
+                # A new rollout: the stall clock starts now
+                state.last_progress = now
+            state.state = new_state
+            state.since = now
+        if new_state == 'steady':
+            self.rolling.discard(key)
+        else:
+            self.rolling.add(key)
+
+    def forget_pod(self, key):
+        if self.pods.pop(key, None) is not None:
+            self.pod_counts[key[0]] -= 1
+        self.active_pods.discard(key)
+
+    def forget_deployment(self, key):
+        if self.deployments.pop(key, None) is not None:
+            self.deployment_counts[key[0]] -= 1
+        self.rolling.discard(key)
+
+    def apply(self, kind, event_type, record, now=None):
+        """Fold in one watch event of 'pods' or 'deployments' (ADDED, MODIFIED or DELETED)"""
+        now = time.time() if now is None else now
+        observe, forget = ((self.observe_pod, self.forget_pod) if kind == 'pods'
+                           else (self.observe_deployment, self.forget_deployment))
+        with self.lock:
+            if event_type == 'DELETED':
+                forget((record.namespace, record.name))
+            else:
+                observe(record, now)
+
+    def sync_kind(self, kind, records, namespace=None, now=None):
+        """Observe a full list of 'pods' or 'deployments' (of one namespace, or all) and forget the rest"""
+        now = time.time() if now is None else now
+        if kind == 'pods':
+            observe, forget, states, counts = self.observe_pod, self.forget_pod, self.pods, self.pod_counts
+        else:
+            observe, forget, states, counts = (self.observe_deployment, self.forget_deployment,
+                                               self.deployments, self.deployment_counts)
+        with self.lock:
+            for record in records:
+                observe(record, now)
+            # Every listed object is tracked now; more tracked than listed
+            # means some were deleted, and only then is the state scanned
+            tracked = len(states) if namespace is None else counts.get(namespace, 0)
+            if tracked > len(records):
+                present = {(r.namespace, r.name) for r in records}
+                for key in [k for k in states if k not in present and (namespace is None or k[0] == namespace)]:
+                    forget(key)
+
+    def sync(self, deployments, pods, namespace=None, now=None):
+        """Observe full lists (of one namespace, or all) and forget objects no longer in them"""
+        now = time.time() if now is None else now
+        self.sync_kind('deployments', deployments, namespace, now)
+        self.sync_kind('pods', pods, namespace, now)
+
+    def anomalies(self, namespace=None, now=None):
+        """Current anomalies, newest first, as dicts with the time each started"""
+        now = time.time() if now is None else now
+        found = []
+        with self.lock:
+            for key in list(self.active_pods):
+                state = self.pods[key]
+                # Conditions end once the window has passed without a new change
+                if state.crashloop_since is not None and now - state.restart_times[-1] > self.window:
+                    state.crashloop_since = None
+                if state.flapping_since is not None and now - state.ready_changes[-1] > self.window:
+                    state.flapping_since = None
+                last_change = max(state.restart_times[-1] if state.restart_times else 0,
+                                  state.ready_changes[-1] if state.ready_changes else 0)
+                if now - last_change > self.window:
+                    self.active_pods.discard(key)
+                    continue
+                if namespace not in (None, key[0]):
+                    continue
+                if state.crashloop_since is not None:
+                    found.append(self.anomaly('CrashLoop', key, 'Pod', state.crashloop_since,
+                                              f'restarted {self.restarts} times within {self.window / 60:g} '
+                                              f'minutes ({state.restarts} restarts in total)'))
+                elif state.flapping_since is not None:
+                    found.append(self.anomaly('ReadinessFlapping', key, 'Pod', state.flapping_since,
+                                              f'readiness changed {self.flaps} times within '
+                                              f'{self.window / 60:g} minutes'))
+
+            for key in self.rolling:
+                state = self.deployments[key]
+                if namespace not in (None, key[0]):
+                    continue
+                if state.state == 'failed':
+                    found.append(self.anomaly('RolloutStalled', key, 'Deployment', state.since,
+                                              'progress deadline exceeded'))
+                elif now - state.last_progress > self.stall_seconds:
+                    found.append(self.anomaly('RolloutStalled', key, 'Deployment', state.last_progress,
+                                              f'no rollout progress for {(now - state.last_progress) / 60:.0f} minutes'))
+        found.sort(key=lambda a: a['since'], reverse=True)
+        return found
+
+    @staticmethod
+    def anomaly(kind, key, object_kind, since, detail):
+        return {
+            'type': kind,
+            'namespace': key[0],
+            'object': {'kind': object_kind, 'name': key[1]},
+            'since': isoformat(since),
+            'detail': detail,
+        }
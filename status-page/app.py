@@ -4,108 +4,87 @@ K3s Status Page - Application Status Monitor
 A simple Flask application that monitors Kubernetes deployments and displays their status
 """
 
-from flask import Flask, render_template, jsonify, request
-from kubernetes import client, config
-from kubernetes.client.rest import ApiException
+from flask import Flask, Response, render_template, jsonify, request
 import os
+import sys
+import threading
+import time
 from datetime import datetime
+from pathlib import Path
 import json
 
+# Shared modules from challenges/common ship next to app.py in the ConfigMap;
+# when running from a checkout they are picked up from there
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'challenges' / 'common'))
+import k8sstatus
+from anomalies import AnomalyDetector
+from clusters import STATUS_CLUSTER_CACHE_TTL, STATUS_CLUSTER_TIMEOUT, STATUS_CONTEXTS, ClusterSet
+from ctf_json import FastJSONProvider
+from ctf_probes import Probes
+from events import EventFeed
+from logstream import LOG_NAMESPACES, LogStreamBusy, LogStreams
+from promquery import UsageCache, enrich_with_usage
+
 app = Flask(__name__)
 
-# Try to load kubeconfig, fallback to in-cluster config
-try:
-    config.load_kube_config()
-except:
-    try:
-        config.load_incluster_config()
-    except:
-        print("Warning: Could not load kubeconfig")
+# jsonify() through orjson when installed (stdlib json otherwise)
+app.json = FastJSONProvider(app)
+
+# Several clusters, each fetched concurrently with its own timeout and cache;
+# otherwise the kubeconfig (or in-cluster config) is loaded on first use
+cluster_set = ClusterSet(STATUS_CONTEXTS) if STATUS_CONTEXTS else None
+
+# Crash loops, readiness flapping and stalled rollouts, tracked across
+# requests (clusters.py keeps one per cluster)
+anomaly_detector = AnomalyDetector()
+
+# CPU / memory / request rate per pod from the in-cluster Prometheus
+usage_cache = UsageCache()
+
+# Without STATUS_CONTEXTS: deployment lists by namespace (None for all) with
+# their fetch time, so /api/pods for an expanded row reuses the list the
+# last /api/status fetched instead of listing every pod again
+deployment_snapshots = {}
+snapshot_lock = threading.Lock()
+
+def local_core_v1():
+    """Core API client of the cluster the page runs in (the first context with several)"""
+    if cluster_set:
+        return cluster_set.caches[cluster_set.local].api_clients()[1]
+    return k8sstatus.default_clients()[1]
+
+# Events of that cluster, watched in the background into a bounded store
+event_feed = EventFeed(local_core_v1)
 
-v1 = client.AppsV1Api()
-core_v1 = client.CoreV1Api()
+# Pod log tailing with per-stream byte caps and idle timeouts (see logstream.py),
+# of pods in LOG_NAMESPACES only
+log_streams = LogStreams()
+log_namespaces = frozenset(LOG_NAMESPACES)
+
+# /livez and /readyz for the kubelet; readiness means the API server answers
+probes = Probes(app)
+
+@probes.check('kubernetes')
+def kubernetes_ready():
+    """The API server (or at least one of STATUS_CONTEXTS) answers"""
+    if cluster_set:
+        return cluster_set.ping()
+    _, core_v1 = k8sstatus.default_clients()
+    return k8sstatus.ping(core_v1, timeout=STATUS_CLUSTER_TIMEOUT)
+
+def warm_up():
+    """Import the Kubernetes client, load its config and fetch once, ahead of the first request"""
+    if cluster_set:
+        cluster_set.status()
+    else:
+        cached_deployment_status()
 
 def get_deployment_status(namespace=None):
     """Get status of all deployments"""
+    from kubernetes.client.rest import ApiException
     try:
-        if namespace:
-            deployments = v1.list_namespaced_deployment(namespace)
-        else:
-            deployments = v1.list_deployment_for_all_namespaces()
-        
-        status_list = []
-        for deployment in deployments.items:
-            metadata = deployment.metadata
-            spec = deployment.spec
-            status = deployment.status
-            
-            # Get pods for this deployment
-            selector = ','.join([f"{k}={v}" for k, v in spec.selector.match_labels.items()])
-            try:
-                if namespace:
-                    pods = core_v1.list_namespaced_pod(namespace, label_selector=selector)
-                else:
-                    pods = core_v1.list_pod_for_all_namespaces(label_selector=selector)
-            except:
-                pods = None
-            
-            pod_statuses = []
-            if pods:
-                for pod in pods.items:
-                    pod_status = "Unknown"
-                    if pod.status.phase:
-                        pod_status = pod.status.phase
-                    
-                    pod_statuses.append({
-                        'name': pod.metadata.name,
-                        'status': pod_status,
-                        'ready': any(c.ready for c in pod.status.container_statuses) if pod.status.container_statuses else False,
-                        'restarts': sum(c.restart_count for c in pod.status.container_statuses) if pod.status.container_statuses else 0,
-                        'node': pod.spec.node_name,
-                    })
-            
-            # Determine overall status
-            overall_status = "Unknown"
-            if status.ready_replicas == spec.replicas and status.replicas == spec.replicas:
-                overall_status = "Healthy"
-            elif status.replicas < spec.replicas:
-                overall_status = "Degraded"
-            elif status.unavailable_replicas:
-                overall_status = "Unavailable"
-            
-            # Get update/rollout status
-            conditions = status.conditions or []
-            update_status = "Up to date"
-            for condition in conditions:
-                if condition.type == "Progressing":
-                    if condition.status == "True":
-                        update_status = "Updating"
-                    else:
-                        update_status = "Update Failed"
-                elif condition.type == "Available" and condition.status == "False":
-                    update_status = "Unavailable"
-            
-            # Get image versions
-            images = [c.image for c in spec.template.spec.containers]
-            
-            status_list.append({
-                'name': metadata.name,
-                'namespace': metadata.namespace,
-                'replicas': {
-                    'desired': spec.replicas,
-                    'ready': status.ready_replicas or 0,
-                    'available': status.available_replicas or 0,
-                    'unavailable': status.unavailable_replicas or 0,
-                },
-                'status': overall_status,
-                'update_status': update_status,
-                'images': images,
-                'pods': pod_statuses,
-                'created': metadata.creation_timestamp.isoformat() if metadata.creation_timestamp else None,
-                'updated': status.updated_replicas or 0,
-            })
-        
-        return status_list
+        v1, core_v1 = k8sstatus.default_clients()
+        return k8sstatus.get_deployment_status(v1, core_v1, namespace, detector=anomaly_detector)
     except ApiException as e:
         print(f"Error fetching deployments: {e}")
         return []
@@ -113,44 +92,37 @@ def get_deployment_status(namespace=None):
         print(f"Unexpected error: {e}")
         return []
 
+def cached_deployment_status(namespace=None):
+    """Copies of get_deployment_status(namespace), fetched at most once per STATUS_CLUSTER_CACHE_TTL
+
+    A fresh list of every namespace also answers for a single namespace.
+    """
+    deployments = None
+    with snapshot_lock:
+        now = time.monotonic()
+        for key in (namespace, None):
+            entry = deployment_snapshots.get(key)
+            if entry is not None and now - entry[0] < STATUS_CLUSTER_CACHE_TTL:
+                deployments = [d for d in entry[1] if namespace in (None, d['namespace'])]
+                break
+    if deployments is None:
+        deployments = get_deployment_status(namespace)
+        with snapshot_lock:
+            now = time.monotonic()
+            # Namespaces come from the query string: drop expired lists
+            for key, (fetched_at, _) in list(deployment_snapshots.items()):
+                if now - fetched_at >= STATUS_CLUSTER_CACHE_TTL:
+                    del deployment_snapshots[key]
+            deployment_snapshots[namespace] = (now, deployments)
+    # Copies: callers add usage figures to the rows and pods
+    return [dict(d, pods=[dict(p) for p in d['pods']]) for d in deployments]
+
 def get_service_status(namespace=None):
     """Get status of all services"""
+    from kubernetes.client.rest import ApiException
     try:
-        if namespace:
-            services = core_v1.list_namespaced_service(namespace)
-        else:
-            services = core_v1.list_service_for_all_namespaces()
-        
-        service_list = []
-        for service in services.items:
-            metadata = service.metadata
-            spec = service.spec
-            
-            # Get endpoints
-            try:
-                if namespace:
-                    endpoints = core_v1.read_namespaced_endpoints(metadata.name, namespace)
-                else:
-                    endpoints = core_v1.read_namespaced_endpoints(metadata.name, metadata.namespace)
-                
-                endpoint_count = len(endpoints.subsets[0].addresses) if endpoints.subsets else 0
-            except:
-                endpoint_count = 0
-            
-            service_status = "Available" if endpoint_count > 0 else "No Endpoints"
-            
-            service_list.append({
-                'name': metadata.name,
-                'namespace': metadata.namespace,
-                'type': spec.type,
-                'ports': [f"{p.port}/{p.protocol}" for p in spec.ports or []],
-                'endpoints': endpoint_count,
-                'status': service_status,
-                'cluster_ip': spec.cluster_ip,
-                'external_ip': spec.load_balancer.ingress[0].hostname if spec.load_balancer and spec.load_balancer.ingress else None,
-            })
-        
-        return service_list
+        _, core_v1 = k8sstatus.default_clients()
+        return k8sstatus.get_service_status(core_v1, namespace)
     except ApiException as e:
         print(f"Error fetching services: {e}")
         return []
@@ -158,6 +130,19 @@ def get_service_status(namespace=None):
         print(f"Unexpected error: {e}")
         return []
 
+def add_usage(deployments):
+    """Add Prometheus usage figures to deployments and their pods; returns the Prometheus state"""
+    # Never blocks on Prometheus once warm; serves the last result if it is slow
+    usage, prometheus_state = usage_cache.pod_usage()
+    if cluster_set:
+        # Prometheus only scrapes the cluster the status page runs in
+        for d in deployments:
+            d['usage'] = None
+        enrich_with_usage([d for d in deployments if d['cluster'] == cluster_set.local], usage)
+    else:
+        enrich_with_usage(deployments, usage)
+    return prometheus_state
+
 @app.route('/')
 def index():
     """Main status page"""
@@ -167,27 +152,148 @@ def index():
 def api_status():
     """API endpoint for status data"""
     namespace = request.args.get('namespace', None)
+    # ?pods=0 replaces each pod list with counts (the dashboard fetches pods
+    # per deployment from /api/pods when one is expanded)
+    include_pods = request.args.get('pods', '1') != '0'
     
-    deployments = get_deployment_status(namespace)
-    services = get_service_status(namespace)
+    if cluster_set:
+        deployments, services, cluster_states = cluster_set.status(namespace, request.args.get('cluster'))
+        anomalies = cluster_set.anomalies(namespace, request.args.get('cluster'))
+    else:
+        deployments = cached_deployment_status(namespace)
+        services = get_service_status(namespace)
+        anomalies = anomaly_detector.anomalies(namespace)
     
-    return jsonify({
+    prometheus_state = add_usage(deployments)
+    event_feed.start()
+    warnings = event_feed.store.warning_counts()
+    for d in deployments:
+        if not cluster_set or d['cluster'] == cluster_set.local:
+            d['recent_warnings'] = warnings.get((d['namespace'], d['name']), 0)
+    with_usage = [d for d in deployments if d['usage']]
+    top_cpu = max(with_usage, key=lambda d: d['usage']['cpu_cores'], default=None)
+    
+    result = {
         'timestamp': datetime.utcnow().isoformat(),
+        'anomalies': anomalies,
         'deployments': deployments,
         'services': services,
+        'prometheus': prometheus_state,
+        'events': event_feed.state(),
+        'log_namespaces': sorted(log_namespaces),
         'summary': {
             'total_deployments': len(deployments),
             'healthy_deployments': len([d for d in deployments if d['status'] == 'Healthy']),
             'degraded_deployments': len([d for d in deployments if d['status'] == 'Degraded']),
             'total_services': len(services),
+            'anomalies': len(anomalies),
+            'total_cpu_cores': sum(d['usage']['cpu_cores'] for d in with_usage),
+            'total_memory_bytes': sum(d['usage']['memory_bytes'] for d in with_usage),
+            'top_cpu_deployment': f"{top_cpu['namespace']}/{top_cpu['name']}" if top_cpu else None,
         }
+    }
+    if cluster_set:
+        result['clusters'] = cluster_states
+    if not include_pods:
+        for d in deployments:
+            pods = d.pop('pods')
+            d['pod_summary'] = {
+                'total': len(pods),
+                'ready': len([p for p in pods if p['ready']]),
+                'restarts': sum(p['restarts'] for p in pods),
+            }
+    return jsonify(result)
+
+@app.route('/api/pods')
+def api_pods():
+    """Pods of one deployment (with usage figures), for the dashboard's expanded rows"""
+    namespace = request.args.get('namespace')
+    name = request.args.get('deployment')
+    if not namespace or not name:
+        return jsonify({'error': 'namespace and deployment are required'}), 400
+    
+    if cluster_set:
+        deployments, _, _ = cluster_set.status(namespace, request.args.get('cluster'))
+    else:
+        deployments = cached_deployment_status(namespace)
+    deployment = next((d for d in deployments if d['name'] == name), None)
+    if deployment is None:
+        return jsonify({'error': f'deployment {namespace}/{name} not found'}), 404
+    add_usage([deployment])
+    return jsonify({'pods': deployment['pods']})
+
+@app.route('/api/events')
+def api_events():
+    """Compacted Events, newest first: of a deployment, an object, a namespace or everything"""
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    namespace = request.args.get('namespace')
+    deployment = request.args.get('deployment')
+    kind, name = request.args.get('kind'), request.args.get('name')
+    if (deployment or kind or name) and not namespace:
+        return jsonify({'error': 'namespace is required with deployment, kind or name'}), 400
+    
+    event_feed.start()
+    return jsonify({
+        'events': event_feed.store.query(namespace, deployment, kind, name,
+                                         warnings_only=request.args.get('type') == 'Warning', limit=limit),
+        'feed': event_feed.state(),
     })
 
+@app.route('/api/logs/<namespace>/<pod>')
+def api_logs(namespace, pod):
+    """Stream a pod's log as plain text, like kubectl logs"""
+    from kubernetes.client.rest import ApiException
+    # Same answer as for a missing pod, so other namespaces can't be probed
+    if namespace not in log_namespaces:
+        return jsonify({'error': f'pod {namespace}/{pod} not found'}), 404
+    try:
+        tail_lines = int(request.args['tailLines']) if 'tailLines' in request.args else None
+        since_seconds = int(request.args['sinceSeconds']) if 'sinceSeconds' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'tailLines and sinceSeconds must be integers'}), 400
+    if (tail_lines is not None and tail_lines < 0) or (since_seconds is not None and since_seconds < 1):
+        return jsonify({'error': 'tailLines must be >= 0 and sinceSeconds >= 1'}), 400
+    follow = request.args.get('follow', 'false').lower() in ('1', 'true', 'yes')
+    
+    try:
+        if cluster_set:
+            cache = cluster_set.caches.get(request.args.get('cluster') or cluster_set.local)
+            if cache is None:
+                return jsonify({'error': f"unknown cluster {request.args.get('cluster')}"}), 404
+            _, core_v1 = cache.api_clients()
+        else:
+            _, core_v1 = k8sstatus.default_clients()
+        stream = log_streams.open(core_v1, namespace, pod, container=request.args.get('container'),
+                                  follow=follow, tail_lines=tail_lines, since_seconds=since_seconds)
+    except LogStreamBusy as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+    except ApiException as e:
+        # The API server's message says what is wrong (no such pod, container required, ...)
+        try:
+            message = json.loads(e.body)['message']
+        except (TypeError, ValueError, KeyError):
+            message = e.reason
+        return jsonify({'error': message}), e.status or 502
+    except Exception as e:
+        print(f"Error opening log stream for {namespace}/{pod}: {e}")
+        return jsonify({'error': f'Kubernetes API unreachable: {e}'}), 502
+    
+    # No Content-Length: sent chunked, each chunk as soon as the API delivers it
+    return Response(stream, mimetype='text/plain', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()})
 
 if __name__ == '__main__':
+    # Serve (and answer the readiness probe) right away rather than after the
+    # client import and first API round trip
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+    probes.start()
+    event_feed.start()
     app.run(host='0.0.0.0', port=8080, debug=False)
 
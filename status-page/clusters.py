@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Multi-cluster aggregation for the status page
+With STATUS_CONTEXTS set, every listed kubeconfig context is fetched in its
+own background thread with its own timeout and cache, and /api/status merges
+the results with a `cluster` field on every deployment and service. A slow
+or unreachable cluster keeps serving its last result (marked stale) or is
+reported as unavailable; it never holds up the other clusters or the page
+"""
+
+import os
+import threading
+import time
+
+import k8sstatus
+from anomalies import AnomalyDetector
+from health import HealthEngine
+
+# Comma-separated kubeconfig contexts; empty means the single cluster of the
+# default kubeconfig or the in-cluster service account
+STATUS_CONTEXTS = [c.strip() for c in os.getenv('STATUS_CONTEXTS', '').split(',') if c.strip()]
+STATUS_CLUSTER_CACHE_TTL = float(os.getenv('STATUS_CLUSTER_CACHE_TTL', '10'))
+STATUS_CLUSTER_TIMEOUT = float(os.getenv('STATUS_CLUSTER_TIMEOUT', '5'))
+
+
+class ClusterCache:
+    """Deployment and service status of one context with stale-while-revalidate caching
+
+    Same scheme as promquery.UsageCache: once a result exists, start_refresh()
+    runs at most one background refresh when it is older than the TTL and
+    callers keep reading the previous result meanwhile.
+    """
+
+    def __init__(self, context, ttl=STATUS_CLUSTER_CACHE_TTL, timeout=STATUS_CLUSTER_TIMEOUT):
+        self.context = context
+        self.ttl = ttl
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.refreshing = None
+        self.clients = None
+        self.health = HealthEngine()
+        self.detector = AnomalyDetector()
+        self.result = None
+        self.fetched_at = 0.0
+        self.last_error = None
+
+    def api_clients(self):
+        """Apps and core clients of this context, created on first use"""
+        if self.clients is None:
+            from kubernetes import config
+
+            self.clients = k8sstatus.api_clients(config.new_client_from_config(context=self.context))
+        return self.clients
+
+    def fetch(self):
+        """(deployments, services) of every namespace, each tagged with the cluster"""
+        apps_v1, core_v1 = self.api_clients()
+        deployments = k8sstatus.get_deployment_status(apps_v1, core_v1, engine=self.health, timeout=self.timeout,
+                                                      detector=self.detector)
+        services = k8sstatus.get_service_status(core_v1, timeout=self.timeout)
+        for item in deployments + services:
+            item['cluster'] = self.context
+        return deployments, services
+
+    def refresh(self):
+        try:
+            result = self.fetch()
+        except Exception as e:
+            with self.lock:
+                self.last_error = str(e)
+                self.refreshing = None
+            print(f"Warning: cluster {self.context}: {e}")
+            return
+        with self.lock:
+            self.result = result
+            self.fetched_at = time.monotonic()
+            self.last_error = None
+            self.refreshing = None
+
+    def start_refresh(self):
+        """Start a background refresh if the result is missing or expired; returns the running thread"""
+        with self.lock:
+            age = time.monotonic() - self.fetched_at if self.result is not None else None
+            if (age is None or age >= self.ttl) and self.refreshing is None:
+                self.refreshing = threading.Thread(target=self.refresh, name=f'cluster-{self.context}',
+                                                   daemon=True)
+                self.refreshing.start()
+            return self.refreshing
+
+    def snapshot(self):
+        """(deployments, services, state dict); empty lists while no result exists"""
+        with self.lock:
+            if self.result is None:
+                return [], [], {'status': 'unavailable', 'error': self.last_error}
+            age = time.monotonic() - self.fetched_at
+            state = {
+                'status': 'ok' if age < self.ttl * 2 and not self.last_error else 'stale',
+                'age_seconds': round(age, 1),
+            }
+            if self.last_error:
+                state['error'] = self.last_error
+            return self.result[0], self.result[1], state
+
+
+class ClusterSet:
+    """The caches of several contexts, queried concurrently and merged"""
+
+    def __init__(self, contexts, ttl=STATUS_CLUSTER_CACHE_TTL, timeout=STATUS_CLUSTER_TIMEOUT):
+        self.timeout = timeout
+        self.caches = {context: ClusterCache(context, ttl, timeout) for context in contexts}
+
+    @property
+    def local(self):
+        """The first context, the cluster whose Prometheus the usage figures come from"""
+        return next(iter(self.caches))
+
+    def ping(self):
+        """Check every API server; raises unless at least one answers within the timeout"""
+        errors = {}
+        for name, cache in self.caches.items():
+            try:
+                k8sstatus.ping(cache.api_clients()[1], timeout=self.timeout)
+            except Exception as e:
+                errors[name] = str(e)
+        reachable = len(self.caches) - len(errors)
+        if not reachable:
+            raise RuntimeError('; '.join(f'{name}: {error}' for name, error in errors.items()))
+        return f'{reachable}/{len(self.caches)} clusters reachable'
+
+    def status(self, namespace=None, cluster=None):
+        """Merged (deployments, services, state per cluster), optionally of one namespace or cluster
+
+        Refreshes run in parallel; only clusters that have never answered are
+        waited for, and all of them together for at most one timeout.
+        """
+        caches = {name: cache for name, cache in self.caches.items() if cluster in (None, name)}
+        threads = [(cache, cache.start_refresh()) for cache in caches.values()]
+        deadline = time.monotonic() + self.timeout
+        for cache, thread in threads:
+            if thread is not None and cache.result is None:
+                thread.join(max(0.0, deadline - time.monotonic()))
+
+        deployments, services, states = [], [], {}
+        for name, cache in caches.items():
+            cluster_deployments, cluster_services, states[name] = cache.snapshot()
+            # Copies: callers add usage figures to the rows and pods
+            deployments += [dict(d, pods=[dict(p) for p in d['pods']]) for d in cluster_deployments
+                            if namespace in (None, d['namespace'])]
+            services += [dict(s) for s in cluster_services if namespace in (None, s['namespace'])]
+        return deployments, services, states
+
+    def anomalies(self, namespace=None, cluster=None):
+        """Anomalies of every cluster (or one), newest first, each tagged with its cluster"""
+        found = []
+        for name, cache in self.caches.items():
+            if cluster in (None, name):
+                found += [dict(a, cluster=name) for a in cache.detector.anomalies(namespace)]
+        found.sort(key=lambda a: a['since'], reverse=True)
+        return found
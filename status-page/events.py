@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Kubernetes Events for the status page
+A background watch folds every Event into a bounded store, compacted by
+(involved object, reason): a pod in CrashLoopBackOff is one BackOff entry
+with a count and first/last timestamps, however many Event objects the
+kubelet emits. Entries are indexed by namespace, object and owning
+deployment, and the least recently updated ones are evicted beyond
+EVENTS_MAX_ENTRIES or after EVENTS_MAX_AGE seconds, so a noisy cluster
+can't grow the store without bound
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+EVENTS_MAX_ENTRIES = int(os.getenv('EVENTS_MAX_ENTRIES', '5000'))
+EVENTS_MAX_AGE = float(os.getenv('EVENTS_MAX_AGE', '3600'))
+
+# Event messages are cut to this many characters
+EVENTS_MAX_MESSAGE = 512
+
+# Event objects remembered per entry to tell a repeat (count moved) from a
+# re-delivery of the same object (watch re-list, MODIFIED without change)
+EVENTS_SOURCES_PER_ENTRY = 8
+
+# Events per page when (re-)listing, and the server-side watch timeout
+EVENTS_LIST_PAGE = 500
+WATCH_TIMEOUT = 300
+
+
+def event_time(value):
+    """Epoch seconds of an RFC 3339 timestamp (Time or MicroTime), or None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def owner_deployment(kind, name):
+    """Name of the deployment an object probably belongs to, from the naming scheme
+
+    ReplicaSets are named <deployment>-<hash> and their pods
+    <deployment>-<hash>-<suffix>. A bare pod with two dashes in its name
+    is attributed to a deployment that may not exist, which only matters if
+    one of that name does.
+    """
+    if kind == 'Deployment':
+        return name
+    if kind == 'ReplicaSet' and '-' in name:
+        return name.rsplit('-', 1)[0]
+    if kind == 'Pod':
+        parts = name.rsplit('-', 2)
+        return parts[0] if len(parts) == 3 else None
+    return None
+
+
+class EventEntry:
+    """The compacted Events of one (namespace, kind, name, reason)"""
+
+    __slots__ = ('key', 'deployment', 'type', 'message', 'count', 'first_seen', 'last_seen', 'sources',
+                 'updated_at')
+
+    def __init__(self, key, deployment):
+        self.key = key
+        self.deployment = deployment
+        self.type = None
+        self.message = ''
+        self.count = 0
+        self.first_seen = None
+        self.last_seen = None
+        self.sources = {}
+        self.updated_at = 0.0
+
+    def to_dict(self):
+        namespace, kind, name, reason = self.key
+        return {
+            'namespace': namespace,
+            'object': {'kind': kind, 'name': name},
+            'reason': reason,
+            'type': self.type,
+            'message': self.message,
+            'count': self.count,
+            'first_seen': datetime.utcfromtimestamp(self.first_seen).isoformat() if self.first_seen else None,
+            'last_seen': datetime.utcfromtimestamp(self.last_seen).isoformat() if self.last_seen else None,
+        }
+
+
+class EventStore:
+    """Bounded, compacted Events indexed by namespace, object and deployment
+
+    add() takes an Event object as raw JSON. Entries are kept in update
+    order, so evicting the stalest one and expiring old ones is O(1) per
+    entry removed.
+    """
+
+    def __init__(self, max_entries=EVENTS_MAX_ENTRIES, max_age=EVENTS_MAX_AGE):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.by_namespace = {}
+        self.by_object = {}
+        self.by_deployment = {}
+        self.evicted = 0
+
+    def add(self, obj):
+        involved = obj.get('involvedObject') or {}
+        namespace = involved.get('namespace') or (obj.get('metadata') or {}).get('namespace')
+        kind, name = involved.get('kind'), involved.get('name')
+        if not kind or not name:
+            return
+        key = (namespace, kind, name, obj.get('reason') or '')
+        series = obj.get('series') or {}
+        count = series.get('count') or obj.get('count') or 1
+        first = event_time(obj.get('firstTimestamp') or obj.get('eventTime'))
+        last = event_time(series.get('lastObservedTime') or obj.get('lastTimestamp') or obj.get('eventTime')) or first
+        uid = (obj.get('metadata') or {}).get('uid')
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = EventEntry(key, owner_deployment(kind, name))
+                self.entries[key] = entry
+                self.index(entry)
+            else:
+                self.entries.move_to_end(key)
+            # Only what the Event object's count grew by beyond the highest seen
+            seen = entry.sources.pop(uid, 0)
+            delta = count - seen
+            entry.sources[uid] = max(count, seen)
+            if len(entry.sources) > EVENTS_SOURCES_PER_ENTRY:
+                del entry.sources[next(iter(entry.sources))]
+            if delta > 0:
+                entry.count += delta
+            if first and (entry.first_seen is None or first < entry.first_seen):
+                entry.first_seen = first
+            # Type and message of the latest occurrence (or of any, without timestamps)
+            if last is None or entry.last_seen is None or last >= entry.last_seen:
+                entry.last_seen = last or entry.last_seen
+                entry.type = obj.get('type')
+                entry.message = (obj.get('message') or '')[:EVENTS_MAX_MESSAGE]
+            entry.updated_at = time.monotonic()
+            self.prune(entry.updated_at)
+
+    def index(self, entry):
+        namespace, kind, name, _ = entry.key
+        self.by_namespace.setdefault(namespace, {})[entry.key] = entry
+        self.by_object.setdefault((namespace, kind, name), {})[entry.key] = entry
+        if entry.deployment:
+            self.by_deployment.setdefault((namespace, entry.deployment), {})[entry.key] = entry
+
+    def unindex(self, entry):
+        namespace, kind, name, _ = entry.key
+        for index, index_key in ((self.by_namespace, namespace), (self.by_object, (namespace, kind, name)),
+                                 (self.by_deployment, (namespace, entry.deployment))):
+            bucket = index.get(index_key)
+            if bucket is not None:
+                bucket.pop(entry.key, None)
+                if not bucket:
+                    del index[index_key]
+
+    def prune(self, now):
+        """Drop the least recently updated entries beyond the size and age limits (lock held)"""
+        while self.entries:
+            oldest = next(iter(self.entries.values()))
+            if len(self.entries) <= self.max_entries and now - oldest.updated_at <= self.max_age:
+                break
+            del self.entries[oldest.key]
+            self.unindex(oldest)
+            self.evicted += 1
+
+    def query(self, namespace=None, deployment=None, kind=None, name=None, warnings_only=False, limit=50):
+        """Newest entries first, of one deployment or object, one namespace, or everything"""
+        with self.lock:
+            self.prune(time.monotonic())
+            if deployment is not None:
+                entries = list(self.by_deployment.get((namespace, deployment), {}).values())
+            elif kind is not None and name is not None:
+                entries = list(self.by_object.get((namespace, kind, name), {}).values())
+            elif namespace is not None:
+                entries = list(self.by_namespace.get(namespace, {}).values())
+            else:
+                entries = list(self.entries.values())
+            if warnings_only:
+                entries = [e for e in entries if e.type == 'Warning']
+            entries.sort(key=lambda e: e.last_seen or 0, reverse=True)
+            return [e.to_dict() for e in entries[:limit]]
+
+    def warning_counts(self):
+        """(namespace, deployment) -> number of Warning entries, for the deployment rows"""
+        with self.lock:
+            return {key: sum(1 for e in bucket.values() if e.type == 'Warning')
+                    for key, bucket in self.by_deployment.items()}
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'evicted': self.evicted, 'max_entries': self.max_entries}
+
+
+class EventFeed:
+    """Background list + watch of every namespace's Events into an EventStore
+
+    Like ClusterState.watch: the raw JSON event stream is resumed from the
+    last resourceVersion and re-listed (in pages) when the API server
+    answers 410 Gone. Re-delivered Events don't inflate the counts.
+    """
+
+    def __init__(self, core_v1_factory, store=None):
+        self.core_v1_factory = core_v1_factory
+        self.store = store if store is not None else EventStore()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.synced = False
+        self.last_error = None
+
+    def list_all(self, core_v1):
+        """Add every current Event; returns the list's resourceVersion"""
+        token = None
+        while True:
+            kwargs = {'_continue': token} if token else {}
+            response = core_v1.list_event_for_all_namespaces(limit=EVENTS_LIST_PAGE, _preload_content=False,
+                                                             **kwargs)
+            body = json.loads(response.data)
+            for obj in body.get('items') or []:
+                self.store.add(obj)
+            token = body['metadata'].get('continue')
+            if not token:
+                return body['metadata'].get('resourceVersion')
+
+    def run(self):
+        from kubernetes.client.rest import ApiException
+        from kubernetes.watch.watch import iter_resp_lines
+
+        core_v1 = None
+        resource_version = None
+        while True:
+            try:
+                if core_v1 is None:
+                    core_v1 = self.core_v1_factory()
+                if resource_version is None:
+                    resource_version = self.list_all(core_v1)
+                    self.synced = True
+                response = core_v1.list_event_for_all_namespaces(
+                    watch=True, resource_version=resource_version, allow_watch_bookmarks=True,
+                    timeout_seconds=WATCH_TIMEOUT, _preload_content=False)
+                self.last_error = None
+                try:
+                    for line in iter_resp_lines(response):
+                        event = json.loads(line)
+                        obj = event['object']
+                        if event['type'] == 'ERROR':
+                            raise ApiException(status=obj.get('code'), reason=obj.get('message'))
+                        resource_version = obj['metadata'].get('resourceVersion', resource_version)
+                        # Deleted Events (their TTL ran out) stay until the store evicts them
+                        if event['type'] in ('ADDED', 'MODIFIED'):
+                            self.store.add(obj)
+                finally:
+                    response.release_conn()
+            except ApiException as e:
+                if e.status != 410:
+                    self.last_error = str(e.reason)
+                    time.sleep(5)
+                resource_version = None
+            except Exception as e:
+                # Dropped connection: resume from the last event seen
+                self.last_error = str(e)
+                time.sleep(1 if resource_version else 5)
+
+    def start(self):
+        """Start the watch thread (idempotent)"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='watch-events', daemon=True)
+                self.thread.start()
+
+    def state(self):
+        """Feed status (ok, starting or error) and store size, for the API responses"""
+        if self.last_error:
+            state = {'status': 'error', 'error': self.last_error}
+        else:
+            state = {'status': 'ok' if self.synced else 'starting'}
+        state.update(self.store.stats())
+        return state
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Deployment health classification
+Derives a deployment's status (Healthy / Degraded / Unavailable / Unknown)
+and rollout state (Up to date / Updating / Update Failed / Unavailable) from
+the few fields that decide them. HealthEngine caches the result per
+resourceVersion and keeps the per-status counts current, so a relist or a
+watch event only reclassifies the deployments that actually changed
+"""
+
+import threading
+from typing import NamedTuple, Optional
+
+STATUSES = ('Healthy', 'Degraded', 'Unavailable', 'Unknown')
+
+
+class DeploymentFacts(NamedTuple):
+    """The fields of a Deployment that its health depends on"""
+    namespace: str
+    name: str
+    resource_version: Optional[str]
+    generation: Optional[int]
+    observed_generation: Optional[int]
+    desired: Optional[int]
+    replicas: Optional[int]
+    ready: Optional[int]
+    available: Optional[int]
+    unavailable: Optional[int]
+    updated: Optional[int]
+    # (type, status, reason) of each status condition
+    conditions: tuple = ()
+    has_status: bool = True
+
+
+class Health(NamedTuple):
+    status: str
+    update_status: str
+
+
+def facts_from_model(deployment) -> DeploymentFacts:
+    """DeploymentFacts of a kubernetes.client V1Deployment"""
+    metadata, spec, status = deployment.metadata, deployment.spec, deployment.status
+    desired = spec.replicas if spec else None
+    if status is None:
+        return DeploymentFacts(metadata.namespace, metadata.name, metadata.resource_version,
+                               metadata.generation, None, desired, None, None, None, None, None, (), False)
+    conditions = tuple((c.type, c.status, c.reason) for c in status.conditions) if status.conditions else ()
+    return DeploymentFacts(metadata.namespace, metadata.name, metadata.resource_version, metadata.generation,
+                           status.observed_generation, desired, status.replicas, status.ready_replicas,
+                           status.available_replicas, status.unavailable_replicas, status.updated_replicas,
+                           conditions)
+
+
+def facts_from_json(obj: dict) -> DeploymentFacts:
+    """DeploymentFacts of a Deployment as parsed from the API's JSON"""
+    metadata, spec, status = obj['metadata'], obj.get('spec') or {}, obj.get('status')
+    if status is None:
+        return DeploymentFacts(metadata.get('namespace'), metadata['name'], metadata.get('resourceVersion'),
+                               metadata.get('generation'), None, spec.get('replicas'),
+                               None, None, None, None, None, (), False)
+    conditions = tuple((c.get('type'), c.get('status'), c.get('reason')) for c in status.get('conditions') or ())
+    return DeploymentFacts(metadata.get('namespace'), metadata['name'], metadata.get('resourceVersion'),
+                           metadata.get('generation'), status.get('observedGeneration'), spec.get('replicas'),
+                           status.get('replicas'), status.get('readyReplicas'), status.get('availableReplicas'),
+                           status.get('unavailableReplicas'), status.get('updatedReplicas'), conditions)
+
+
+def classify(facts: DeploymentFacts) -> Health:
+    """Status and rollout state of one deployment
+
+    The API server omits zero counts from DeploymentStatus and a missing
+    spec.replicas defaults to 1, so None is read accordingly rather than
+    compared as-is.
+    """
+    if not facts.has_status:
+        return Health('Unknown', 'Up to date')
+    desired = 1 if facts.desired is None else facts.desired
+    replicas = facts.replicas or 0
+    ready = facts.ready or 0
+    available = facts.available or 0
+    updated = facts.updated or 0
+
+    if desired == 0 or (ready >= desired and available >= desired):
+        status = 'Healthy'
+    elif available == 0 and ready == 0:
+        status = 'Unavailable'
+    else:
+        status = 'Degraded'
+
+    # Same checks as `kubectl rollout status`
+    conditions = {ctype: (cstatus, reason) for ctype, cstatus, reason in facts.conditions}
+    progressing = conditions.get('Progressing')
+    if progressing and progressing[1] == 'ProgressDeadlineExceeded':
+        update_status = 'Update Failed'
+    elif conditions.get('Available', ('True',))[0] == 'False':
+        update_status = 'Unavailable'
+    elif ((facts.generation or 0) > (facts.observed_generation or 0)
+          or updated < desired or replicas > updated or available < updated):
+        update_status = 'Updating'
+    else:
+        update_status = 'Up to date'
+    return Health(status, update_status)
+
+
+class HealthEngine:
+    """Classification cache keyed by (namespace, name), valid for one resourceVersion
+
+    classify() returns the cached Health when the resourceVersion is
+    unchanged; apply() folds in a watch event and sync() a full list, both
+    keeping counts (deployments per status) current without a rescan.
+    Request threads share one engine, so the cache is only touched under
+    the lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.counts = dict.fromkeys(STATUSES, 0)
+        self.classified = 0
+
+    # The underscore methods expect the lock to be held
+
+    def _store(self, key, resource_version, health):
+        previous = self.cache.get(key)
+        if previous is not None:
+            self.counts[previous[1].status] -= 1
+        self.cache[key] = (resource_version, health)
+        self.counts[health.status] += 1
+
+    def _forget(self, key):
+        previous = self.cache.pop(key, None)
+        if previous is not None:
+            self.counts[previous[1].status] -= 1
+
+    def _cached(self, key, resource_version) -> Optional[Health]:
+        cached = self.cache.get(key)
+        if cached is not None and resource_version is not None and cached[0] == resource_version:
+            return cached[1]
+        return None
+
+    def _classify(self, facts: DeploymentFacts) -> Health:
+        key = (facts.namespace, facts.name)
+        health = self._cached(key, facts.resource_version)
+        if health is None:
+            health = classify(facts)
+            self.classified += 1
+            self._store(key, facts.resource_version, health)
+        return health
+
+    def _retain(self, present, namespace):
+        stale = [key for key in self.cache if key not in present and (namespace is None or key[0] == namespace)]
+        for key in stale:
+            self._forget(key)
+
+    def classify(self, facts: DeploymentFacts) -> Health:
+        with self.lock:
+            return self._classify(facts)
+
+    def classify_model(self, deployment) -> Health:
+        """classify() for a V1Deployment, skipping field extraction on a cache hit"""
+        metadata = deployment.metadata
+        with self.lock:
+            health = self._cached((metadata.namespace, metadata.name), metadata.resource_version)
+        return health if health is not None else self.classify(facts_from_model(deployment))
+
+    def forget(self, namespace: str, name: str):
+        with self.lock:
+            self._forget((namespace, name))
+
+    def apply(self, event_type: str, facts: DeploymentFacts) -> bool:
+        """Fold in a watch event; returns True if the deployment's health changed"""
+        key = (facts.namespace, facts.name)
+        with self.lock:
+            before = self.cache.get(key)
+            if event_type == 'DELETED':
+                self._forget(key)
+                return before is not None
+            health = self._classify(facts)
+        return before is None or before[1] != health
+
+    def retain(self, present, namespace: Optional[str] = None):
+        """Forget deployments (of one namespace, or all) whose (namespace, name) is not in `present`"""
+        with self.lock:
+            self._retain(present, namespace)
+
+    def sync(self, facts_list, namespace: Optional[str] = None) -> list:
+        """Classify a full list (of one namespace, or all) and drop deployments no longer in it"""
+        with self.lock:
+            results = [self._classify(facts) for facts in facts_list]
+            self._retain({(facts.namespace, facts.name) for facts in facts_list}, namespace)
+        return results
+
+    def status_counts(self) -> dict:
+        """Copy of counts, consistent with the cache"""
+        with self.lock:
+            return dict(self.counts)
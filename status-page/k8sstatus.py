@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Deployment and service status from the Kubernetes API
+Shared by the status page and status-cli.py. Each call lists every resource
+kind once (deployments, pods, services, endpoints) and joins them locally
+instead of issuing a pod or endpoints request per object; ClusterState keeps
+the same data current from watch events for the CLI's --watch mode.
+Responses are read as raw JSON (_preload_content=False) and reduced to
+small tuple records holding only the fields the status page shows, instead
+of being deserialized into the client's full OpenAPI models. The kubernetes
+package itself (~0.4s to import) is only imported once a client is needed
+"""
+
+import json
+import threading
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from health import DeploymentFacts, HealthEngine, facts_from_json
+
+# Server-side timeout of one watch request; the watch is re-opened from the
+# last resourceVersion seen
+WATCH_TIMEOUT = 300
+
+# Classifications survive between requests; only deployments whose
+# resourceVersion moved are reclassified
+health_engine = HealthEngine()
+
+
+class DeploymentRecord(NamedTuple):
+    namespace: str
+    name: str
+    resource_version: Optional[str]
+    match_labels: dict
+    images: tuple
+    created: Optional[str]
+    facts: DeploymentFacts
+
+
+class PodRecord(NamedTuple):
+    namespace: str
+    name: str
+    resource_version: Optional[str]
+    labels: dict
+    phase: str
+    ready: bool
+    restarts: int
+    node: Optional[str]
+    # Epoch seconds of the most recent container termination
+    # (lastState.terminated.finishedAt), when any container has restarted
+    last_terminated: Optional[float] = None
+
+
+class ServiceRecord(NamedTuple):
+    namespace: str
+    name: str
+    resource_version: Optional[str]
+    type: Optional[str]
+    ports: tuple
+    cluster_ip: Optional[str]
+    external_ip: Optional[str]
+
+
+class EndpointsRecord(NamedTuple):
+    namespace: str
+    name: str
+    resource_version: Optional[str]
+    addresses: int
+
+
+def load_kube_config(context=None):
+    """Load kubeconfig, falling back to the in-cluster service account"""
+    from kubernetes import config
+
+    try:
+        config.load_kube_config(context=context)
+    except Exception:
+        try:
+            config.load_incluster_config()
+        except Exception:
+            print("Warning: Could not load kubeconfig")
+
+
+def timestamp(value):
+    """RFC 3339 timestamp as the client models' datetime.isoformat() rendered it"""
+    return value[:-1] + '+00:00' if value and value.endswith('Z') else value
+
+
+def epoch(value):
+    """Epoch seconds of an RFC 3339 timestamp, or None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def deployment_record(obj) -> DeploymentRecord:
+    metadata, spec = obj['metadata'], obj.get('spec') or {}
+    containers = ((spec.get('template') or {}).get('spec') or {}).get('containers') or []
+    return DeploymentRecord(
+        metadata.get('namespace'), metadata['name'], metadata.get('resourceVersion'),
+        (spec.get('selector') or {}).get('matchLabels') or {},
+        tuple(c.get('image') for c in containers),
+        timestamp(metadata.get('creationTimestamp')),
+        facts_from_json(obj),
+    )
+
+
+def pod_record(obj) -> PodRecord:
+    metadata, status = obj['metadata'], obj.get('status') or {}
+    statuses = status.get('containerStatuses') or []
+    return PodRecord(
+        metadata.get('namespace'), metadata['name'], metadata.get('resourceVersion'),
+        metadata.get('labels') or {},
+        status.get('phase') or "Unknown",
+        any(c.get('ready') for c in statuses),
+        sum(c.get('restartCount', 0) for c in statuses),
+        (obj.get('spec') or {}).get('nodeName'),
+        max(filter(None, (epoch(((c.get('lastState') or {}).get('terminated') or {}).get('finishedAt'))
+                          for c in statuses)), default=None),
+    )
+
+
+def service_record(obj) -> ServiceRecord:
+    metadata, spec = obj['metadata'], obj.get('spec') or {}
+    ingress = ((obj.get('status') or {}).get('loadBalancer') or {}).get('ingress')
+    return ServiceRecord(
+        metadata.get('namespace'), metadata['name'], metadata.get('resourceVersion'),
+        spec.get('type'),
+        tuple(f"{p.get('port')}/{p.get('protocol', 'TCP')}" for p in spec.get('ports') or []),
+        spec.get('clusterIP'),
+        (ingress[0].get('hostname') or ingress[0].get('ip')) if ingress else None,
+    )
+
+
+def endpoints_record(obj) -> EndpointsRecord:
+    metadata, subsets = obj['metadata'], obj.get('subsets')
+    return EndpointsRecord(metadata.get('namespace'), metadata['name'], metadata.get('resourceVersion'),
+                           len(subsets[0].get('addresses') or []) if subsets else 0)
+
+
+RECORDS = {
+    'deployments': deployment_record,
+    'pods': pod_record,
+    'services': service_record,
+    'endpoints': endpoints_record,
+}
+
+
+def selector_matches(match_labels, labels):
+    """Whether a deployment's matchLabels select a pod with `labels`"""
+    return bool(match_labels) and all(labels.get(k) == v for k, v in match_labels.items())
+
+
+def pod_summary(pod: PodRecord):
+    return {'name': pod.name, 'status': pod.phase, 'ready': pod.ready, 'restarts': pod.restarts, 'node': pod.node}
+
+
+def deployment_summary(deployment: DeploymentRecord, pods, engine=health_engine):
+    """Status dict of one deployment; `pods` are the pod records in its namespace"""
+    facts = deployment.facts
+    health = engine.classify(facts)
+    return {
+        'name': deployment.name,
+        'namespace': deployment.namespace,
+        'replicas': {
+            'desired': facts.desired,
+            'ready': facts.ready or 0,
+            'available': facts.available or 0,
+            'unavailable': facts.unavailable or 0,
+        },
+        'status': health.status,
+        'update_status': health.update_status,
+        'images': list(deployment.images),
+        'pods': [pod_summary(pod) for pod in pods if selector_matches(deployment.match_labels, pod.labels)],
+        'created': deployment.created,
+        'updated': facts.updated or 0,
+    }
+
+
+def service_summary(service: ServiceRecord, endpoints: Optional[EndpointsRecord]):
+    """Status dict of one service; `endpoints` is its Endpoints record or None"""
+    endpoint_count = endpoints.addresses if endpoints else 0
+    return {
+        'name': service.name,
+        'namespace': service.namespace,
+        'type': service.type,
+        'ports': list(service.ports),
+        'endpoints': endpoint_count,
+        'status': "Available" if endpoint_count > 0 else "No Endpoints",
+        'cluster_ip': service.cluster_ip,
+        'external_ip': service.external_ip,
+    }
+
+
+def list_function(kind, apps_v1, core_v1, namespace=None):
+    """The list call for a resource kind, namespaced or cluster-wide (also used to watch it)"""
+    api, namespaced, cluster_wide = {
+        'deployments': (apps_v1, 'list_namespaced_deployment', 'list_deployment_for_all_namespaces'),
+        'pods': (core_v1, 'list_namespaced_pod', 'list_pod_for_all_namespaces'),
+        'services': (core_v1, 'list_namespaced_service', 'list_service_for_all_namespaces'),
+        'endpoints': (core_v1, 'list_namespaced_endpoints', 'list_endpoints_for_all_namespaces'),
+    }[kind]
+    if namespace:
+        list_namespaced = getattr(api, namespaced)
+        return lambda **kwargs: list_namespaced(namespace, **kwargs)
+    return getattr(api, cluster_wide)
+
+
+def list_records(kind, apps_v1, core_v1, namespace=None, timeout=None):
+    """(records, list resourceVersion) of one kind, parsed straight from the response JSON"""
+    response = list_function(kind, apps_v1, core_v1, namespace)(_preload_content=False, _request_timeout=timeout)
+    body = json.loads(response.data)
+    make_record = RECORDS[kind]
+    return [make_record(obj) for obj in body.get('items') or []], body['metadata'].get('resourceVersion')
+
+
+def by_namespace(records):
+    grouped = {}
+    for record in records:
+        grouped.setdefault(record.namespace, []).append(record)
+    return grouped
+
+
+def get_deployment_status(apps_v1, core_v1, namespace=None, engine=health_engine, timeout=None, detector=None):
+    """Status of all deployments: one deployment list and one pod list
+
+    `engine` holds the classifications between calls (one per cluster);
+    `timeout` bounds each API request in seconds. The records are also fed
+    to `detector` (an anomalies.AnomalyDetector) when one is given.
+    """
+    deployments, _ = list_records('deployments', apps_v1, core_v1, namespace, timeout)
+    pod_records, _ = list_records('pods', apps_v1, core_v1, namespace, timeout)
+    pods = by_namespace(pod_records)
+    summaries = [deployment_summary(d, pods.get(d.namespace, []), engine) for d in deployments]
+    # Drop classifications of deployments that have been deleted
+    engine.retain({(d.namespace, d.name) for d in deployments}, namespace)
+    if detector is not None:
+        detector.sync(deployments, pod_records, namespace)
+    return summaries
+
+
+def get_service_status(core_v1, namespace=None, timeout=None):
+    """Status of all services: one service list and one endpoints list"""
+    services, _ = list_records('services', None, core_v1, namespace, timeout)
+    endpoints = {(e.namespace, e.name): e for e in list_records('endpoints', None, core_v1, namespace, timeout)[0]}
+    return [service_summary(s, endpoints.get((s.namespace, s.name))) for s in services]
+
+
+class ClusterState:
+    """Deployments, pods, services and endpoints kept current from watch events
+
+    load() lists every kind once; apply() folds in one watch event and marks
+    only the deployments or services it can affect, so a pod restart
+    recomputes one deployment row rather than the whole table. A `detector`
+    (anomalies.AnomalyDetector), when given, gets the same lists and events,
+    so deletions reach it as DELETED events rather than through a rescan.
+    """
+
+    KINDS = ('deployments', 'pods', 'services', 'endpoints')
+
+    def __init__(self, apps_v1, core_v1, namespace=None, detector=None):
+        self.apps_v1 = apps_v1
+        self.core_v1 = core_v1
+        self.namespace = namespace
+        self.objects = {kind: {} for kind in self.KINDS}
+        self.resource_versions = {}
+        self.deployment_rows = {}
+        self.service_rows = {}
+        self.dirty_deployments = set()
+        self.dirty_services = set()
+        self.health = HealthEngine()
+        self.detector = detector
+
+    def reset(self, kind, records, resource_version):
+        """Replace every record of a kind (initial list, or re-list after the watch expired)"""
+        self.objects[kind] = {(r.namespace, r.name): r for r in records}
+        self.resource_versions[kind] = resource_version
+        if kind == 'deployments':
+            self.health.sync([r.facts for r in records], self.namespace)
+        if self.detector is not None and kind in ('deployments', 'pods'):
+            self.detector.sync_kind(kind, records, self.namespace)
+        if kind in ('deployments', 'pods'):
+            self.deployment_rows.clear()
+            self.dirty_deployments = set(self.objects['deployments'])
+        else:
+            self.service_rows.clear()
+            self.dirty_services = set(self.objects['services'])
+
+    def load(self):
+        for kind in self.KINDS:
+            self.reset(kind, *list_records(kind, self.apps_v1, self.core_v1, self.namespace))
+
+    def apply(self, kind, event_type, record):
+        """Fold in one watch event (ADDED, MODIFIED or DELETED)"""
+        key = (record.namespace, record.name)
+        store = self.objects[kind]
+        previous = store.get(key)
+        if event_type == 'DELETED':
+            store.pop(key, None)
+        else:
+            store[key] = record
+        self.resource_versions[kind] = record.resource_version
+        if self.detector is not None and kind in ('deployments', 'pods'):
+            self.detector.apply(kind, event_type, record)
+
+        if kind == 'deployments':
+            self.health.apply(event_type, record.facts)
+            self.dirty_deployments.add(key)
+        elif kind == 'pods':
+            # Deployments selecting the pod before or after the change
+            labels = [r.labels for r in (previous, record) if r is not None]
+            for dkey, deployment in self.objects['deployments'].items():
+                if dkey[0] == key[0] and any(selector_matches(deployment.match_labels, l) for l in labels):
+                    self.dirty_deployments.add(dkey)
+        else:
+            self.dirty_services.add(key)
+
+    def deployment_status(self):
+        pods = None
+        for key in self.dirty_deployments:
+            deployment = self.objects['deployments'].get(key)
+            if deployment is None:
+                self.deployment_rows.pop(key, None)
+                continue
+            if pods is None:
+                pods = by_namespace(self.objects['pods'].values())
+            self.deployment_rows[key] = deployment_summary(deployment, pods.get(key[0], []), self.health)
+        self.dirty_deployments = set()
+        return [self.deployment_rows[key] for key in sorted(self.deployment_rows)]
+
+    def service_status(self):
+        for key in self.dirty_services:
+            service = self.objects['services'].get(key)
+            if service is None:
+                self.service_rows.pop(key, None)
+                continue
+            self.service_rows[key] = service_summary(service, self.objects['endpoints'].get(key))
+        self.dirty_services = set()
+        return [self.service_rows[key] for key in sorted(self.service_rows)]
+
+    def watch(self, kind, events, stop):
+        """Feed (kind, event type, record) tuples for one kind into the `events` queue until `stop`
+
+        Runs in its own thread. Event lines are parsed as raw JSON like the
+        lists. When the API server has compacted past the last
+        resourceVersion (410 Gone) the kind is listed again and sent as a
+        ('reset', kind, (records, resourceVersion)) tuple.
+        """
+        from kubernetes.client.rest import ApiException
+        from kubernetes.watch.watch import iter_resp_lines
+
+        list_kind = list_function(kind, self.apps_v1, self.core_v1, self.namespace)
+        make_record = RECORDS[kind]
+        resource_version = self.resource_versions[kind]
+        while not stop.is_set():
+            try:
+                response = list_kind(watch=True, resource_version=resource_version, allow_watch_bookmarks=True,
+                                     timeout_seconds=WATCH_TIMEOUT, _preload_content=False)
+                try:
+                    for line in iter_resp_lines(response):
+                        if stop.is_set():
+                            return
+                        event = json.loads(line)
+                        obj = event['object']
+                        if event['type'] == 'ERROR':
+                            raise ApiException(status=obj.get('code'), reason=obj.get('message'))
+                        resource_version = obj['metadata'].get('resourceVersion', resource_version)
+                        if event['type'] != 'BOOKMARK':
+                            events.put((kind, event['type'], make_record(obj)))
+                finally:
+                    response.release_conn()
+            except ApiException as e:
+                if e.status != 410:
+                    stop.wait(5)
+                try:
+                    records, resource_version = list_records(kind, self.apps_v1, self.core_v1, self.namespace)
+                except Exception:
+                    stop.wait(5)
+                    continue
+                events.put(('reset', kind, (records, resource_version)))
+            except Exception:
+                # Dropped connection: resume from the last event seen
+                stop.wait(1)
+
+    def start_watches(self, events, stop):
+        for kind in self.KINDS:
+            threading.Thread(target=self.watch, args=(kind, events, stop), daemon=True,
+                             name=f'watch-{kind}').start()
+
+
+def api_clients(api_client=None):
+    """Apps and core API clients, for the loaded config or an explicit ApiClient"""
+    from kubernetes import client
+
+    return client.AppsV1Api(api_client), client.CoreV1Api(api_client)
+
+
+def ping(core_v1, timeout=None):
+    """The API server's version string (raises if it can't be reached in time)"""
+    from kubernetes import client
+
+    version = client.VersionApi(core_v1.api_client).get_code(_request_timeout=timeout)
+    return version.git_version
+
+
+_default_clients = None
+_default_clients_lock = threading.Lock()
+
+
+def default_clients():
+    """api_clients() of the default kubeconfig or service account, loaded on first use"""
+    global _default_clients
+    with _default_clients_lock:
+        if _default_clients is None:
+            load_kube_config()
+            _default_clients = api_clients()
+        return _default_clients
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Bounded pod log streaming for the status page
+/api/logs/<namespace>/<pod> relays a pod's log from the Kubernetes API chunk
+by chunk as it arrives. Every stream stops after LOG_STREAM_MAX_BYTES or
+when the pod has been silent for LOG_STREAM_IDLE_TIMEOUT seconds, and at most
+LOG_STREAM_MAX_CONCURRENT streams are open at once, so operators tailing
+noisy pods can't exhaust the page's memory or its API server connections.
+Only pods in LOG_NAMESPACES can be tailed
+"""
+
+import os
+import threading
+
+LOG_STREAM_MAX_BYTES = int(os.getenv('LOG_STREAM_MAX_BYTES', str(4 * 1024 * 1024)))
+LOG_STREAM_IDLE_TIMEOUT = float(os.getenv('LOG_STREAM_IDLE_TIMEOUT', '60'))
+LOG_STREAM_MAX_CONCURRENT = int(os.getenv('LOG_STREAM_MAX_CONCURRENT', '8'))
+LOG_STREAM_CONNECT_TIMEOUT = float(os.getenv('LOG_STREAM_CONNECT_TIMEOUT', '5'))
+# Namespaces whose pod logs may be streamed (comma-separated; empty disables
+# /api/logs). The page has no login, so never list kube-system, monitoring or
+# anything else whose logs hold secrets
+LOG_NAMESPACES = [ns.strip() for ns in os.getenv('LOG_NAMESPACES', '').split(',') if ns.strip()]
+
+# Largest chunk read from the API server (and held in memory) per stream
+LOG_CHUNK_SIZE = 16 * 1024
+
+
+class LogStreamBusy(Exception):
+    """Every log stream slot is taken"""
+
+
+class LogStream:
+    """Iterable of one pod's log chunks; close() ends the stream and frees its slot
+
+    Chunks are read from the API server only as the client consumes them
+    (the WSGI server pulls the next one after writing the previous), so a
+    slow reader holds back the upstream connection rather than buffering.
+    WSGI servers call close() when the response ends, also if the client
+    went away before the end.
+    """
+
+    def __init__(self, upstream, max_bytes, on_close):
+        self.upstream = upstream
+        self.max_bytes = max_bytes
+        self.on_close = on_close
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def __iter__(self):
+        from urllib3.exceptions import HTTPError, ReadTimeoutError
+
+        sent = 0
+        try:
+            for chunk in self.upstream.stream(LOG_CHUNK_SIZE):
+                if sent + len(chunk) >= self.max_bytes:
+                    yield chunk[:self.max_bytes - sent]
+                    yield f'\n[log stream stopped after {self.max_bytes} bytes]\n'.encode()
+                    return
+                sent += len(chunk)
+                yield chunk
+        except ReadTimeoutError:
+            yield b'\n[log stream closed: no output for the idle timeout]\n'
+        except HTTPError as e:
+            yield f'\n[log stream interrupted: {e}]\n'.encode()
+        finally:
+            self.close()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        # Mid-stream, so the connection can't go back to the pool
+        self.upstream.close()
+        self.on_close()
+
+
+class LogStreams:
+    """Opens pod log streams, at most max_concurrent at a time"""
+
+    def __init__(self, max_concurrent=LOG_STREAM_MAX_CONCURRENT, max_bytes=LOG_STREAM_MAX_BYTES,
+                 idle_timeout=LOG_STREAM_IDLE_TIMEOUT, connect_timeout=LOG_STREAM_CONNECT_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+
+    def open(self, core_v1, namespace, pod, container=None, follow=False, tail_lines=None, since_seconds=None):
+        """LogStream of a pod's log; raises LogStreamBusy, or the client's error if the API refuses"""
+        if not self.slots.acquire(blocking=False):
+            raise LogStreamBusy(f'{self.max_concurrent} log streams are already open, try again shortly')
+        try:
+            kwargs = {'follow': follow}
+            if container:
+                kwargs['container'] = container
+            if tail_lines is not None:
+                kwargs['tail_lines'] = tail_lines
+            if since_seconds is not None:
+                kwargs['since_seconds'] = since_seconds
+            # The read timeout is the idle timeout: it applies to every read
+            # of the response, not to the stream as a whole
+            upstream = core_v1.read_namespaced_pod_log(
+                pod, namespace, _preload_content=False,
+                _request_timeout=(self.connect_timeout, self.idle_timeout), **kwargs)
+        except BaseException:
+            self.slots.release()
+            raise
+        return LogStream(upstream, self.max_bytes, self.slots.release)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Cached, batched PromQL query layer for the status page
+Each metric is one vectorized query over every pod; results are cached for
+a scrape interval and refreshed in the background so a slow Prometheus
+never holds up /api/status
+"""
+
+import json
+import os
+import threading
+import time
+from urllib.error import URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+PROMETHEUS_URL = os.getenv('PROMETHEUS_URL', 'http://prometheus:9090')
+PROMETHEUS_CACHE_TTL = float(os.getenv('PROMETHEUS_CACHE_TTL', '15'))
+PROMETHEUS_TIMEOUT = float(os.getenv('PROMETHEUS_TIMEOUT', '2'))
+# Seconds without a new attempt after a failed refresh (never less than the TTL)
+PROMETHEUS_BACKOFF = float(os.getenv('PROMETHEUS_BACKOFF', '30'))
+
+# metric -> (query, namespace label, pod label); one instant query per metric,
+# aggregated by pod on the Prometheus side. CPU and memory read the per-pod
+# recording rules from monitoring/prometheus/alert-rules.yaml
+USAGE_QUERIES = {
+    'cpu_cores': ('namespace_pod:container_cpu_usage_seconds:rate5m', 'namespace', 'pod'),
+    'memory_bytes': ('namespace_pod:container_memory_working_set_bytes:sum', 'namespace', 'pod'),
+    'requests_per_second': (
+        'sum by (kubernetes_namespace, kubernetes_pod_name) '
+        '(rate({__name__=~"ctf_http_requests_total|http_requests_total"}[5m]))',
+        'kubernetes_namespace', 'kubernetes_pod_name',
+    ),
+}
+
+
+class PrometheusError(Exception):
+    """Prometheus was unreachable or returned an error"""
+
+
+class UsageCache:
+    """Per-pod resource usage from Prometheus with stale-while-revalidate caching
+
+    pod_usage() never waits for Prometheus once a first result exists: if the
+    cached result is older than the TTL it starts (at most) one background
+    refresh and returns the previous result, marked stale. Only the very first
+    call waits, and for no longer than the query timeout. After a failed
+    refresh no new one starts for `backoff` seconds (at least the TTL), so
+    while Prometheus is down callers get 'unavailable' at once rather than
+    each starting and waiting on another attempt.
+    """
+
+    def __init__(self, url=PROMETHEUS_URL, ttl=PROMETHEUS_CACHE_TTL, timeout=PROMETHEUS_TIMEOUT,
+                 queries=USAGE_QUERIES, backoff=PROMETHEUS_BACKOFF):
+        self.url = url.rstrip('/')
+        self.ttl = ttl
+        self.backoff = max(ttl, backoff)
+        self.timeout = timeout
+        self.queries = queries
+        self.lock = threading.Lock()
+        self.refreshing = None
+        self.usage = None
+        self.fetched_at = 0.0
+        self.last_error = None
+        # monotonic time of the last failed refresh, None once one succeeds
+        self.failed_at = None
+
+    def query(self, promql):
+        """Run one instant query and return its result vector"""
+        url = f"{self.url}/api/v1/query?{urlencode({'query': promql})}"
+        try:
+            with urlopen(url, timeout=self.timeout) as response:
+                body = json.load(response)
+        except (URLError, OSError, ValueError) as e:
+            raise PrometheusError(str(e)) from e
+        if body.get('status') != 'success':
+            raise PrometheusError(body.get('error', 'query failed'))
+        return body['data']['result']
+
+    def fetch(self):
+        """Query every metric; returns {(namespace, pod): {metric: value}}"""
+        usage = {}
+        for metric, (promql, ns_label, pod_label) in self.queries.items():
+            for sample in self.query(promql):
+                labels = sample['metric']
+                key = (labels.get(ns_label), labels.get(pod_label))
+                if key[1] is None:
+                    continue
+                usage.setdefault(key, {})[metric] = float(sample['value'][1])
+        return usage
+
+    def refresh(self):
+        usage, error = None, 'refresh interrupted'
+        try:
+            usage = self.fetch()
+        except PrometheusError as e:
+            error = str(e)
+            print(f"Warning: Prometheus query failed: {e}")
+        except Exception as e:
+            # Unexpected result shape (or a bug): report it, and keep refreshing
+            error = f"{type(e).__name__}: {e}"
+            print(f"Warning: Prometheus usage refresh failed: {error}")
+        finally:
+            # Always cleared, or pod_usage() would wait on this refresh forever
+            with self.lock:
+                if usage is not None:
+                    self.usage = usage
+                    self.fetched_at = time.monotonic()
+                    self.last_error = None
+                    self.failed_at = None
+                else:
+                    self.last_error = error
+                    self.failed_at = time.monotonic()
+                self.refreshing = None
+
+    def pod_usage(self):
+        """Return (usage by (namespace, pod), state dict) without blocking on a slow Prometheus"""
+        if not self.url:
+            return {}, {'status': 'disabled'}
+
+        with self.lock:
+            now = time.monotonic()
+            age = now - self.fetched_at if self.usage is not None else None
+            backing_off = self.failed_at is not None and now - self.failed_at < self.backoff
+            thread = self.refreshing
+            if (age is None or age >= self.ttl) and thread is None and not backing_off:
+                thread = threading.Thread(target=self.refresh, name='prometheus-refresh', daemon=True)
+                self.refreshing = thread
+                thread.start()
+            # Only until the first attempt has failed: later callers don't wait on retries
+            wait = self.usage is None and self.failed_at is None
+
+        if wait and thread is not None:
+            # Cold cache: wait for the first result, bounded by the per-query timeout
+            thread.join(self.timeout * len(self.queries))
+
+        with self.lock:
+            if self.usage is None:
+                return {}, {'status': 'unavailable', 'error': self.last_error}
+            age = time.monotonic() - self.fetched_at
+            state = {
+                'status': 'ok' if age < self.ttl * 2 and not self.last_error else 'stale',
+                'age_seconds': round(age, 1),
+            }
+            if self.last_error:
+                state['error'] = self.last_error
+            return self.usage, state
+
+
+def enrich_with_usage(deployments, usage):
+    """Add per-pod and per-deployment usage figures to get_deployment_status() output"""
+    for deployment in deployments:
+        totals = {metric: 0.0 for metric in USAGE_QUERIES}
+        found = False
+        for pod in deployment['pods']:
+            pod_usage = usage.get((deployment['namespace'], pod['name']))
+            pod['usage'] = pod_usage
+            if pod_usage:
+                found = True
+                for metric, value in pod_usage.items():
+                    totals[metric] = totals.get(metric, 0.0) + value
+        deployment['usage'] = totals if found else None
+    return deployments
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+K3s Status Page - terminal client
+Prints the status page's deployment and service tables without a browser,
+for slow SSH sessions and scripts. Results are shared through an on-disk
+snapshot for a few seconds, so repeated invocations (watch loops, several
+scripts) make no API calls; --watch keeps a Kubernetes watch open and only
+redraws the lines that changed
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+STATUS_CACHE_DIR = Path(os.getenv('STATUS_CACHE_DIR', Path.home() / '.cache' / 'k3s-status'))
+STATUS_CACHE_TTL = float(os.getenv('STATUS_CACHE_TTL', '10'))
+
+# Coalesce bursts of watch events (a rollout touches many pods) into one redraw
+REDRAW_DELAY = 0.2
+
+
+def cache_path(context, namespace) -> Path:
+    """Snapshot file for a kubeconfig/context/namespace combination"""
+    key = json.dumps([os.getenv('KUBECONFIG', ''), context or '', namespace or ''])
+    return STATUS_CACHE_DIR / f"{hashlib.sha1(key.encode()).hexdigest()[:16]}.json"
+
+
+def read_snapshot(path: Path, ttl: float):
+    """The cached snapshot if younger than `ttl` seconds, else None"""
+    try:
+        if time.time() - path.stat().st_mtime > ttl:
+            return None
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(path: Path, snapshot: dict):
+    """Write atomically so concurrent readers never see a partial file"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Warning: cannot write {path}: {e}", file=sys.stderr)
+
+
+def make_snapshot(deployments, services) -> dict:
+    return {'timestamp': datetime.utcnow().isoformat(), 'deployments': deployments, 'services': services}
+
+
+def fetch_snapshot(context, namespace) -> dict:
+    """List the cluster once (four API calls, whatever its size)"""
+    import k8sstatus
+
+    k8sstatus.load_kube_config(context)
+    apps_v1, core_v1 = k8sstatus.api_clients()
+    return make_snapshot(k8sstatus.get_deployment_status(apps_v1, core_v1, namespace),
+                         k8sstatus.get_service_status(core_v1, namespace))
+
+
+def table(headers, rows) -> list[str]:
+    widths = [max([len(h)] + [len(str(r[i])) for r in rows]) for i, h in enumerate(headers)]
+    return ['  '.join(str(cell).ljust(w) for cell, w in zip(row, widths)).rstrip()
+            for row in [headers] + rows]
+
+
+def render(snapshot: dict, source: str, show_services: bool = True) -> list[str]:
+    """Snapshot as plain text lines"""
+    deployments = snapshot['deployments']
+    healthy = sum(1 for d in deployments if d['status'] == 'Healthy')
+    lines = [f"{len(deployments)} deployments, {healthy} healthy  ({source} {snapshot['timestamp'][:19]}Z)", '']
+    rows = []
+    for d in deployments:
+        restarts = sum(p['restarts'] for p in d['pods'])
+        rows.append([d['namespace'], d['name'], f"{d['replicas']['ready']}/{d['replicas']['desired']}",
+                     d['status'], d['update_status'], restarts, ', '.join(d['images'])])
+    lines += table(['NAMESPACE', 'DEPLOYMENT', 'READY', 'STATUS', 'ROLLOUT', 'RESTARTS', 'IMAGES'], rows)
+    if show_services:
+        rows = [[s['namespace'], s['name'], s['type'], ','.join(s['ports']), s['endpoints'], s['status']]
+                for s in snapshot['services']]
+        lines += [''] + table(['NAMESPACE', 'SERVICE', 'TYPE', 'PORTS', 'ENDPOINTS', 'STATUS'], rows)
+    return lines
+
+
+class Screen:
+    """Redraws only the terminal lines that changed since the last frame"""
+
+    def __init__(self, out):
+        self.out = out
+        self.lines = []
+
+    def __enter__(self):
+        # Alternate screen, cursor hidden
+        self.out.write('\x1b[?1049h\x1b[?25l\x1b[H\x1b[2J')
+        return self
+
+    def __exit__(self, *args):
+        self.out.write('\x1b[?25h\x1b[?1049l')
+        self.out.flush()
+
+    def draw(self, lines):
+        size = shutil.get_terminal_size()
+        lines = [line[:size.columns] for line in lines[:size.lines]]
+        parts = [f'\x1b[{row + 1};1H{line}\x1b[K' for row, line in enumerate(lines)
+                 if row >= len(self.lines) or self.lines[row] != line]
+        if len(lines) < len(self.lines):
+            parts.append(f'\x1b[{len(lines) + 1};1H\x1b[J')
+        if parts:
+            self.out.write(''.join(parts))
+            self.out.flush()
+        self.lines = lines
+
+
+def watch(args, path: Path) -> int:
+    """Keep the tables current from Kubernetes watch events"""
+    import k8sstatus
+
+    k8sstatus.load_kube_config(args.context)
+    apps_v1, core_v1 = k8sstatus.api_clients()
+    state = k8sstatus.ClusterState(apps_v1, core_v1, args.namespace)
+    try:
+        state.load()
+    except Exception as e:
+        print(f"Error: cannot list cluster resources: {e}")
+        return 2
+    events = queue.Queue()
+    stop = threading.Event()
+    state.start_watches(events, stop)
+
+    def frames():
+        while True:
+            snapshot = make_snapshot(state.deployment_status(), state.service_status())
+            # Keeps one-shot invocations elsewhere free while we watch anyway
+            write_snapshot(path, snapshot)
+            yield render(snapshot, 'watching, updated', not args.no_services)
+            event = events.get()
+            deadline = time.monotonic() + REDRAW_DELAY
+            while event is not None:
+                if event[0] == 'reset':
+                    state.reset(event[1], *event[2])
+                else:
+                    state.apply(*event)
+                try:
+                    event = events.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    event = None
+
+    try:
+        if sys.stdout.isatty():
+            with Screen(sys.stdout) as screen:
+                for lines in frames():
+                    screen.draw(lines)
+        else:
+            for lines in frames():
+                print('\n'.join(lines) + '\n', flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cluster deployment and service status in the terminal')
+    parser.add_argument('-n', '--namespace', help='Only this namespace (default: all)')
+    parser.add_argument('--context', help='kubeconfig context')
+    parser.add_argument('--ttl', type=float, default=STATUS_CACHE_TTL,
+                        help=f'Reuse a snapshot younger than this many seconds (default: {STATUS_CACHE_TTL:g})')
+    parser.add_argument('--refresh', action='store_true', help='Ignore the cached snapshot')
+    parser.add_argument('--json', action='store_true', help='Print the snapshot as JSON')
+    parser.add_argument('--no-services', action='store_true', help='Only show deployments')
+    parser.add_argument('-w', '--watch', action='store_true',
+                        help='Stay open and redraw changed lines from Kubernetes watch events')
+    args = parser.parse_args()
+
+    path = cache_path(args.context, args.namespace)
+    if args.watch:
+        return watch(args, path)
+
+    snapshot = None if args.refresh else read_snapshot(path, args.ttl)
+    source = 'cached'
+    if snapshot is None:
+        try:
+            snapshot = fetch_snapshot(args.context, args.namespace)
+        except Exception as e:
+            print(f"Error: cannot fetch cluster status: {e}")
+            return 2
+        write_snapshot(path, snapshot)
+        source = 'fetched'
+
+    if args.json:
+        print(json.dumps(snapshot, indent=2))
+    else:
+        print('\n'.join(render(snapshot, source, not args.no_services)))
+    # Non-zero when something needs attention, for scripts
+    return 0 if all(d['status'] == 'Healthy' for d in snapshot['deployments']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The status page modules import each other by bare name, as in /app
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,106 @@
+"""Restart dating and crash-loop detection in AnomalyDetector"""
+
+from anomalies import AnomalyDetector
+from k8sstatus import PodRecord
+
+T0 = 1_800_000_000.0
+
+
+def pod(resource_version, restarts, last_terminated=None, ready=True, name='web-1'):
+    return PodRecord('ctf', name, str(resource_version), {}, 'Running', ready, restarts, 'node-1', last_terminated)
+
+
+def crashloops(detector, now):
+    return [a for a in detector.anomalies(now=now) if a['type'] == 'CrashLoop']
+
+
+def test_restart_jump_with_old_last_terminated_is_not_a_crash_loop():
+    detector = AnomalyDetector(window=600, restarts=3)
+    detector.sync([], [pod(1, 0)], now=T0)
+    # Three restarts since the last look two hours ago, the newest a minute
+    # ago: the other two may have been hours apart
+    now = T0 + 7200
+    detector.sync([], [pod(2, 3, last_terminated=now - 60)], now=now)
+    assert crashloops(detector, now) == []
+
+
+def test_restart_jump_with_termination_before_the_last_look_is_not_a_crash_loop():
+    detector = AnomalyDetector(window=600, restarts=3)
+    detector.sync([], [pod(1, 0)], now=T0)
+    now = T0 + 7200
+    detector.sync([], [pod(2, 3, last_terminated=T0 - 3600)], now=now)
+    assert crashloops(detector, now) == []
+
+
+def test_restart_jump_between_close_looks_is_a_crash_loop():
+    detector = AnomalyDetector(window=600, restarts=3)
+    detector.sync([], [pod(1, 0)], now=T0)
+    detector.sync([], [pod(2, 3, last_terminated=T0 + 100)], now=T0 + 120)
+    found = crashloops(detector, T0 + 120)
+    assert len(found) == 1
+    assert found[0]['since'] == '2027-01-15T08:01:40'
+
+
+def test_restarts_seen_one_by_one_use_their_termination_times():
+    detector = AnomalyDetector(window=600, restarts=3)
+    detector.sync([], [pod(1, 0)], now=T0)
+    # Terminations 6 minutes apart, all within the window of their neighbours
+    # but not of each other
+    for n, minute in enumerate((1, 7, 13), 1):
+        detector.sync([], [pod(n + 1, n, last_terminated=T0 + minute * 60)], now=T0 + minute * 60 + 5)
+    assert crashloops(detector, T0 + 13 * 60 + 5) == []
+
+    detector = AnomalyDetector(window=600, restarts=3)
+    detector.sync([], [pod(1, 0)], now=T0)
+    for n, minute in enumerate((1, 2, 3), 1):
+        detector.sync([], [pod(n + 1, n, last_terminated=T0 + minute * 60)], now=T0 + minute * 60 + 5)
+    assert len(crashloops(detector, T0 + 3 * 60 + 5)) == 1
+
+
+def test_restarts_before_first_sight_are_history():
+    detector = AnomalyDetector(window=600, restarts=3)
+    detector.sync([], [pod(1, 50, last_terminated=T0 - 10)], now=T0)
+    detector.sync([], [pod(2, 50, last_terminated=T0 - 10)], now=T0 + 30)
+    assert detector.anomalies(now=T0 + 30) == []
+
+
+class ScanCounter(dict):
+    """dict that counts full scans"""
+    scans = 0
+
+    def __iter__(self):
+        ScanCounter.scans += 1
+        return super().__iter__()
+
+
+def test_sync_forgets_deleted_pods():
+    detector = AnomalyDetector()
+    pods = [pod(1, 0, name=f'web-{n}') for n in range(3)] + [
+        PodRecord('other', 'api-1', '1', {}, 'Running', True, 0, None)]
+    detector.sync([], pods, now=T0)
+    detector.sync([], pods[1:3], namespace='ctf', now=T0 + 30)
+    assert set(detector.pods) == {('ctf', 'web-1'), ('ctf', 'web-2'), ('other', 'api-1')}
+    detector.sync([], pods[1:3], now=T0 + 60)
+    assert set(detector.pods) == {('ctf', 'web-1'), ('ctf', 'web-2')}
+    assert detector.pod_counts == {'ctf': 2, 'other': 0}
+
+
+def test_sync_without_deletions_does_not_scan():
+    detector = AnomalyDetector()
+    detector.pods = ScanCounter()
+    pods = [pod(1, 0, name=f'web-{n}') for n in range(100)]
+    detector.sync([], pods, now=T0)
+    detector.sync([], pods, now=T0 + 30)
+    detector.sync([], pods[:50], namespace='ctf', now=T0 + 60)
+    assert ScanCounter.scans == 1
+    assert len(detector.pods) == 50
+
+
+def test_watch_events():
+    detector = AnomalyDetector(window=600, restarts=3)
+    detector.apply('pods', 'ADDED', pod(1, 0), now=T0)
+    detector.apply('pods', 'MODIFIED', pod(2, 3, last_terminated=T0 + 50), now=T0 + 60)
+    assert len(crashloops(detector, T0 + 60)) == 1
+    detector.apply('pods', 'DELETED', pod(3, 3), now=T0 + 70)
+    assert detector.pods == {} and detector.anomalies(now=T0 + 70) == []
+    assert detector.pod_counts == {'ctf': 0}
@@ -0,0 +1,175 @@
+"""Deployment health classification and the HealthEngine cache"""
+
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from health import DeploymentFacts, Health, HealthEngine, classify, facts_from_json, facts_from_model
+
+
+def facts(name='web', namespace='ctf', resource_version='1', generation=1, observed_generation=1, desired=2,
+          replicas=2, ready=2, available=2, unavailable=None, updated=2, conditions=(), has_status=True):
+    return DeploymentFacts(namespace, name, resource_version, generation, observed_generation, desired, replicas,
+                           ready, available, unavailable, updated, conditions, has_status)
+
+
+AVAILABLE = ('Available', 'True', 'MinimumReplicasAvailable')
+PROGRESSED = ('Progressing', 'True', 'NewReplicaSetAvailable')
+
+
+@pytest.mark.parametrize('kwargs, expected', [
+    ({}, Health('Healthy', 'Up to date')),
+    ({'conditions': (AVAILABLE, PROGRESSED)}, Health('Healthy', 'Up to date')),
+    # spec.replicas omitted: the API server defaults it to 1
+    ({'desired': None, 'replicas': 1, 'ready': 1, 'available': 1, 'updated': 1}, Health('Healthy', 'Up to date')),
+    ({'desired': None, 'replicas': None, 'ready': None, 'available': None, 'updated': None},
+     Health('Unavailable', 'Updating')),
+    # Scaled to zero: zero counts are omitted from the status
+    ({'desired': 0, 'replicas': None, 'ready': None, 'available': None, 'updated': None},
+     Health('Healthy', 'Up to date')),
+    ({'ready': 1, 'available': 1}, Health('Degraded', 'Updating')),
+    ({'ready': None, 'available': None}, Health('Unavailable', 'Updating')),
+    # Ready but not yet available for minReadySeconds
+    ({'available': 1}, Health('Degraded', 'Updating')),
+    ({'has_status': False, 'replicas': None, 'ready': None, 'available': None, 'updated': None},
+     Health('Unknown', 'Up to date')),
+])
+def test_status(kwargs, expected):
+    assert classify(facts(**kwargs)) == expected
+
+
+@pytest.mark.parametrize('kwargs, expected', [
+    ({'conditions': (AVAILABLE, ('Progressing', 'False', 'ProgressDeadlineExceeded'))}, 'Update Failed'),
+    # The deadline wins over an unavailable deployment
+    ({'conditions': (('Available', 'False', 'MinimumReplicasUnavailable'),
+                     ('Progressing', 'False', 'ProgressDeadlineExceeded'))}, 'Update Failed'),
+    ({'conditions': (('Available', 'False', 'MinimumReplicasUnavailable'), PROGRESSED)}, 'Unavailable'),
+    ({'conditions': (AVAILABLE, ('Progressing', 'True', 'ReplicaSetUpdated'))}, 'Up to date'),
+    ({'generation': 3, 'observed_generation': 2}, 'Updating'),
+    ({'generation': 3, 'observed_generation': None}, 'Updating'),
+    ({'updated': 1}, 'Updating'),
+    # Old replica set still scaled up
+    ({'replicas': 3}, 'Updating'),
+    ({'updated': None, 'replicas': None}, 'Updating'),
+])
+def test_update_status(kwargs, expected):
+    assert classify(facts(**kwargs)).update_status == expected
+
+
+def test_facts_from_json_reads_omitted_fields_as_none():
+    obj = {
+        'metadata': {'namespace': 'ctf', 'name': 'web', 'resourceVersion': '7', 'generation': 2},
+        'spec': {},
+        'status': {'observedGeneration': 2, 'conditions': [{'type': 'Available', 'status': 'False'}]},
+    }
+    parsed = facts_from_json(obj)
+    assert parsed.desired is None and parsed.ready is None and parsed.replicas is None
+    assert parsed.conditions == (('Available', 'False', None),)
+    assert classify(parsed) == Health('Unavailable', 'Unavailable')
+
+    without_status = facts_from_json({'metadata': {'name': 'web'}, 'spec': {'replicas': 1}})
+    assert not without_status.has_status
+    assert classify(without_status).status == 'Unknown'
+
+
+def test_facts_from_model_matches_json():
+    condition = SimpleNamespace(type='Progressing', status='False', reason='ProgressDeadlineExceeded')
+    model = SimpleNamespace(
+        metadata=SimpleNamespace(namespace='ctf', name='web', resource_version='7', generation=2),
+        spec=SimpleNamespace(replicas=2),
+        status=SimpleNamespace(observed_generation=2, replicas=2, ready_replicas=1, available_replicas=1,
+                               unavailable_replicas=1, updated_replicas=2, conditions=[condition]),
+    )
+    obj = {
+        'metadata': {'namespace': 'ctf', 'name': 'web', 'resourceVersion': '7', 'generation': 2},
+        'spec': {'replicas': 2},
+        'status': {'observedGeneration': 2, 'replicas': 2, 'readyReplicas': 1, 'availableReplicas': 1,
+                   'unavailableReplicas': 1, 'updatedReplicas': 2,
+                   'conditions': [{'type': 'Progressing', 'status': 'False', 'reason': 'ProgressDeadlineExceeded'}]},
+    }
+    assert facts_from_model(model) == facts_from_json(obj)
+    assert classify(facts_from_model(model)) == Health('Degraded', 'Update Failed')
+
+
+def test_engine_reuses_result_for_same_resource_version():
+    engine = HealthEngine()
+    assert engine.classify(facts(ready=0, available=0)).status == 'Unavailable'
+    # Same resourceVersion means the same object: the cached result stands
+    assert engine.classify(facts()).status == 'Unavailable'
+    assert engine.classified == 1
+    assert engine.classify(facts(resource_version='2')).status == 'Healthy'
+    assert engine.classified == 2
+    assert engine.status_counts() == {'Healthy': 1, 'Degraded': 0, 'Unavailable': 0, 'Unknown': 0}
+
+
+def test_engine_never_caches_without_resource_version():
+    engine = HealthEngine()
+    engine.classify(facts(resource_version=None, ready=0, available=0))
+    assert engine.classify(facts(resource_version=None)).status == 'Healthy'
+    assert engine.classified == 2
+    assert engine.status_counts()['Healthy'] == 1
+
+
+def test_engine_resource_version_reused_by_another_deployment():
+    engine = HealthEngine()
+    engine.classify(facts(name='a', ready=0, available=0))
+    assert engine.classify(facts(name='b')).status == 'Healthy'
+    assert engine.classified == 2
+
+
+def test_engine_apply_reports_changes():
+    engine = HealthEngine()
+    assert engine.apply('ADDED', facts())
+    assert not engine.apply('MODIFIED', facts(resource_version='2'))
+    assert engine.apply('MODIFIED', facts(resource_version='3', ready=1, available=1))
+    assert engine.apply('DELETED', facts(resource_version='4'))
+    assert not engine.apply('DELETED', facts(resource_version='4'))
+    assert engine.cache == {}
+    assert sum(engine.status_counts().values()) == 0
+
+
+def test_engine_sync_drops_missing_deployments_of_its_namespace():
+    engine = HealthEngine()
+    engine.sync([facts(name='a'), facts(name='b'), facts(name='c', namespace='other')])
+    engine.sync([facts(name='a')], namespace='ctf')
+    assert set(engine.cache) == {('ctf', 'a'), ('other', 'c')}
+    assert engine.status_counts()['Healthy'] == 2
+    engine.retain(set())
+    assert engine.cache == {} and engine.status_counts()['Healthy'] == 0
+
+
+def test_engine_concurrent_classify_and_retain():
+    engine = HealthEngine()
+    engine.sync([facts(name=f'kept-{i}') for i in range(2000)])
+    kept = set(engine.cache)
+    errors = []
+    # Switch threads often enough for a writer to land inside retain()'s scan
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def writer(worker):
+        try:
+            for i in range(2000):
+                engine.classify(facts(name=f'{worker}-{i}', resource_version=str(i)))
+        except Exception as e:
+            errors.append(e)
+
+    def pruner():
+        try:
+            for _ in range(200):
+                engine.retain(kept)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(4)] + [threading.Thread(target=pruner)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(previous)
+    assert errors == []
+    assert sum(engine.status_counts().values()) == len(engine.cache)
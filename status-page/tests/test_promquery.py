@@ -0,0 +1,81 @@
+"""UsageCache caching and its behaviour while Prometheus is down"""
+
+import time
+
+from promquery import PrometheusError, UsageCache
+
+QUERIES = {'cpu_cores': ('cpu', 'namespace', 'pod')}
+
+
+class FakeCache(UsageCache):
+    """UsageCache whose fetch() sleeps `delay` and then fails or returns `result`"""
+
+    def __init__(self, delay=0.2, result=None, **kwargs):
+        super().__init__(url='http://prometheus.invalid', timeout=1, queries=QUERIES, **kwargs)
+        self.delay = delay
+        self.result = result
+        self.fetches = 0
+
+    def fetch(self):
+        self.fetches += 1
+        time.sleep(self.delay)
+        if self.result is None:
+            raise PrometheusError('connection refused')
+        return self.result
+
+
+def timed(fn):
+    start = time.monotonic()
+    value = fn()
+    return value, time.monotonic() - start
+
+
+def test_first_call_waits_for_the_first_result():
+    cache = FakeCache(result={('ctf', 'web-1'): {'cpu_cores': 0.5}})
+    (usage, state), elapsed = timed(cache.pod_usage)
+    assert usage == {('ctf', 'web-1'): {'cpu_cores': 0.5}}
+    assert state['status'] == 'ok'
+    assert elapsed >= 0.2
+
+
+def test_prometheus_down_second_call_does_not_wait():
+    cache = FakeCache(ttl=15, backoff=30)
+    (usage, state), elapsed = timed(cache.pod_usage)
+    assert usage == {} and state == {'status': 'unavailable', 'error': 'connection refused'}
+    assert elapsed >= 0.2
+
+    for _ in range(5):
+        (usage, state), elapsed = timed(cache.pod_usage)
+        assert state['status'] == 'unavailable'
+        assert elapsed < 0.05
+    # No new attempt within the backoff
+    assert cache.fetches == 1
+    assert cache.refreshing is None
+
+
+def test_retry_after_backoff_runs_in_the_background():
+    cache = FakeCache(ttl=0.1, backoff=0.1)
+    cache.pod_usage()
+    time.sleep(0.15)
+    (_, state), elapsed = timed(cache.pod_usage)
+    assert state['status'] == 'unavailable'
+    assert elapsed < 0.05
+    cache.refreshing.join()
+    assert cache.fetches == 2
+
+
+def test_backoff_is_at_least_the_ttl():
+    assert FakeCache(ttl=15, backoff=1).backoff == 15
+
+
+def test_failed_refresh_keeps_serving_the_last_result():
+    cache = FakeCache(delay=0, ttl=0.05, backoff=0.05, result={('ctf', 'web-1'): {'cpu_cores': 1.0}})
+    cache.pod_usage()
+    cache.result = None
+    time.sleep(0.06)
+    cache.pod_usage()
+    if cache.refreshing is not None:
+        cache.refreshing.join()
+    usage, state = cache.pod_usage()
+    assert usage == {('ctf', 'web-1'): {'cpu_cores': 1.0}}
+    assert state['status'] == 'stale' and state['error'] == 'connection refused'
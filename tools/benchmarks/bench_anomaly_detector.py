@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark status-page/anomalies.py on a synthetic cluster
+Feeds AnomalyDetector full lists of pod and deployment records, as the
+status page does on every refresh, where only a fraction of the objects
+changed since the last one (a few crash-looping pods, a rollout), and
+reports the cost per refresh and per anomalies() call for growing cluster
+sizes. A full list still has to be walked (a resourceVersion lookup per
+unchanged record); the state updates and anomalies() follow the changed
+objects
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'status-page'))
+
+from anomalies import AnomalyDetector
+from health import DeploymentFacts
+from k8sstatus import DeploymentRecord, PodRecord
+
+
+def pod(n: int, resource_version: int, restarts: int = 0, ready: bool = True) -> PodRecord:
+    return PodRecord(f'team-{n % 50}', f'app-{n // 3}-7d9f8b6c5-{n:05d}', str(resource_version), {},
+                     'Running', ready, restarts, f'node-{n % 3}')
+
+
+def deployment(n: int, resource_version: int, updated: int = 3) -> DeploymentRecord:
+    facts = DeploymentFacts(f'team-{n % 50}', f'app-{n}', str(resource_version), 2, 2, 3, 3, 3, 3, None,
+                            updated, (('Available', 'True', 'MinimumReplicasAvailable'),))
+    return DeploymentRecord(facts.namespace, facts.name, facts.resource_version, {}, (), None, facts)
+
+
+def run(pods: int, changed: float, rounds: int, rng: random.Random):
+    """(ms per refresh, ms per anomalies() call, anomalies found) for one cluster size"""
+    detector = AnomalyDetector()
+    pod_list = [pod(n, 1) for n in range(pods)]
+    deployment_list = [deployment(n, 1) for n in range(pods // 3)]
+    now = 1_700_000_000.0
+    detector.sync(deployment_list, pod_list, now=now)
+
+    version = 2
+    refresh = report = 0.0
+    for _ in range(rounds):
+        now += 30
+        for n in rng.sample(range(pods), max(1, int(pods * changed))):
+            old = pod_list[n]
+            pod_list[n] = pod(n, version, old.restarts + 1, not old.ready)
+        for n in rng.sample(range(len(deployment_list)), max(1, int(len(deployment_list) * changed))):
+            deployment_list[n] = deployment(n, version, updated=1)
+        version += 1
+
+        start = time.perf_counter()
+        detector.sync(deployment_list, pod_list, now=now)
+        refresh += time.perf_counter() - start
+        start = time.perf_counter()
+        found = detector.anomalies(now=now)
+        report += time.perf_counter() - start
+    return refresh / rounds * 1000, report / rounds * 1000, len(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the restart / rollout anomaly detector')
+    parser.add_argument('--pods', type=int, nargs='+', default=[1000, 5000, 20000], help='Cluster sizes (pods)')
+    parser.add_argument('--changed', type=float, default=0.01, help='Fraction of objects changed per refresh')
+    parser.add_argument('--rounds', type=int, default=20, help='Refreshes per cluster size')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"  {'pods':>7}{'changed/refresh':>17}{'sync':>12}{'anomalies()':>14}{'found':>8}")
+    for pods in args.pods:
+        refresh, report, found = run(pods, args.changed, args.rounds, random.Random(args.seed))
+        print(f"  {pods:>7}{max(1, int(pods * args.changed)):>17}{refresh:>9.2f} ms{report:>11.2f} ms{found:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
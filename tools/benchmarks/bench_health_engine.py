@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark status-page/health.py on synthetic deployments
+Compares classifying every deployment from scratch on each refresh (what
+get_deployment_status did) with the HealthEngine cache: a cold pass, a
+relist where nothing changed, and watch events touching a fraction of them
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'status-page'))
+
+from kubernetes import client
+from health import HealthEngine, classify, facts_from_model
+
+
+def synthetic_deployment(n: int, rng: random.Random, resource_version: int = 1) -> client.V1Deployment:
+    desired = rng.choice((1, 1, 1, 2, 3))
+    ready = desired if rng.random() < 0.9 else rng.randrange(desired)
+    conditions = [
+        client.V1DeploymentCondition(type='Available', status='True' if ready else 'False',
+                                     reason='MinimumReplicasAvailable'),
+        client.V1DeploymentCondition(type='Progressing', status='True', reason='NewReplicaSetAvailable'),
+    ]
+    return client.V1Deployment(
+        metadata=client.V1ObjectMeta(name=f'app-{n}', namespace=f'team-{n % 50}', generation=2,
+                                     resource_version=str(resource_version)),
+        spec=client.V1DeploymentSpec(replicas=desired, selector=client.V1LabelSelector(match_labels={'app': f'app-{n}'}),
+                                     template=client.V1PodTemplateSpec()),
+        status=client.V1DeploymentStatus(replicas=desired, ready_replicas=ready or None,
+                                         available_replicas=ready or None, updated_replicas=desired,
+                                         unavailable_replicas=(desired - ready) or None,
+                                         observed_generation=2, conditions=conditions),
+    )
+
+
+def classify_inline(deployment):
+    """The classification get_deployment_status used to run per deployment and request"""
+    spec, status = deployment.spec, deployment.status
+    overall_status = "Unknown"
+    if status.ready_replicas == spec.replicas and status.replicas == spec.replicas:
+        overall_status = "Healthy"
+    elif status.replicas < spec.replicas:
+        overall_status = "Degraded"
+    elif status.unavailable_replicas:
+        overall_status = "Unavailable"
+    update_status = "Up to date"
+    for condition in status.conditions or []:
+        if condition.type == "Progressing":
+            update_status = "Updating" if condition.status == "True" else "Update Failed"
+        elif condition.type == "Available" and condition.status == "False":
+            update_status = "Unavailable"
+    return overall_status, update_status
+
+
+def timed(fn, repeats: int) -> float:
+    """Best of `repeats` runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the deployment health engine')
+    parser.add_argument('--deployments', '-n', type=int, default=10000, help='Synthetic deployments')
+    parser.add_argument('--changed', type=float, default=0.01, help='Fraction changed per round of events')
+    parser.add_argument('--repeats', type=int, default=5, help='Runs per measurement (best is reported)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    deployments = [synthetic_deployment(n, rng) for n in range(args.deployments)]
+    changed = rng.sample(range(args.deployments), max(1, int(args.deployments * args.changed)))
+    updates = [synthetic_deployment(n, rng, resource_version=2) for n in changed]
+
+    inline = timed(lambda: [classify_inline(d) for d in deployments], args.repeats)
+    scratch = timed(lambda: [classify(facts_from_model(d)) for d in deployments], args.repeats)
+
+    def cold():
+        HealthEngine().sync([facts_from_model(d) for d in deployments])
+    cold_ms = timed(cold, args.repeats)
+
+    engine = HealthEngine()
+    facts = [facts_from_model(d) for d in deployments]
+    engine.sync(facts)
+    relist = timed(lambda: engine.sync(facts), args.repeats)
+    relist_models = timed(lambda: [engine.classify_model(d) for d in deployments], args.repeats)
+
+    update_facts = [facts_from_model(d) for d in updates]
+    start = time.perf_counter()
+    flips = sum(engine.apply('MODIFIED', f) for f in update_facts)
+    events_ms = (time.perf_counter() - start) * 1000
+
+    n = args.deployments
+    print(f"{n} deployments, {len(updates)} changed per event round\n")
+    print(f"  inline per request (old):          {inline:8.2f} ms  ({inline / n * 1000:.2f} us/deployment)")
+    print(f"  classify() from scratch:           {scratch:8.2f} ms")
+    print(f"  engine, cold sync:                 {cold_ms:8.2f} ms")
+    print(f"  engine, relist, nothing changed:   {relist_models:8.2f} ms  (V1Deployment; {relist:.2f} ms from facts)")
+    print(f"  engine, {len(updates)} watch events:          {events_ms:8.2f} ms  "
+          f"({events_ms / len(updates) * 1000:.2f} us/event, {flips} changed status)")
+    print(f"\n  status counts: {engine.status_counts()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold start of the repo's Python entry points
+Runs each entry point in a fresh interpreter, reports the best wall time and
+the import time measured with -X importtime, and lists the imports that cost
+the most. With --baseline the same commands also run against an older
+revision (exported with git archive) for comparison
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+
+# name -> (working directory, interpreter arguments)
+ENTRY_POINTS = {
+    'test-challenges --help': ('tools', ['test-challenges.py', '--help']),
+    'status-cli --help': ('status-page', ['status-cli.py', '--help']),
+    'status page (import app)': ('status-page', ['-c', 'import app']),
+}
+
+
+def export_revision(ref: str, dest: Path):
+    """Extract the tree of git revision `ref` into `dest`"""
+    archive = subprocess.run(['git', 'archive', '--format=tar', ref], cwd=REPO_DIR,
+                             capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(dest)
+
+
+def run(root: Path, workdir: str, args: list, importtime: bool = False):
+    """(wall seconds, stderr) of one run"""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + args
+    # No kubeconfig: nothing may reach a cluster, import cost only
+    env = dict(os.environ, KUBECONFIG=os.devnull, PROMETHEUS_URL='')
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=root / workdir, env=env, capture_output=True, text=True)
+    return time.perf_counter() - start, result.stderr
+
+
+def parse_importtime(stderr: str):
+    """{module: (self us, cumulative us)} of the top-level imports, and the total in us"""
+    modules, total = {}, 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            # Not nested in another import
+            name = name.strip()
+            modules[name] = (int(self_us), int(cumulative))
+            total += int(cumulative)
+    return modules, total
+
+
+def measure(root: Path, repeats: int) -> dict:
+    results = {}
+    for name, (workdir, args) in ENTRY_POINTS.items():
+        wall = min(run(root, workdir, args)[0] for _ in range(repeats))
+        modules, total = parse_importtime(run(root, workdir, args, importtime=True)[1])
+        results[name] = {'wall': wall, 'imports': total, 'modules': modules}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold-start and import time of the entry points')
+    parser.add_argument('--baseline', metavar='REF', help='Also measure this git revision')
+    parser.add_argument('--repeats', type=int, default=10, help='Runs per entry point (best is reported)')
+    parser.add_argument('--top', type=int, default=5, help='Heaviest top-level imports to list per entry point')
+    args = parser.parse_args()
+
+    revisions = [('working tree', REPO_DIR)]
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.baseline:
+            try:
+                export_revision(args.baseline, Path(tmp))
+            except subprocess.CalledProcessError as e:
+                print(f"Error: cannot export {args.baseline}: {e.stderr.decode().strip()}")
+                return 1
+            revisions.insert(0, (f'baseline ({args.baseline})', Path(tmp)))
+        measured = [(label, measure(root, args.repeats)) for label, root in revisions]
+
+    for name in ENTRY_POINTS:
+        print(name)
+        for label, results in measured:
+            r = results[name]
+            print(f"  {label:<24} wall {r['wall'] * 1000:7.1f} ms   imports {r['imports'] / 1000:7.1f} ms")
+        if len(measured) == 2:
+            before, after = measured[0][1][name], measured[1][1][name]
+            print(f"  {'change':<24} wall {(after['wall'] - before['wall']) * 1000:+7.1f} ms   "
+                  f"imports {(after['imports'] - before['imports']) / 1000:+7.1f} ms")
+        heaviest = sorted(measured[-1][1][name]['modules'].items(), key=lambda m: -m[1][1])[:args.top]
+        print('  heaviest imports: ' + ', '.join(f"{module} {cumulative / 1000:.1f} ms"
+                                                 for module, (_, cumulative) in heaviest))
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-request overhead of challenges/common/ctf_metrics.py
+Times the instrumentation hooks in isolation and end-to-end through the
+Flask test client, with and without metrics enabled
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'challenges' / 'common'))
+
+from flask import Flask, jsonify
+from prometheus_client import CollectorRegistry
+from ctf_metrics import Metrics
+
+
+def make_app(instrumented: bool) -> Flask:
+    app = Flask(__name__)
+    if instrumented:
+        Metrics(app, challenge='bench', namespace='bench', registry=CollectorRegistry())
+
+    @app.route('/api/info')
+    def api_info():
+        return jsonify({'status': 'operational'})
+
+    return app
+
+
+def bench_hooks(iterations: int) -> float:
+    """Microseconds per request spent in the WSGI wrapper, labeling hook and body close()"""
+    app = make_app(True)
+    metrics = app.extensions['ctf_metrics']
+    with app.test_request_context('/api/info') as ctx:
+        response = app.make_response(({'status': 'operational'}, 200))
+        # The wrapped "app" only runs the hook, so nothing else is timed
+        wrapped = metrics.wrap_wsgi(lambda environ, start_response: metrics.after_request(response))
+        environ = ctx.request.environ
+        # Warm the label-child cache like a long-running pod would
+        wrapped(environ, None).close()
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            wrapped(environ, None).close()
+        elapsed = time.perf_counter() - start
+    return elapsed / iterations * 1e6
+
+
+def bench_client(instrumented: bool, iterations: int) -> float:
+    """Microseconds per request through the Flask test client"""
+    client = make_app(instrumented).test_client()
+    # close() like a WSGI server: the duration and size are observed there
+    for _ in range(100):
+        client.get('/api/info').close()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        client.get('/api/info').close()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure challenge instrumentation overhead')
+    parser.add_argument('--iterations', '-n', type=int, default=20000, help='Requests per measurement')
+    args = parser.parse_args()
+
+    hooks = bench_hooks(args.iterations)
+    baseline = bench_client(False, args.iterations // 4)
+    instrumented = bench_client(True, args.iterations // 4)
+
+    print(f"{'Hooks only (wrapper + after_request + close):':<46}{hooks:8.2f} us/request")
+    print(f"{'Test client, no metrics:':<46}{baseline:8.2f} us/request")
+    print(f"{'Test client, with metrics:':<46}{instrumented:8.2f} us/request")
+    print(f"{'End-to-end overhead:':<46}{instrumented - baseline:8.2f} us/request")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Flask JSON providers
+Serializes a realistic /api/status payload (status page) and /api/read
+payload (file-disclosure) with Flask's stdlib DefaultJSONProvider and with
+the orjson-backed FastJSONProvider, both for jsonify() alone and end to end
+through the Flask test client, and checks that both decode to the same data
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_DIR / 'challenges' / 'common'))
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+import ctf_json
+from ctf_json import FastJSONProvider
+
+if ctf_json.orjson is None:
+    print("Warning: orjson is not installed, FastJSONProvider falls back to the stdlib provider")
+
+
+def status_payload(deployments: int, rng: random.Random) -> dict:
+    """Shaped like status-page /api/status with Prometheus usage figures"""
+    rows, services = [], []
+    for n in range(deployments):
+        namespace, name = f'team-{n % 40}', f'app-{n}'
+        pods = [{'name': f'{name}-7d9f8b6c5-{p:05d}', 'status': 'Running', 'ready': True,
+                 'restarts': rng.randrange(3), 'node': f'node-{p % 3}',
+                 'usage': {'cpu_cores': rng.random() / 10, 'memory_bytes': rng.randrange(1 << 28),
+                           'requests_per_second': rng.random() * 20}}
+                for p in range(3)]
+        rows.append({'name': name, 'namespace': namespace,
+                     'replicas': {'desired': 3, 'ready': 3, 'available': 3, 'unavailable': 0},
+                     'status': 'Healthy', 'update_status': 'Up to date', 'images': ['python:3.11-slim'],
+                     'pods': pods, 'created': '2024-05-01T12:00:00+00:00', 'updated': 3,
+                     'usage': {'cpu_cores': sum(p['usage']['cpu_cores'] for p in pods),
+                               'memory_bytes': sum(p['usage']['memory_bytes'] for p in pods),
+                               'requests_per_second': sum(p['usage']['requests_per_second'] for p in pods)}})
+        services.append({'name': name, 'namespace': namespace, 'type': 'ClusterIP', 'ports': ['8080/TCP'],
+                         'endpoints': 3, 'status': 'Available', 'cluster_ip': f'10.43.{n // 250}.{n % 250}',
+                         'external_ip': None})
+    return {'timestamp': '2024-05-01T12:00:00', 'deployments': rows, 'services': services,
+            'prometheus': {'status': 'ok', 'age_seconds': 3.2},
+            'summary': {'total_deployments': deployments, 'healthy_deployments': deployments,
+                        'degraded_deployments': 0, 'total_services': deployments,
+                        'total_cpu_cores': 12.5, 'total_memory_bytes': 1 << 34, 'top_cpu_deployment': 'team-0/app-0'}}
+
+
+def read_payload(size: int) -> dict:
+    """Shaped like file-disclosure /api/read returning a text file"""
+    line = 'www-data:x:33:33:www-data:/var/www:/usr/sbin/nologin "quoted"\t\\path\n'
+    return {'file': 'public/../../etc/passwd', 'content': (line * (size // len(line) + 1))[:size]}
+
+
+def make_app(provider_class, payloads) -> Flask:
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    for name, payload in payloads.items():
+        app.add_url_rule(f'/{name}', name, lambda payload=payload: jsonify(payload))
+    return app
+
+
+def per_call(fn, iterations: int) -> float:
+    """Best-of-three microseconds per call"""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the stdlib and orjson Flask JSON providers')
+    parser.add_argument('--deployments', type=int, default=300, help='Deployments in the /api/status payload')
+    parser.add_argument('--file-size', type=int, default=64 * 1024, help='Bytes of file content in /api/read')
+    parser.add_argument('--iterations', '-n', type=int, default=200, help='Calls per measurement')
+    args = parser.parse_args()
+
+    payloads = {'status': status_payload(args.deployments, random.Random(1)), 'read': read_payload(args.file_size)}
+    apps = {'stdlib': make_app(DefaultJSONProvider, payloads), 'orjson': make_app(FastJSONProvider, payloads)}
+
+    for name, payload in payloads.items():
+        results = {}
+        for label, app in apps.items():
+            client = app.test_client()
+            body = client.get(f'/{name}').data
+            assert json.loads(body) == payload, f"{label} /{name} does not round-trip"
+            with app.app_context():
+                serialize = per_call(lambda: app.json.response(payload), args.iterations)
+            results[label] = (serialize, per_call(lambda: client.get(f'/{name}'), args.iterations), len(body))
+
+        print(f"/{name} ({results['stdlib'][2] / 1024:.0f} KiB)")
+        for label, (serialize, end_to_end, size) in results.items():
+            print(f"  {label:<8} jsonify {serialize:9.1f} us   test client {end_to_end:9.1f} us   {size} bytes")
+        print(f"  speedup  jsonify {results['stdlib'][0] / results['orjson'][0]:8.1f}x   "
+              f"test client {results['stdlib'][1] / results['orjson'][1]:8.1f}x\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
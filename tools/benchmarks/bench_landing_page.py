@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark the challenge landing pages
+Serves each challenge's HTML_TEMPLATE the old way (render_template_string,
+which compiles the template on every request) and through
+challenges/common/ctf_render.py (rendered once, served as bytes with an
+ETag), on a bare Flask app through the test client, and reports requests per
+second for both plus revalidations answered with 304
+"""
+
+import argparse
+import ast
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_DIR / 'challenges' / 'common'))
+
+from flask import Flask, render_template_string
+from ctf_render import StaticPage
+
+CONTEXT = {'version': '1.0.0', 'env_name': 'production'}
+
+
+def html_template(app_py: Path) -> str:
+    """The HTML_TEMPLATE literal of a challenge app, read without importing it"""
+    for node in ast.parse(app_py.read_text()).body:
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == 'HTML_TEMPLATE' for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"no HTML_TEMPLATE in {app_py}")
+
+
+def make_app(source: str) -> Flask:
+    app = Flask(__name__)
+    page = StaticPage(app, source, **CONTEXT)
+
+    @app.route('/old')
+    def old():
+        return render_template_string(source, **CONTEXT)
+
+    @app.route('/new')
+    def new():
+        return page.response()
+
+    return app
+
+
+def requests_per_second(client, path: str, iterations: int, headers=None) -> float:
+    for _ in range(100):
+        client.get(path, headers=headers)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        client.get(path, headers=headers)
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-request template rendering with precomputed pages')
+    parser.add_argument('--iterations', '-n', type=int, default=5000, help='Requests per measurement')
+    args = parser.parse_args()
+
+    print(f"  {'challenge':<18}{'render_template_string':>24}{'StaticPage':>14}{'304':>12}{'speedup':>10}")
+    for app_py in sorted((REPO_DIR / 'challenges' / 'beginner').glob('*/app.py')):
+        client = make_app(html_template(app_py)).test_client()
+        old = requests_per_second(client, '/old', args.iterations)
+        new = requests_per_second(client, '/new', args.iterations)
+        etag = client.get('/new').headers['ETag']
+        cached = requests_per_second(client, '/new', args.iterations, headers={'If-None-Match': etag})
+        print(f"  {app_py.parent.name:<18}{old:>20.0f} r/s{new:>10.0f} r/s{cached:>8.0f} r/s{new / old:>9.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark /metrics scrape cost of prometheus_client multiprocess mode
+Simulates N worker processes writing to PROMETHEUS_MULTIPROC_DIR (as
+examples/python-metrics-app does under gunicorn) and times the aggregation a
+scrape performs, plus the effect of archiving exited workers' files
+"""
+
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Must be set before prometheus_client is imported to select the mmap value class
+BASE_DIR = tempfile.mkdtemp(prefix='bench-multiproc-')
+os.environ['PROMETHEUS_MULTIPROC_DIR'] = BASE_DIR
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+APP_DIR = Path(__file__).resolve().parents[2] / 'examples' / 'python-metrics-app'
+
+
+def load_gunicorn_conf():
+    """Import examples/python-metrics-app/gunicorn.conf.py for its archive hook"""
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', APP_DIR / 'gunicorn.conf.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def worker(directory: str, endpoints: int, requests: int):
+    """One simulated worker: create the metrics and serve some requests"""
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = directory
+    total = Counter('http_requests_total', 'Total HTTP requests', ['endpoint', 'status'], registry=None)
+    duration = Histogram('http_request_duration_seconds', 'HTTP request duration', ['endpoint'], registry=None)
+    for i in range(requests):
+        endpoint = f'/route{i % endpoints}'
+        total.labels(endpoint, '200' if i % 20 else '500').inc()
+        duration.labels(endpoint).observe((i % 100) / 1000)
+
+
+def populate(directory: str, workers: int, endpoints: int, requests: int) -> list[int]:
+    """Run `workers` simulated workers to completion; returns their pids"""
+    ctx = multiprocessing.get_context('fork')
+    procs = [ctx.Process(target=worker, args=(directory, endpoints, requests)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    return [proc.pid for proc in procs]
+
+
+def time_scrape(directory: str, repeats: int) -> tuple[float, int]:
+    """Average milliseconds per scrape, and the exposition size in bytes"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=directory)
+        output = generate_latest(registry)
+    return (time.perf_counter() - start) / repeats * 1000, len(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure multiprocess /metrics scrape cost')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32],
+                        help='Worker counts to measure')
+    parser.add_argument('--endpoints', type=int, default=20, help='Distinct endpoint label values')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests served per worker')
+    parser.add_argument('--repeats', type=int, default=20, help='Scrapes per measurement')
+    parser.add_argument('--restarts', type=int, default=32,
+                        help='Exited workers for the archive comparison')
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'files':>6} {'scrape ms':>10} {'bytes':>8}")
+    for count in args.workers:
+        directory = tempfile.mkdtemp(dir=BASE_DIR)
+        populate(directory, count, args.endpoints, args.requests)
+        ms, size = time_scrape(directory, args.repeats)
+        print(f"{count:>8} {len(os.listdir(directory)):>6} {ms:>10.2f} {size:>8}")
+
+    # Worker churn (crashes, max_requests): 4 live workers + N exited ones,
+    # with and without folding exited workers into the archive files
+    conf = load_gunicorn_conf()
+    print(f"\n4 live workers after {args.restarts} restarts:")
+    for archived in (False, True):
+        directory = tempfile.mkdtemp(dir=BASE_DIR)
+        dead = populate(directory, args.restarts, args.endpoints, args.requests)
+        populate(directory, 4, args.endpoints, args.requests)
+        if archived:
+            for pid in dead:
+                conf.archive_worker_files(directory, pid)
+        ms, _ = time_scrape(directory, args.repeats)
+        label = 'archived' if archived else 'kept'
+        print(f"  {label:>9}: {len(os.listdir(directory)):>4} files, {ms:.2f} ms/scrape")
+
+    shutil.rmtree(BASE_DIR, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
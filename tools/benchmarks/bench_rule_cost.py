@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Estimate the evaluation cost of the Prometheus rules and dashboard queries
+Compares monitoring/prometheus/alert-rules.yaml (and the Grafana dashboards)
+against a baseline git revision, either on a synthetic series inventory sized
+like the lab or by asking a Prometheus server (e.g. one serving a TSDB
+snapshot) for its per-query sample statistics
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import requests
+import yaml
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+RULES_PATH = 'monitoring/prometheus/alert-rules.yaml'
+DASHBOARDS_PATH = 'monitoring/grafana/configmap.yaml'
+
+CHALLENGES = ('header-leak', 'file-disclosure', 'hidden-params', 'secret-leak')
+LATENCY_BUCKETS = ('0.001', '0.0025', '0.005', '0.01', '0.025', '0.05', '0.1', '0.25', '0.5',
+                   '1.0', '2.5', '+Inf')
+SIZE_BUCKETS = ('256', '1024', '4096', '16384', '65536', '262144', '1048576', '+Inf')
+DEFAULT_BUCKETS = ('0.005', '0.01', '0.025', '0.05', '0.075', '0.1', '0.25', '0.5', '0.75',
+                   '1.0', '2.5', '5.0', '7.5', '10.0', '+Inf')
+CADVISOR_METRICS = ('container_cpu_usage_seconds_total', 'container_memory_usage_bytes',
+                    'container_memory_working_set_bytes', 'container_spec_memory_limit_bytes',
+                    'container_spec_cpu_quota', 'container_spec_cpu_period')
+
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'y': 31536000}
+TOKEN_RE = re.compile(r'''
+    (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<matchers>\{[^}]*\})
+  | (?P<range>\[[^\]]*\])
+  | (?P<number>\d+(?:\.\d+)?(?:ms|[smhdwy])?)
+  | (?P<ident>[a-zA-Z_:][a-zA-Z0-9_:]*)
+  | (?P<other>\S)
+''', re.VERBOSE)
+MATCHER_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)\s*(=~|!~|!=|=)\s*"((?:[^"\\]|\\.)*)"')
+AGGREGATION_BY_RE = re.compile(r'^\s*\w+\s+by\s*\(([^)]*)\)')
+# Keywords followed by a parenthesised label list rather than an expression
+LABEL_LIST_KEYWORDS = {'by', 'without', 'on', 'ignoring', 'group_left', 'group_right'}
+KEYWORDS = LABEL_LIST_KEYWORDS | {'and', 'or', 'unless', 'bool', 'offset', 'inf', 'nan'}
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in a Prometheus duration such as 30s, 5m or 1h30m"""
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|[smhdwy])', text)
+    if not parts:
+        raise ValueError(f"invalid duration: {text!r}")
+    return sum(float(value) * DURATION_UNITS[unit] for value, unit in parts)
+
+
+def read_file(path: str, ref: str = None) -> str:
+    """A repository file from the working tree, or as of git revision `ref`"""
+    if ref is None:
+        return (REPO_DIR / path).read_text()
+    result = subprocess.run(['git', 'show', f'{ref}:{path}'], cwd=REPO_DIR,
+                            capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def load_rules(text: str, default_interval: float = 15.0) -> list[dict]:
+    """Flatten every rule in the rules ConfigMap into {group, kind, name, expr, interval}"""
+    rules = []
+    for document in yaml.safe_load_all(text):
+        for content in (document or {}).get('data', {}).values():
+            for group in yaml.safe_load(content).get('groups', []):
+                interval = parse_duration(group['interval']) if 'interval' in group else default_interval
+                for rule in group.get('rules', []):
+                    kind = 'record' if 'record' in rule else 'alert'
+                    rules.append({'group': group['name'], 'kind': kind, 'name': rule[kind],
+                                  'expr': rule['expr'].strip(), 'interval': interval})
+    return rules
+
+
+def load_dashboard_queries(text: str) -> list[dict]:
+    """Every panel target expression in the Grafana dashboards ConfigMap
+
+    Template variables are widened to match everything, the worst case of
+    selecting "All".
+    """
+    queries = []
+    for document in yaml.safe_load_all(text):
+        for key, content in ((document or {}).get('data') or {}).items():
+            if not key.endswith('.json'):
+                continue
+            dashboard = json.loads(content).get('dashboard', {})
+            for panel in dashboard.get('panels', []):
+                for target in panel.get('targets', []):
+                    expr = re.sub(r'\$\{?\w+\}?', '.*', target['expr'])
+                    queries.append({'group': key, 'kind': 'panel',
+                                    'name': f"{panel['title']} [{target.get('refId', 'A')}]",
+                                    'expr': expr})
+    return queries
+
+
+def parse_selectors(expr: str) -> list[tuple]:
+    """Series selectors in a PromQL expression as (metric name, matchers, range seconds)
+
+    Only as much PromQL as the selectors need: function and aggregation names
+    are recognised by the following parenthesis, label lists after by/on/...
+    are skipped.
+    """
+    tokens = [(m.lastgroup, m.group()) for m in TOKEN_RE.finditer(expr)]
+    selectors = []
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        following = tokens[i + 1] if i + 1 < len(tokens) else (None, None)
+        if kind == 'ident' and value.lower() in LABEL_LIST_KEYWORDS and following[1] == '(':
+            # Skip to the closing parenthesis of the label list
+            while i < len(tokens) and tokens[i][1] != ')':
+                i += 1
+        elif kind == 'ident' and (value.lower() in KEYWORDS or following[1] == '('
+                                  or following[1] in ('by', 'without')):
+            # Keyword, function call or aggregation written as `sum by (...) (...)`
+            pass
+        elif kind in ('ident', 'matchers'):
+            name = value if kind == 'ident' else None
+            matchers = []
+            if kind == 'matchers':
+                matchers = MATCHER_RE.findall(value)
+            elif following[0] == 'matchers':
+                matchers = MATCHER_RE.findall(following[1])
+                i += 1
+            range_seconds = 0.0
+            if i + 1 < len(tokens) and tokens[i + 1][0] == 'range':
+                range_seconds = parse_duration(tokens[i + 1][1].split(':')[0])
+                i += 1
+            selectors.append((name, matchers, range_seconds))
+        i += 1
+    return selectors
+
+
+def label_matches(labels: dict, matchers: list) -> bool:
+    """Whether a series' labels satisfy every (label, op, value) matcher"""
+    for label, op, value in matchers:
+        actual = labels.get(label, '')
+        if op == '=' and actual != value or op == '!=' and actual == value:
+            return False
+        if op in ('=~', '!~') and (re.fullmatch(value, actual) is not None) != (op == '=~'):
+            return False
+    return True
+
+
+def synthetic_inventory(teams: int, replicas: int, nodes: int, infra_pods: int,
+                        endpoints: int, system_cgroups: int) -> list[dict]:
+    """Label sets of the series a lab cluster of the given size exposes
+
+    Challenge pods follow ctf_metrics.py, container series follow cAdvisor on
+    containerd (one series per container plus the pod cgroup and sandbox).
+    """
+    series = []
+    pods = [('monitoring' if n < 4 else 'kube-system', f'infra-{n}', None) for n in range(infra_pods)]
+    pods += [('default', f'python-metrics-demo-{r}', 'demo') for r in range(2)]
+    for team in range(teams):
+        for challenge in CHALLENGES:
+            pods += [(f'team-{team}', f'{challenge}-{r}', challenge) for r in range(replicas)]
+
+    for index, (namespace, pod, app) in enumerate(pods):
+        node = f'node-{index % nodes}'
+        for container in ('app', '', 'POD'):
+            name = f'k8s_{container}_{pod}' if container else ''
+            base = {'namespace': namespace, 'pod': pod, 'container': container, 'name': name,
+                    'instance': node, 'job': 'kubernetes-cadvisor'}
+            series += [{'__name__': metric, **base} for metric in CADVISOR_METRICS]
+        for direction in ('receive', 'transmit'):
+            series.append({'__name__': f'container_network_{direction}_bytes_total', 'namespace': namespace,
+                           'pod': pod, 'container': 'POD', 'name': f'k8s_POD_{pod}', 'interface': 'eth0'})
+        kube = {'namespace': namespace, 'pod': pod}
+        series += [{'__name__': 'kube_pod_status_phase', 'phase': phase, **kube}
+                   for phase in ('Pending', 'Running', 'Succeeded', 'Failed', 'Unknown')]
+        series += [{'__name__': 'kube_pod_info', **kube},
+                   {'__name__': 'kube_pod_container_status_restarts_total', 'container': 'app', **kube}]
+
+        if app is None:
+            continue
+        target = {'kubernetes_namespace': namespace, 'kubernetes_pod_name': pod}
+        if app == 'demo':
+            series.append({'__name__': 'up', 'job': 'kubernetes-pods', **target})
+            for method in ('GET', 'POST'):
+                for status in ('200', '500'):
+                    series.append({'__name__': 'http_requests_total', 'job': 'kubernetes-pods',
+                                   'method': method, 'status': status, **target})
+                series += [{'__name__': 'http_request_duration_seconds_bucket', 'job': 'kubernetes-pods',
+                            'method': method, 'le': le, **target} for le in DEFAULT_BUCKETS]
+            continue
+        labels = {'job': 'ctf-challenges', 'challenge': app, 'namespace': namespace, 'app': app, **target}
+        series.append({'__name__': 'up', **labels})
+        series.append({'__name__': 'ctf_http_requests_in_flight', **labels})
+        series += [{'__name__': 'ctf_ratelimit_requests_total', 'outcome': outcome, **labels}
+                   for outcome in ('allowed', 'throttled_rate', 'throttled_concurrency')]
+        for endpoint in [f'route{e}' for e in range(endpoints)] + ['none']:
+            for status in ('200', '404', '429', '500'):
+                series.append({'__name__': 'ctf_http_requests_total', 'endpoint': endpoint,
+                               'method': 'GET', 'status': status, **labels})
+            series += [{'__name__': 'ctf_http_request_duration_seconds_bucket', 'endpoint': endpoint,
+                        'method': 'GET', 'le': le, **labels} for le in LATENCY_BUCKETS]
+            series += [{'__name__': 'ctf_http_response_size_bytes_bucket', 'endpoint': endpoint,
+                        'le': le, **labels} for le in SIZE_BUCKETS]
+            series += [{'__name__': f'ctf_http_response_size_bytes_{suffix}', 'endpoint': endpoint, **labels}
+                       for suffix in ('sum', 'count')]
+
+    for n in range(nodes):
+        node = f'node-{n}'
+        for cgroup in range(system_cgroups):
+            series += [{'__name__': metric, 'id': f'/system.slice/unit-{cgroup}', 'instance': node,
+                        'job': 'kubernetes-cadvisor'} for metric in CADVISOR_METRICS]
+        series += [{'__name__': 'kube_node_info', 'node': node},
+                   {'__name__': 'node_filesystem_avail_bytes', 'mountpoint': '/', 'instance': node},
+                   {'__name__': 'node_filesystem_size_bytes', 'mountpoint': '/', 'instance': node}]
+        series += [{'__name__': 'kube_node_status_condition', 'node': node, 'condition': 'Ready', 'status': status}
+                   for status in ('true', 'false', 'unknown')]
+        series += [{'__name__': 'up', 'job': job, 'instance': node}
+                   for job in ('kubernetes-nodes', 'kubelet', 'kubernetes-cadvisor')]
+    return series
+
+
+class SyntheticCost:
+    """Samples each query reads from a synthetic inventory
+
+    The samples a query loads (series matched x points in the range) is what
+    rule evaluation time scales with. Recording rules add their output series
+    to the inventory so later rules that read them are costed too.
+    """
+
+    def __init__(self, series: list[dict], scrape_interval: float):
+        self.scrape_interval = scrape_interval
+        self.by_name = {}
+        for labels in series:
+            self.by_name.setdefault(labels['__name__'], []).append(labels)
+
+    def matching(self, name, matchers) -> list[dict]:
+        name_matchers = [m for m in matchers if m[0] == '__name__']
+        if name is not None:
+            candidates = self.by_name.get(name, [])
+        else:
+            candidates = [s for group in self.by_name.values() for s in group]
+        return [s for s in candidates if label_matches(s, name_matchers + [m for m in matchers if m[0] != '__name__'])]
+
+    def cost(self, expr: str) -> tuple[int, int]:
+        """(series read, samples read) for one evaluation of `expr`"""
+        series_read = samples_read = 0
+        for name, matchers, range_seconds in parse_selectors(expr):
+            matched = len(self.matching(name, matchers))
+            series_read += matched
+            samples_read += matched * max(1, int(range_seconds / self.scrape_interval))
+        return series_read, samples_read
+
+    def record(self, name: str, expr: str):
+        """Add the output series of a recording rule"""
+        selectors = parse_selectors(expr)
+        if not selectors:
+            return
+        source = self.matching(*selectors[0][:2])
+        by = AGGREGATION_BY_RE.match(expr)
+        if by:
+            keys = [label.strip() for label in by.group(1).split(',') if label.strip()]
+            groups = {tuple(s.get(key, '') for key in keys) for s in source}
+            output = [dict(zip(keys, values)) for values in groups]
+        else:
+            output = [{k: v for k, v in s.items() if k != '__name__'} for s in source]
+        self.by_name[name] = [{'__name__': name, **labels} for labels in output]
+
+
+def prometheus_cost(url: str, expr: str, at: str, repeats: int) -> tuple[int, int, float]:
+    """(series returned, samples read, median eval ms) from a Prometheus server's query stats"""
+    params = {'query': expr, 'stats': 'all'}
+    if at:
+        params['time'] = at
+    timings = []
+    for _ in range(repeats):
+        response = requests.get(f"{url.rstrip('/')}/api/v1/query", params=params, timeout=30)
+        response.raise_for_status()
+        data = response.json()['data']
+        stats = data.get('stats', {})
+        timings.append(stats.get('timings', {}).get('evalTotalTime', 0.0) * 1000)
+    samples = stats.get('samples', {}).get('totalQueryableSamples', 0)
+    return len(data.get('result', [])), samples, statistics.median(timings)
+
+
+def measure(rules: list[dict], dashboards: list[dict], args) -> list[dict]:
+    """Cost rows for the rules (in file order) and the dashboard queries"""
+    synthetic = None
+    if not args.url:
+        inventory = synthetic_inventory(args.teams, args.replicas, args.nodes, args.infra_pods,
+                                        args.endpoints, args.system_cgroups)
+        synthetic = SyntheticCost(inventory, args.scrape_interval)
+    rows = []
+    for query in rules + dashboards:
+        if synthetic is not None:
+            series, samples = synthetic.cost(query['expr'])
+            millis = None
+            if query['kind'] == 'record':
+                synthetic.record(query['name'], query['expr'])
+        else:
+            series, samples, millis = prometheus_cost(args.url, query['expr'], args.time, args.repeats)
+        rows.append({**query, 'series': series, 'samples': samples, 'ms': millis})
+    return rows
+
+
+def summarize(label: str, rows: list[dict], dashboard_steps: int, verbose: bool) -> dict:
+    """Print one revision's table; returns its per-hour totals"""
+    print(f"\n{label}")
+    print(f"  {'kind':<7}{'rule / panel':<58}{'series':>8}{'samples':>10}{'eval ms':>9}")
+    totals = {'rule_samples_hour': 0.0, 'rule_ms_hour': 0.0, 'panel_samples': 0, 'panel_ms': 0.0}
+    for row in rows:
+        millis = '-' if row['ms'] is None else f"{row['ms']:.2f}"
+        if verbose or row['samples']:
+            print(f"  {row['kind']:<7}{row['name'][:57]:<58}{row['series']:>8}{row['samples']:>10}{millis:>9}")
+        if row['kind'] == 'panel':
+            totals['panel_samples'] += row['samples'] * dashboard_steps
+            totals['panel_ms'] += (row['ms'] or 0.0) * dashboard_steps
+        else:
+            evaluations = 3600 / row['interval']
+            totals['rule_samples_hour'] += row['samples'] * evaluations
+            totals['rule_ms_hour'] += (row['ms'] or 0.0) * evaluations
+    print(f"  rules: {totals['rule_samples_hour']:,.0f} samples/hour"
+          + (f", {totals['rule_ms_hour'] / 1000:.1f} s eval/hour" if totals['rule_ms_hour'] else ''))
+    print(f"  dashboards: {totals['panel_samples']:,} samples per refresh ({dashboard_steps} steps)"
+          + (f", ~{totals['panel_ms']:.0f} ms" if totals['panel_ms'] else ''))
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estimate Prometheus rule and dashboard evaluation cost')
+    parser.add_argument('--baseline', metavar='REF',
+                        help='Git revision to compare against (e.g. the commit before a rules change)')
+    parser.add_argument('--url', help='Prometheus to ask for query stats instead of the synthetic model '
+                                      '(e.g. one started on a TSDB snapshot)')
+    parser.add_argument('--time', help='Evaluation timestamp for --url (RFC3339 or unix; default now)')
+    parser.add_argument('--repeats', type=int, default=5, help='Queries per expression with --url')
+    parser.add_argument('--teams', type=int, default=20, help='Synthetic team namespaces')
+    parser.add_argument('--replicas', type=int, default=1, help='Synthetic replicas per challenge')
+    parser.add_argument('--nodes', type=int, default=1, help='Synthetic nodes')
+    parser.add_argument('--infra-pods', type=int, default=15, help='Synthetic non-challenge pods')
+    parser.add_argument('--endpoints', type=int, default=5, help='Routes per challenge')
+    parser.add_argument('--system-cgroups', type=int, default=40, help='Non-pod cgroups per node')
+    parser.add_argument('--scrape-interval', type=float, default=15.0, help='Seconds between samples')
+    parser.add_argument('--dashboard-steps', type=int, default=240,
+                        help='Points per panel per refresh (1h range at a 15s step)')
+    parser.add_argument('--dashboard-refreshes', type=float, default=12,
+                        help='Dashboard refreshes per hour for the combined total')
+    parser.add_argument('--verbose', action='store_true', help='Also list queries that read nothing')
+    args = parser.parse_args()
+
+    revisions = ([(f'baseline ({args.baseline})', args.baseline)] if args.baseline else [])
+    revisions.append(('working tree', None))
+    results = []
+    for label, ref in revisions:
+        try:
+            rules = load_rules(read_file(RULES_PATH, ref))
+            dashboards = load_dashboard_queries(read_file(DASHBOARDS_PATH, ref))
+        except subprocess.CalledProcessError as e:
+            print(f"Error: cannot read {ref}: {e.stderr.strip()}")
+            return 1
+        try:
+            rows = measure(rules, dashboards, args)
+        except requests.RequestException as e:
+            print(f"Error: Prometheus query failed: {e}")
+            return 1
+        results.append(summarize(label, rows, args.dashboard_steps, args.verbose))
+
+    if len(results) == 2:
+        before, after = results
+        print("\nchange vs baseline:")
+        for key, label in (('rule_samples_hour', 'rule samples/hour'), ('panel_samples', 'dashboard samples/refresh')):
+            if before[key]:
+                print(f"  {label}: {before[key]:,.0f} -> {after[key]:,.0f} "
+                      f"({(after[key] - before[key]) / before[key]:+.0%})")
+        # Rules run whether or not anyone looks; dashboards cost per refresh
+        refreshes = args.dashboard_refreshes
+        totals = [r['rule_samples_hour'] + r['panel_samples'] * refreshes for r in results]
+        if totals[0]:
+            print(f"  total at {refreshes:g} dashboard refreshes/hour: {totals[0]:,.0f} -> {totals[1]:,.0f} "
+                  f"({(totals[1] - totals[0]) / totals[0]:+.0%})")
+        rule_delta = after['rule_samples_hour'] - before['rule_samples_hour']
+        panel_saving = before['panel_samples'] - after['panel_samples']
+        if rule_delta > 0 and panel_saving > 0:
+            print(f"  break-even: {rule_delta / panel_saving:.2f} dashboard refreshes/hour")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Compare the pod service-discovery and scrape cost of two Prometheus configs
+Replays a synthetic cluster (team namespaces x challenges, infrastructure and
+unrelated pods) through the role: pod jobs of monitoring/prometheus/configmap.yaml
+at a baseline git revision and in the working tree: API server filtering,
+relabeling, kept targets and scrapes. With --url, reads the same figures
+(targets, scrape durations, SD events) from a running Prometheus instead;
+--save one run and pass it to --against after changing the config.
+"""
+
+import argparse
+import importlib.util
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import requests
+import yaml
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+CONFIG_PATH = 'monitoring/prometheus/configmap.yaml'
+GENERATOR = REPO_DIR / 'tools' / 'gen-scrape-config.py'
+
+CHALLENGES = ('header-leak', 'file-disclosure', 'hidden-params', 'secret-leak')
+# (namespace, name, annotated port) of the pods the repo and k3s run outside the challenges
+INFRA_PODS = (
+    ('monitoring', 'prometheus', None), ('monitoring', 'grafana', None),
+    ('monitoring', 'status-page', None), ('monitoring', 'challenge-exporter', 9150),
+    ('default', 'python-metrics-demo', 8080), ('default', 'metrics-app', 8080),
+    ('kube-system', 'traefik', 9100), ('kube-system', 'coredns', None),
+    ('kube-system', 'metrics-server', None), ('kube-system', 'local-path-provisioner', None),
+    ('kube-system', 'svclb-traefik', None),
+)
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(text: str) -> float:
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|[smh])', text)
+    return sum(float(value) * DURATION_UNITS[unit] for value, unit in parts)
+
+
+def read_file(path: str, ref: str = None) -> str:
+    """A repository file from the working tree, or as of git revision `ref`"""
+    if ref is None:
+        return (REPO_DIR / path).read_text()
+    result = subprocess.run(['git', 'show', f'{ref}:{path}'], cwd=REPO_DIR,
+                            capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def load_generator():
+    spec = importlib.util.spec_from_file_location('gen_scrape_config', GENERATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def pod_jobs(configmap: str) -> tuple[list[dict], float]:
+    """The role: pod scrape jobs of a prometheus-config ConfigMap, and the global interval"""
+    config = yaml.safe_load(yaml.safe_load(configmap)['data']['prometheus.yml'])
+    default_interval = parse_duration(config.get('global', {}).get('scrape_interval', '1m'))
+    jobs = [job for job in config.get('scrape_configs', [])
+            if any(sd.get('role') == 'pod' for sd in job.get('kubernetes_sd_configs', []))]
+    return jobs, default_interval
+
+
+def synthetic_cluster(teams: int, replicas: int, other_pods: int, completed_pods: int) -> list[dict]:
+    """Pods as Prometheus' pod SD sees them: namespace, labels, annotations, phase, ports"""
+    pods = []
+
+    def pod(namespace, name, labels, annotations=None, phase='Running', ports=()):
+        pods.append({'namespace': namespace, 'name': name, 'labels': labels,
+                     'annotations': annotations or {}, 'phase': phase, 'ports': list(ports)})
+
+    for namespace, name, port in INFRA_PODS:
+        annotations = {'prometheus.io/scrape': 'true', 'prometheus.io/port': str(port)} if port else {}
+        pod(namespace, f'{name}-0', {'app': name}, annotations, ports=[('http', port or 8080)])
+    # Without teams, each challenge runs in its own namespace as deployed today
+    namespaces = [f'team-{n}' for n in range(teams)] or [None]
+    for team in namespaces:
+        for challenge in CHALLENGES:
+            for r in range(replicas):
+                pod(team or challenge, f'{challenge}-{r}', {'app': challenge, 'tier': 'challenge'},
+                    ports=[('http', 8080)])
+    # Team tooling, CI jobs, ... that nothing scrapes but every cluster-wide watch receives
+    for n in range(other_pods):
+        namespace = namespaces[n % len(namespaces)] or 'default'
+        pod(namespace, f'worker-{n}', {'app': 'worker'}, ports=[('grpc', 9000), ('http', 8000)])
+    for n in range(completed_pods):
+        namespace = namespaces[n % len(namespaces)] or 'default'
+        pod(namespace, f'job-{n}', {'job-name': f'job-{n}'}, phase='Succeeded')
+    return pods
+
+
+def selector_matches(selector: str, values: dict) -> bool:
+    """Kubernetes equality-based label/field selector (`a=b,c!=d`)"""
+    for term in filter(None, (t.strip() for t in selector.split(','))):
+        key, negate, value = re.match(r'([^!=]+?)\s*(!?)==?\s*(.*)$', term).groups()
+        if (values.get(key) == value) == bool(negate):
+            return False
+    return True
+
+
+def api_filter(sd: dict, pods: list[dict]) -> tuple[int, list[dict]]:
+    """(watches, pods delivered) for one pod SD config; the API server applies namespaces and selectors"""
+    names = (sd.get('namespaces') or {}).get('names') or []
+    delivered = [p for p in pods if not names or p['namespace'] in names]
+    for selector in sd.get('selectors', []):
+        if selector.get('role') != 'pod':
+            continue
+        if 'label' in selector:
+            delivered = [p for p in delivered if selector_matches(selector['label'], p['labels'])]
+        if 'field' in selector:
+            delivered = [p for p in delivered
+                         if selector_matches(selector['field'], {'status.phase': p['phase'],
+                                                                 'metadata.namespace': p['namespace']})]
+    return max(1, len(names)), delivered
+
+
+def sanitize(name: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def pod_targets(pod: dict, index: int) -> list[dict]:
+    """Discovered labels of a pod: one target per container port (or one without ports)"""
+    ip = f'10.42.{index // 250}.{index % 250 + 1}'
+    base = {'__meta_kubernetes_namespace': pod['namespace'], '__meta_kubernetes_pod_name': pod['name'],
+            '__meta_kubernetes_pod_phase': pod['phase']}
+    base.update({f'__meta_kubernetes_pod_label_{sanitize(k)}': v for k, v in pod['labels'].items()})
+    base.update({f'__meta_kubernetes_pod_annotation_{sanitize(k)}': v for k, v in pod['annotations'].items()})
+    if not pod['ports']:
+        return [{**base, '__address__': ip}]
+    return [{**base, '__address__': f'{ip}:{port}', '__meta_kubernetes_pod_container_port_name': name}
+            for name, port in pod['ports']]
+
+
+def relabel(labels: dict, configs: list[dict]) -> tuple[dict, int]:
+    """Apply relabel_configs; returns (labels or None if dropped, steps evaluated)"""
+    for steps, config in enumerate(configs, 1):
+        action = config.get('action', 'replace')
+        regex = config.get('regex', '(.*)')
+        # YAML reads an unquoted `regex: true` as a boolean
+        regex = re.compile(str(regex).lower() if isinstance(regex, bool) else str(regex))
+        if action == 'labelmap':
+            for name, value in list(labels.items()):
+                match = regex.fullmatch(name)
+                if match:
+                    labels[match.expand(config.get('replacement', r'\1').replace('$', '\\'))] = value
+            continue
+        source = config.get('separator', ';').join(labels.get(s, '') for s in config.get('source_labels', []))
+        match = regex.fullmatch(source)
+        if action == 'keep' and not match or action == 'drop' and match:
+            return None, steps
+        if action == 'replace' and match:
+            replacement = re.sub(r'\$\{?(\d+)\}?', r'\\\1', str(config.get('replacement', '$1')))
+            labels[config['target_label']] = match.expand(replacement)
+    return labels, len(configs)
+
+
+def discovery_cost(jobs: list[dict], default_interval: float, pods: list[dict], pod_events: float) -> dict:
+    """Per-job and total SD / relabel / scrape figures for one config"""
+    index = {id(p): i for i, p in enumerate(pods)}
+    providers = {}
+    rows = []
+    for job in jobs:
+        interval = parse_duration(job['scrape_interval']) if 'scrape_interval' in job else default_interval
+        row = {'job': job['job_name'], 'interval': interval, 'delivered': 0, 'discovered': 0,
+               'kept': 0, 'relabel_steps': 0}
+        for sd in job['kubernetes_sd_configs']:
+            watches, delivered = api_filter(sd, pods)
+            # Prometheus runs one discoverer per distinct SD config, shared by jobs
+            providers[json.dumps(sd, sort_keys=True)] = (watches, len(delivered))
+            row['delivered'] += len(delivered)
+            for p in delivered:
+                for target in pod_targets(p, index[id(p)]):
+                    row['discovered'] += 1
+                    labels, steps = relabel(target, job.get('relabel_configs', []))
+                    row['relabel_steps'] += steps
+                    row['kept'] += labels is not None
+        row['scrapes_hour'] = row['kept'] * 3600 / interval
+        rows.append(row)
+    totals = {
+        'watches': sum(w for w, _ in providers.values()),
+        'pods_watched': sum(d for _, d in providers.values()),
+        'discovered': sum(r['discovered'] for r in rows),
+        'kept': sum(r['kept'] for r in rows),
+        'scrapes_hour': sum(r['scrapes_hour'] for r in rows),
+        # Each pod update re-sends the pod's target group, relabeled by every job using the SD config
+        'sd_events_hour': sum(d for _, d in providers.values()) * pod_events,
+        'relabel_steps_hour': sum(r['relabel_steps'] for r in rows) * pod_events,
+    }
+    return {'jobs': rows, 'totals': totals}
+
+
+def print_synthetic(label: str, result: dict, scrape_seconds: float):
+    print(f"\n{label}")
+    print(f"  {'job':<25}{'interval':>9}{'pods in':>9}{'targets':>9}{'kept':>7}{'relabel':>9}{'scrapes/h':>11}")
+    for row in result['jobs']:
+        print(f"  {row['job']:<25}{row['interval']:>8g}s{row['delivered']:>9}{row['discovered']:>9}"
+              f"{row['kept']:>7}{row['relabel_steps']:>9}{row['scrapes_hour']:>11,.0f}")
+    t = result['totals']
+    print(f"  {t['watches']} watch(es) receiving {t['pods_watched']} pods, "
+          f"{t['sd_events_hour']:,.0f} SD updates/hour, {t['relabel_steps_hour']:,.0f} relabel steps/hour")
+    print(f"  {t['kept']} targets, {t['scrapes_hour']:,.0f} scrapes/hour "
+          f"(~{t['scrapes_hour'] * scrape_seconds:,.0f} s scrape time/hour at {scrape_seconds * 1000:g} ms each)")
+
+
+# Over the last hour, so a --save taken right after a config reload still
+# reflects the config it ran under
+PROMETHEUS_QUERIES = {
+    'targets': 'count by (job) (up)',
+    'scrapes_hour': 'sum by (job) (count_over_time(up[1h]))',
+    'scrape_seconds_hour': 'sum by (job) (sum_over_time(scrape_duration_seconds[1h]))',
+    'discovered': 'sum by (config) (prometheus_sd_discovered_targets)',
+    'sync_seconds_hour': 'sum by (scrape_job) (increase(prometheus_target_sync_length_seconds_sum[1h]))',
+    'sd_events_hour': 'sum by (role) (increase(prometheus_sd_kubernetes_events_total[1h]))',
+}
+
+
+def prometheus_snapshot(url: str) -> dict:
+    """Target, scrape-duration and SD figures from a running Prometheus, keyed by query then job"""
+    snapshot = {}
+    for key, query in PROMETHEUS_QUERIES.items():
+        response = requests.get(f"{url.rstrip('/')}/api/v1/query", params={'query': query}, timeout=30)
+        response.raise_for_status()
+        snapshot[key] = {next(iter(r['metric'].values()), ''): float(r['value'][1])
+                         for r in response.json()['data']['result']}
+    return snapshot
+
+
+def print_snapshot(label: str, snapshot: dict):
+    print(f"\n{label}")
+    for key, values in snapshot.items():
+        total = sum(values.values())
+        detail = ', '.join(f"{k}={v:,.3g}" for k, v in sorted(values.items()))
+        print(f"  {key:<20}{total:>12,.3f}  {detail}")
+
+
+def print_change(before: dict, after: dict, keys):
+    print("\nchange vs baseline:")
+    for key, label in keys:
+        if before[key]:
+            print(f"  {label}: {before[key]:,.0f} -> {after[key]:,.0f} "
+                  f"({(after[key] - before[key]) / before[key]:+.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare Prometheus pod discovery and scrape cost')
+    parser.add_argument('--baseline', metavar='REF',
+                        help='Git revision to compare against (e.g. the commit before a scrape config change)')
+    parser.add_argument('--teams', type=int, default=50, help='Team namespaces running every challenge')
+    parser.add_argument('--replicas', type=int, default=1, help='Replicas per challenge')
+    parser.add_argument('--other-pods', type=int, default=200, help='Unscraped pods spread over the teams')
+    parser.add_argument('--completed-pods', type=int, default=100, help='Succeeded job pods still listed')
+    parser.add_argument('--pod-events', type=float, default=4,
+                        help='Updates per pod per hour (status changes, restarts, ...)')
+    parser.add_argument('--scrape-seconds', type=float, default=0.01, help='Assumed duration of one scrape')
+    parser.add_argument('--url', help='Read the figures from this Prometheus instead of the synthetic model')
+    parser.add_argument('--save', metavar='FILE', help='With --url, write the figures to FILE')
+    parser.add_argument('--against', metavar='FILE', help='With --url, compare with figures saved earlier')
+    args = parser.parse_args()
+
+    if args.url:
+        try:
+            snapshot = prometheus_snapshot(args.url)
+        except requests.RequestException as e:
+            print(f"Error: Prometheus query failed: {e}")
+            return 1
+        if args.against:
+            before = json.loads(Path(args.against).read_text())
+            print_snapshot(f'baseline ({args.against})', before)
+        print_snapshot(args.url, snapshot)
+        if args.save:
+            Path(args.save).write_text(json.dumps(snapshot, indent=2))
+        if args.against:
+            print_change({k: sum(v.values()) for k, v in before.items()},
+                         {k: sum(v.values()) for k, v in snapshot.items()},
+                         [('targets', 'targets'), ('discovered', 'discovered targets'),
+                          ('scrapes_hour', 'scrapes/hour'), ('scrape_seconds_hour', 'scrape seconds/hour'),
+                          ('sd_events_hour', 'SD events/hour')])
+        return 0
+
+    pods = synthetic_cluster(args.teams, args.replicas, args.other_pods, args.completed_pods)
+    print(f"synthetic cluster: {len(pods)} pods, {args.teams} team namespaces x {len(CHALLENGES)} challenges")
+    generator = load_generator()
+    teams = [f'team-{n}' for n in range(args.teams)]
+    revisions = ([(f'baseline ({args.baseline})', args.baseline)] if args.baseline else [])
+    revisions.append(('working tree', None))
+    results = []
+    for label, ref in revisions:
+        try:
+            configmap = read_file(CONFIG_PATH, ref)
+        except subprocess.CalledProcessError as e:
+            print(f"Error: cannot read {ref}: {e.stderr.strip()}")
+            return 1
+        if generator.BEGIN_MARKER in configmap:
+            # Generated jobs: regenerate them for the synthetic team namespaces
+            challenges = sorted(set(generator.challenge_namespaces()) | set(teams))
+            jobs = generator.render_jobs(challenges, generator.infra_namespaces(), generator.MAX_NAMESPACES)
+            configmap = generator.splice(configmap, jobs)
+            label += ' [generated]'
+        jobs, default_interval = pod_jobs(configmap)
+        result = discovery_cost(jobs, default_interval, pods, args.pod_events)
+        print_synthetic(label, result, args.scrape_seconds)
+        results.append(result['totals'])
+
+    if len(results) == 2:
+        print_change(*results, [('pods_watched', 'pods received from the API server'),
+                                ('discovered', 'targets discovered'),
+                                ('relabel_steps_hour', 'relabel steps/hour'),
+                                ('kept', 'targets scraped'),
+                                ('scrapes_hour', 'scrapes/hour')])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
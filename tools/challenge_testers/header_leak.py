@@ -16,46 +16,60 @@ def test_header_leak_challenge(base_url: Optional[str] = None, verbose: bool = F
     result = TestResult("Header Leak Challenge")
     
     # Determine URL
-    if not base_url:
-        if verbose:
-            print("  Checking if namespace exists...")
-        if not check_namespace_exists('header-leak'):
-            result.failure("Namespace 'header-leak' does not exist. Deploy the challenge first using: kubectl apply -f challenges/beginner/header-leak/")
-            return result
+    with result.timed('lookup'):
+        if not base_url:
+            if verbose:
+                print("  Checking if namespace exists...")
+            if not check_namespace_exists('header-leak'):
+                result.failure("Namespace 'header-leak' does not exist. Deploy the challenge first using: kubectl apply -f challenges/beginner/header-leak/")
+                return result
         
-        if verbose:
-            print("  Checking if service exists...")
-        if not check_service_exists('header-leak', 'header-leak'):
-            result.failure("Service 'header-leak' does not exist in namespace 'header-leak'. Deploy the challenge first.")
-            return result
+            if verbose:
+                print("  Checking if service exists...")
+            if not check_service_exists('header-leak', 'header-leak'):
+                result.failure("Service 'header-leak' does not exist in namespace 'header-leak'. Deploy the challenge first.")
+                return result
         
-        if verbose:
-            print("  Waiting for service NodePort...")
-        port = wait_for_service('header-leak', 'header-leak')
-        if not port:
-            result.failure("Could not get service NodePort. The service may not be ready yet. Try: kubectl get svc -n header-leak")
-            result.details['namespace_exists'] = check_namespace_exists('header-leak')
-            result.details['service_exists'] = check_service_exists('header-leak', 'header-leak')
-            return result
-        base_url = f"http://localhost:{port}"
+            if verbose:
+                print("  Waiting for service NodePort...")
+            port = wait_for_service('header-leak', 'header-leak')
+            if not port:
+                result.failure("Could not get service NodePort. The service may not be ready yet. Try: kubectl get svc -n header-leak")
+                result.details['namespace_exists'] = check_namespace_exists('header-leak')
+                result.details['service_exists'] = check_service_exists('header-leak', 'header-leak')
+                return result
+            base_url = f"http://localhost:{port}"
     
     # Check service health with retries (pods might still be starting)
-    if verbose:
-        print("  Checking service health...")
-    is_healthy, health_error = check_service_health(base_url, timeout=10, retries=5, retry_delay=3)
-    if not is_healthy:
-        error_msg = f"Service not healthy at {base_url} after multiple attempts."
-        if health_error:
-            error_msg += f" Error: {health_error}"
-        result.failure(error_msg)
-        result.details['base_url'] = base_url
-        result.details['health_error'] = health_error
-        result.details['suggestion'] = "Try checking pod status: kubectl get pods -n header-leak && kubectl logs -n header-leak -l app=header-leak"
-        return result
+    with result.timed('health'):
+        if verbose:
+            print("  Checking service health...")
+        is_healthy, health_error = check_service_health(base_url, timeout=10, retries=5, retry_delay=3)
+        if not is_healthy:
+            error_msg = f"Service not healthy at {base_url} after multiple attempts."
+            if health_error:
+                error_msg += f" Error: {health_error}"
+            result.failure(error_msg)
+            result.details['base_url'] = base_url
+            result.details['health_error'] = health_error
+            result.details['suggestion'] = "Try checking pod status: kubectl get pods -n header-leak && kubectl logs -n header-leak -l app=header-leak"
+            return result
     
+    with result.timed('exploit'):
+        exploited = exploit_header_leak(base_url)
+    exploited.timings = result.timings
+    return exploited
+
+
+def exploit_header_leak(base_url: str, session=requests, timeout: float = 10) -> TestResult:
+    """Extract the flag from the response headers of a running header-leak service
+
+    `session` may be a requests.Session to reuse connections across checks.
+    """
+    result = TestResult("Header Leak Challenge")
     try:
         # Make a request to any endpoint
-        response = requests.get(f"{base_url}/api/status", timeout=10)
+        response = session.get(f"{base_url}/api/status", timeout=timeout)
         
         if response.status_code != 200:
             result.failure(f"Unexpected status code: {response.status_code}")
@@ -16,43 +16,57 @@ def test_hidden_params_challenge(base_url: Optional[str] = None, verbose: bool =
     result = TestResult("Hidden Params Challenge")
     
     # Determine URL
-    if not base_url:
-        if verbose:
-            print("  Checking if namespace exists...")
-        if not check_namespace_exists('hidden-params'):
-            result.failure("Namespace 'hidden-params' does not exist. Deploy the challenge first using: kubectl apply -f challenges/beginner/hidden-params/")
-            return result
+    with result.timed('lookup'):
+        if not base_url:
+            if verbose:
+                print("  Checking if namespace exists...")
+            if not check_namespace_exists('hidden-params'):
+                result.failure("Namespace 'hidden-params' does not exist. Deploy the challenge first using: kubectl apply -f challenges/beginner/hidden-params/")
+                return result
         
-        if verbose:
-            print("  Checking if service exists...")
-        if not check_service_exists('hidden-params', 'hidden-params'):
-            result.failure("Service 'hidden-params' does not exist in namespace 'hidden-params'. Deploy the challenge first.")
-            return result
+            if verbose:
+                print("  Checking if service exists...")
+            if not check_service_exists('hidden-params', 'hidden-params'):
+                result.failure("Service 'hidden-params' does not exist in namespace 'hidden-params'. Deploy the challenge first.")
+                return result
         
-        if verbose:
-            print("  Waiting for service NodePort...")
-        port = wait_for_service('hidden-params', 'hidden-params')
-        if not port:
-            result.failure("Could not get service NodePort. The service may not be ready yet. Try: kubectl get svc -n hidden-params")
-            result.details['namespace_exists'] = check_namespace_exists('hidden-params')
-            result.details['service_exists'] = check_service_exists('hidden-params', 'hidden-params')
-            return result
-        base_url = f"http://localhost:{port}"
+            if verbose:
+                print("  Waiting for service NodePort...")
+            port = wait_for_service('hidden-params', 'hidden-params')
+            if not port:
+                result.failure("Could not get service NodePort. The service may not be ready yet. Try: kubectl get svc -n hidden-params")
+                result.details['namespace_exists'] = check_namespace_exists('hidden-params')
+                result.details['service_exists'] = check_service_exists('hidden-params', 'hidden-params')
+                return result
+            base_url = f"http://localhost:{port}"
     
     # Check service health with retries (pods might still be starting)
-    if verbose:
-        print("  Checking service health...")
-    is_healthy, health_error = check_service_health(base_url, timeout=10, retries=5, retry_delay=3)
-    if not is_healthy:
-        error_msg = f"Service not healthy at {base_url} after multiple attempts."
-        if health_error:
-            error_msg += f" Error: {health_error}"
-        result.failure(error_msg)
-        result.details['base_url'] = base_url
-        result.details['health_error'] = health_error
-        result.details['suggestion'] = "Try checking pod status: kubectl get pods -n hidden-params && kubectl logs -n hidden-params -l app=hidden-params"
-        return result
+    with result.timed('health'):
+        if verbose:
+            print("  Checking service health...")
+        is_healthy, health_error = check_service_health(base_url, timeout=10, retries=5, retry_delay=3)
+        if not is_healthy:
+            error_msg = f"Service not healthy at {base_url} after multiple attempts."
+            if health_error:
+                error_msg += f" Error: {health_error}"
+            result.failure(error_msg)
+            result.details['base_url'] = base_url
+            result.details['health_error'] = health_error
+            result.details['suggestion'] = "Try checking pod status: kubectl get pods -n hidden-params && kubectl logs -n hidden-params -l app=hidden-params"
+            return result
     
+    with result.timed('exploit'):
+        exploited = exploit_hidden_params(base_url)
+    exploited.timings = result.timings
+    return exploited
+
+
+def exploit_hidden_params(base_url: str, session=requests, timeout: float = 10) -> TestResult:
+    """Log in with the hidden admin parameter on a running hidden-params service
+
+    `session` may be a requests.Session to reuse connections across checks.
+    """
+    result = TestResult("Hidden Params Challenge")
     try:
         # Test hidden parameter vulnerability
         # The login endpoint accepts a hidden "admin=true" parameter
@@ -62,10 +76,10 @@ def test_hidden_params_challenge(base_url: Optional[str] = None, verbose: bool =
             'admin': 'true'  # Hidden parameter that bypasses auth
         }
         
-        response = requests.post(
+        response = session.post(
             f"{base_url}/api/login",
             data=login_data,
-            timeout=10
+            timeout=timeout
         )
         
         if response.status_code != 200:
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Generate the pod scrape jobs of monitoring/prometheus/configmap.yaml
+Both pod jobs used to watch every pod in the cluster and throw most of them
+away in relabeling. The generated jobs let the API server do the filtering
+(namespace lists, tier label and Running phase selectors) and scrape each
+tier at its own interval: challenges every 30s, infrastructure every 15s.
+Challenge namespaces come from the challenge manifests, plus any team
+namespaces given on the command line or found in the cluster. While the
+challenge job is namespace-scoped, a cluster-wide job scrapes tier=challenge
+pods in any other namespace every 2m, so a namespace added without
+regenerating is scraped late rather than never.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONFIGMAP = REPO_ROOT / 'monitoring' / 'prometheus' / 'configmap.yaml'
+CHALLENGE_GLOB = 'challenges/*/*/deployment.yaml'
+# Manifests whose annotated pods the kubernetes-pods job scrapes
+INFRA_GLOBS = ('monitoring/*/*.yaml', 'examples/*/*.yaml', 'status-page/deployment.yaml')
+# Not deployed from this repo, but k3s runs annotated pods (traefik) there
+INFRA_NAMESPACES = ('kube-system',)
+
+CHALLENGE_INTERVAL = '30s'
+INFRA_INTERVAL = '15s'
+UNLISTED_INTERVAL = '2m'
+# Beyond this many namespaces one cluster-wide watch with a label selector is
+# cheaper than a watch per namespace
+MAX_NAMESPACES = 10
+
+BEGIN_MARKER = '# BEGIN pod scrape jobs (generated by tools/gen-scrape-config.py)'
+END_MARKER = '# END pod scrape jobs'
+INDENT = ' ' * 6
+
+
+def pod_templates(path: Path):
+    """(namespace, pod template metadata) of each workload in a manifest"""
+    try:
+        documents = list(yaml.safe_load_all(path.read_text()))
+    except yaml.YAMLError:
+        return
+    for document in documents:
+        if not isinstance(document, dict):
+            continue
+        template = (document.get('spec') or {}).get('template')
+        if template:
+            namespace = document.get('metadata', {}).get('namespace', 'default')
+            yield namespace, template.get('metadata') or {}
+
+
+def challenge_namespaces() -> list[str]:
+    """Namespaces of the challenge deployments (pods labeled tier: challenge)"""
+    namespaces = set()
+    for path in REPO_ROOT.glob(CHALLENGE_GLOB):
+        for namespace, metadata in pod_templates(path):
+            if (metadata.get('labels') or {}).get('tier') == 'challenge':
+                namespaces.add(namespace)
+    return sorted(namespaces)
+
+
+def infra_namespaces() -> list[str]:
+    """Namespaces with pods carrying prometheus.io/scrape annotations"""
+    namespaces = set(INFRA_NAMESPACES)
+    for pattern in INFRA_GLOBS:
+        for path in REPO_ROOT.glob(pattern):
+            for namespace, metadata in pod_templates(path):
+                if (metadata.get('annotations') or {}).get('prometheus.io/scrape') == 'true':
+                    namespaces.add(namespace)
+    return sorted(namespaces)
+
+
+def cluster_challenge_namespaces() -> list[str]:
+    """Namespaces currently running challenge pods, from kubectl"""
+    result = subprocess.run(
+        ['kubectl', 'get', 'pods', '--all-namespaces', '-l', 'tier=challenge', '-o', 'json'],
+        capture_output=True,
+        text=True,
+        timeout=30
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or 'kubectl failed')
+    return sorted({pod['metadata']['namespace'] for pod in json.loads(result.stdout)['items']})
+
+
+def sd_config(namespaces: list[str], label: str, max_namespaces: int) -> list[str]:
+    """kubernetes_sd_configs lines for pods matching `label` in `namespaces`"""
+    lines = ['kubernetes_sd_configs:', '  - role: pod']
+    if len(namespaces) <= max_namespaces:
+        lines += ['    namespaces:', '      names:']
+        lines += [f'        - {namespace}' for namespace in namespaces]
+    lines += ['    selectors:', '      - role: pod', f'        label: {label}',
+              '        field: status.phase=Running']
+    return lines
+
+
+def render_jobs(challenges: list[str], infra: list[str], max_namespaces: int) -> str:
+    """The generated scrape_configs entries, indented for prometheus.yml in the ConfigMap"""
+    scope = ('namespace-scoped' if len(challenges) <= max_namespaces
+             else f'cluster-wide, {len(challenges)} namespaces')
+    lines = [
+        BEGIN_MARKER,
+        '# Annotated infrastructure pods',
+        "- job_name: 'kubernetes-pods'",
+        f'  scrape_interval: {INFRA_INTERVAL}',
+    ]
+    lines += ['  ' + line for line in sd_config(infra, 'tier!=challenge', max_namespaces=len(infra))]
+    lines += [
+        '  relabel_configs:',
+        '    - source_labels: [__meta_kubernetes_pod_annotation_prometheus_io_scrape]',
+        '      action: keep',
+        '      regex: true',
+        '    - source_labels: [__meta_kubernetes_pod_annotation_prometheus_io_path]',
+        '      action: replace',
+        '      target_label: __metrics_path__',
+        '      regex: (.+)',
+        '    - source_labels: [__address__, __meta_kubernetes_pod_annotation_prometheus_io_port]',
+        '      action: replace',
+        r'      regex: ([^:]+)(?::\d+)?;(\d+)',
+        '      replacement: $1:$2',
+        '      target_label: __address__',
+        '    - action: labelmap',
+        '      regex: __meta_kubernetes_pod_label_(.+)',
+        '    - source_labels: [__meta_kubernetes_namespace]',
+        '      action: replace',
+        '      target_label: kubernetes_namespace',
+        '    - source_labels: [__meta_kubernetes_pod_name]',
+        '      action: replace',
+        '      target_label: kubernetes_pod_name',
+        '',
+        f'# CTF challenge apps (challenges/common/ctf_metrics.py on the http port), {scope}',
+        "- job_name: 'ctf-challenges'",
+        f'  scrape_interval: {CHALLENGE_INTERVAL}',
+        '  metrics_path: /metrics',
+    ]
+    lines += ['  ' + line for line in sd_config(challenges, 'tier=challenge', max_namespaces)]
+    lines += challenge_relabeling()
+    if len(challenges) <= max_namespaces:
+        lines += [
+            '',
+            '# Challenge pods in namespaces not listed above (regenerate to scrape them every '
+            f'{CHALLENGE_INTERVAL})',
+            "- job_name: 'ctf-challenges-unlisted'",
+            f'  scrape_interval: {UNLISTED_INTERVAL}',
+            '  metrics_path: /metrics',
+        ]
+        lines += ['  ' + line for line in sd_config(challenges, 'tier=challenge', max_namespaces=-1)]
+        lines += challenge_relabeling(
+            ['    - source_labels: [__meta_kubernetes_namespace]',
+             '      action: drop',
+             f"      regex: '{'|'.join(challenges)}'"] if challenges else [])
+    lines.append(END_MARKER)
+    return ''.join(f'{INDENT}{line}\n' if line else f'{INDENT}\n' for line in lines)
+
+
+def challenge_relabeling(first: list[str] = ()) -> list[str]:
+    """relabel_configs of the challenge jobs, after the `first` rules"""
+    return [
+        '  relabel_configs:',
+        *first,
+        '    - source_labels: [__meta_kubernetes_pod_container_port_name]',
+        '      action: keep',
+        '      regex: http',
+        '    - source_labels: [__meta_kubernetes_pod_label_app]',
+        '      action: replace',
+        '      target_label: app',
+        '    - source_labels: [__meta_kubernetes_namespace]',
+        '      action: replace',
+        '      target_label: kubernetes_namespace',
+        '    - source_labels: [__meta_kubernetes_pod_name]',
+        '      action: replace',
+        '      target_label: kubernetes_pod_name',
+    ]
+
+
+def splice(current: str, jobs: str) -> str:
+    """Replace the generated region of the ConfigMap with `jobs`"""
+    start = current.index(f'{INDENT}{BEGIN_MARKER}\n')
+    end = current.index(f'{INDENT}{END_MARKER}\n', start) + len(f'{INDENT}{END_MARKER}\n')
+    return current[:start] + jobs + current[end:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate the Prometheus pod scrape jobs')
+    parser.add_argument('--teams', type=int, default=0,
+                        help='Add N team namespaces named by --team-format')
+    parser.add_argument('--team-format', default='team-{n}',
+                        help='Team namespace name, {n} is the team number (default: team-{n})')
+    parser.add_argument('--namespace', action='append', default=[],
+                        help='Extra challenge namespace (repeatable)')
+    parser.add_argument('--from-cluster', action='store_true',
+                        help='Add the namespaces currently running tier=challenge pods (kubectl)')
+    parser.add_argument('--max-namespaces', type=int, default=MAX_NAMESPACES,
+                        help='Switch the challenge job to one cluster-wide watch beyond this many '
+                             f'namespaces (default: {MAX_NAMESPACES})')
+    parser.add_argument('--stdout', action='store_true', help='Print the jobs instead of updating the ConfigMap')
+    parser.add_argument('--check', action='store_true',
+                        help='Only report whether the ConfigMap is up to date (exit 1 if not)')
+    args = parser.parse_args()
+
+    challenges = set(challenge_namespaces()) | set(args.namespace)
+    challenges |= {args.team_format.format(n=n) for n in range(args.teams)}
+    if args.from_cluster:
+        try:
+            challenges |= set(cluster_challenge_namespaces())
+        except (RuntimeError, OSError, subprocess.TimeoutExpired) as e:
+            print(f"Error: cannot list challenge pods: {e}")
+            return 1
+    infra = infra_namespaces()
+    overlap = challenges & set(infra)
+    if overlap:
+        # Harmless (the tier selectors keep the jobs apart) but worth knowing
+        print(f"Warning: namespaces in both tiers: {', '.join(sorted(overlap))}", file=sys.stderr)
+
+    jobs = render_jobs(sorted(challenges), infra, args.max_namespaces)
+    if args.stdout:
+        print(jobs, end='')
+        return 0
+
+    current = CONFIGMAP.read_text()
+    try:
+        rendered = splice(current, jobs)
+    except ValueError:
+        print(f"Error: {CONFIGMAP.relative_to(REPO_ROOT)} has no '{BEGIN_MARKER}' region")
+        return 1
+    if rendered == current:
+        return 0
+    if args.check:
+        print(f"Out of date: {CONFIGMAP.relative_to(REPO_ROOT)}")
+        return 1
+    CONFIGMAP.write_text(rendered)
+    print(f"Updated {CONFIGMAP.relative_to(REPO_ROOT)} "
+          f"({len(challenges)} challenge namespaces, {len(infra)} infrastructure namespaces)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
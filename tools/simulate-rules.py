@@ -0,0 +1,1310 @@
+#!/usr/bin/env python3
+"""
+Lint and simulate the Prometheus alert rules offline
+Loads the rules ConfigMap (monitoring/prometheus/alert-rules.yaml), evaluates
+the recording and alerting rules over time series stored as NumPy arrays and
+reports when each alert would have fired. Series come from the built-in
+synthetic cluster generator or are recorded from a live Prometheus.
+
+Evaluation is vectorized over the whole time range: each PromQL node works on
+(series x samples) arrays, processed in chunks so a week of 15s samples for
+thousands of series fits in memory.
+"""
+
+import argparse
+import json
+import math
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+import requests
+import yaml
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_RULES = REPO_DIR / 'monitoring' / 'prometheus' / 'alert-rules.yaml'
+
+# Prometheus defaults
+LOOKBACK_DELTA = 300.0
+DEFAULT_EVALUATION_INTERVAL = 15.0
+
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'y': 31536000}
+COUNTER_SUFFIXES = ('_total', '_bucket', '_count', '_sum')
+
+
+class RuleError(Exception):
+    """A rule uses syntax or features the simulator does not support"""
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in a Prometheus duration such as 30s, 5m or 1h30m"""
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|[smhdwy])', text)
+    if not parts or ''.join(v + u for v, u in parts) != text.strip():
+        raise RuleError(f"invalid duration: {text!r}")
+    return sum(float(value) * DURATION_UNITS[unit] for value, unit in parts)
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    parts = []
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60), ('s', 1)):
+        if seconds >= size or (unit == 's' and not parts):
+            parts.append(f"{seconds // size}{unit}")
+            seconds %= size
+    return ''.join(parts)
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+# ---------------------------------------------------------------------------
+# PromQL subset: parser
+# ---------------------------------------------------------------------------
+
+class Number(NamedTuple):
+    value: float
+
+
+class Selector(NamedTuple):
+    name: Optional[str]
+    matchers: tuple          # ((label, op, value), ...)
+    range: float             # seconds; 0 for an instant selector
+
+
+class Call(NamedTuple):
+    func: str
+    args: tuple
+
+
+class Aggregate(NamedTuple):
+    op: str
+    by: Optional[tuple]
+    without: Optional[tuple]
+    expr: object
+
+
+class Binary(NamedTuple):
+    op: str
+    lhs: object
+    rhs: object
+    bool: bool
+    on: Optional[tuple]
+    ignoring: Optional[tuple]
+
+
+class Unary(NamedTuple):
+    op: str
+    expr: object
+
+
+AGGREGATIONS = {'sum', 'avg', 'min', 'max', 'count'}
+RANGE_FUNCTIONS = {'rate', 'increase', 'irate', 'avg_over_time', 'min_over_time', 'max_over_time',
+                   'sum_over_time', 'count_over_time'}
+FUNCTIONS = RANGE_FUNCTIONS | {'histogram_quantile', 'abs', 'clamp_min', 'clamp_max'}
+PRECEDENCE = {'or': 1, 'and': 2, 'unless': 2, '==': 3, '!=': 3, '<': 3, '>': 3, '<=': 3, '>=': 3,
+              '+': 4, '-': 4, '*': 5, '/': 5, '%': 5, '^': 6}
+COMPARISONS = {'==', '!=', '<', '>', '<=', '>='}
+SET_OPERATORS = {'and', 'or', 'unless'}
+
+TOKEN_RE = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<matchers>\{[^}]*\})
+  | (?P<range>\[[^\]]*\])
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<ident>[a-zA-Z_:][a-zA-Z0-9_:]*)
+  | (?P<op>==|!=|>=|<=|[-+*/%^<>(),])
+''', re.VERBOSE)
+MATCHER_RE = re.compile(r'\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*(=~|!~|!=|=)\s*"((?:[^"\\]|\\.)*)"\s*(?:,|$)')
+
+
+def tokenize(expr: str) -> list[tuple]:
+    tokens = []
+    position = 0
+    while position < len(expr):
+        match = TOKEN_RE.match(expr, position)
+        if not match:
+            raise RuleError(f"unexpected {expr[position:position + 10]!r}")
+        if match.lastgroup != 'space':
+            tokens.append((match.lastgroup, match.group()))
+        position = match.end()
+    return tokens
+
+
+def parse_matchers(text: str) -> tuple:
+    body = text[1:-1].strip()
+    matchers = []
+    position = 0
+    while position < len(body):
+        match = MATCHER_RE.match(body, position)
+        if not match:
+            raise RuleError(f"cannot parse label matchers {text!r}")
+        label, op, value = match.groups()
+        matchers.append((label, op, value.encode().decode('unicode_escape')))
+        position = match.end()
+    return tuple(matchers)
+
+
+class Parser:
+    """Recursive-descent parser for the PromQL the rules use"""
+
+    def __init__(self, expr: str):
+        self.tokens = tokenize(expr)
+        self.position = 0
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if token[0] is None or (value is not None and token[1] != value):
+            raise RuleError(f"expected {value or 'more input'}, found {token[1]!r}")
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.expression(0)
+        if self.peek()[0] is not None:
+            raise RuleError(f"unexpected {self.peek()[1]!r}")
+        return node
+
+    def label_list(self) -> tuple:
+        self.take('(')
+        labels = []
+        while self.peek()[1] != ')':
+            labels.append(self.take()[1])
+            if self.peek()[1] == ',':
+                self.take(',')
+        self.take(')')
+        return tuple(labels)
+
+    def expression(self, min_precedence: int):
+        lhs = self.unary()
+        while True:
+            op = self.peek()[1]
+            op = op.lower() if op else op
+            if op not in PRECEDENCE or PRECEDENCE[op] < min_precedence:
+                return lhs
+            self.take()
+            is_bool = on = ignoring = None
+            if self.peek()[1] == 'bool':
+                if op not in COMPARISONS:
+                    raise RuleError(f"bool modifier on non-comparison {op}")
+                self.take()
+                is_bool = True
+            if self.peek()[1] in ('on', 'ignoring'):
+                modifier = self.take()[1]
+                labels = self.label_list()
+                on, ignoring = (labels, None) if modifier == 'on' else (None, labels)
+            if self.peek()[1] in ('group_left', 'group_right'):
+                raise RuleError(f"{self.peek()[1]} (many-to-one matching) is not supported")
+            # ^ is right-associative, everything else left-associative
+            rhs = self.expression(PRECEDENCE[op] + (0 if op == '^' else 1))
+            lhs = Binary(op, lhs, rhs, bool(is_bool), on, ignoring)
+
+    def unary(self):
+        if self.peek()[1] in ('-', '+'):
+            op = self.take()[1]
+            # Unary minus binds looser than ^: -x^2 is -(x^2)
+            node = self.expression(PRECEDENCE['^'])
+            return Unary('-', node) if op == '-' else node
+        return self.primary()
+
+    def primary(self):
+        kind, value = self.peek()
+        if kind == 'number':
+            self.take()
+            return Number(float(value))
+        if value == '(':
+            self.take('(')
+            node = self.expression(0)
+            self.take(')')
+            if self.peek()[0] == 'range':
+                raise RuleError("subqueries are not supported")
+            return node
+        if kind == 'matchers':
+            return self.selector(None)
+        if kind != 'ident':
+            raise RuleError(f"unexpected {value!r}")
+        name = value
+        if name in AGGREGATIONS or name in ('topk', 'bottomk', 'quantile', 'stddev', 'stdvar', 'count_values', 'group'):
+            return self.aggregation()
+        if self.peek(1)[1] == '(':
+            return self.call()
+        if name.lower() in ('inf', 'nan'):
+            self.take()
+            return Number(float(name))
+        return self.selector(name)
+
+    def aggregation(self):
+        op = self.take()[1]
+        if op not in AGGREGATIONS:
+            raise RuleError(f"aggregation {op}() is not supported")
+        by = without = None
+        if self.peek()[1] in ('by', 'without'):
+            modifier = self.take()[1]
+            labels = self.label_list()
+            by, without = (labels, None) if modifier == 'by' else (None, labels)
+        self.take('(')
+        expr = self.expression(0)
+        self.take(')')
+        if self.peek()[1] in ('by', 'without'):
+            modifier = self.take()[1]
+            labels = self.label_list()
+            by, without = (labels, None) if modifier == 'by' else (None, labels)
+        return Aggregate(op, by, without, expr)
+
+    def call(self):
+        func = self.take()[1]
+        if func not in FUNCTIONS:
+            raise RuleError(f"function {func}() is not supported")
+        self.take('(')
+        args = []
+        while self.peek()[1] != ')':
+            args.append(self.expression(0))
+            if self.peek()[1] == ',':
+                self.take(',')
+        self.take(')')
+        return Call(func, tuple(args))
+
+    def selector(self, name):
+        if name is not None:
+            self.take()
+        matchers = ()
+        if self.peek()[0] == 'matchers':
+            matchers = parse_matchers(self.take()[1])
+        if name is None and not any(label == '__name__' for label, _, _ in matchers):
+            raise RuleError("selector without a metric name")
+        range_seconds = 0.0
+        if self.peek()[0] == 'range':
+            text = self.take()[1][1:-1]
+            if ':' in text:
+                raise RuleError("subqueries are not supported")
+            range_seconds = parse_duration(text)
+        if self.peek()[1] == 'offset' or self.peek()[1] == '@':
+            raise RuleError("offset and @ modifiers are not supported")
+        return Selector(name, matchers, range_seconds)
+
+
+def parse(expr: str):
+    return Parser(expr).parse()
+
+
+def walk(node):
+    """Every node of an expression tree, depth first"""
+    yield node
+    children = ()
+    if isinstance(node, Call):
+        children = node.args
+    elif isinstance(node, Aggregate):
+        children = (node.expr,)
+    elif isinstance(node, Binary):
+        children = (node.lhs, node.rhs)
+    elif isinstance(node, Unary):
+        children = (node.expr,)
+    for child in children:
+        yield from walk(child)
+
+
+def output_labels(node) -> Optional[set]:
+    """Labels an expression's result can carry, or None when it depends on the data"""
+    if isinstance(node, Number):
+        return set()
+    if isinstance(node, Selector):
+        return None
+    if isinstance(node, Aggregate):
+        return set(node.by) if node.by is not None else None
+    if isinstance(node, Call):
+        vector_args = [a for a in node.args if not isinstance(a, Number)]
+        labels = output_labels(vector_args[-1]) if vector_args else set()
+        if node.func == 'histogram_quantile' and labels is not None:
+            labels = labels - {'le'}
+        return labels
+    if isinstance(node, Unary):
+        return output_labels(node.expr)
+    if isinstance(node, Binary):
+        if node.on is not None and node.op not in SET_OPERATORS:
+            return set(node.on)
+        left = output_labels(node.lhs)
+        if isinstance(node.lhs, Number):
+            return output_labels(node.rhs)
+        if node.op == 'or':
+            right = output_labels(node.rhs)
+            return None if left is None or right is None else left | right
+        return left
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Series storage
+# ---------------------------------------------------------------------------
+
+class Dataset:
+    """Series on a regular time grid: one (series x samples) .npy file per metric
+
+    Layout of the directory:
+        meta.json     {"start", "step", "samples", "metrics": {name: {"file", "labels"}}}
+        <file>.npy    values, NaN where the series has no sample
+    Arrays are memory-mapped; only the chunk being evaluated is read.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        meta = json.loads((self.path / 'meta.json').read_text())
+        self.start = float(meta['start'])
+        self.step = float(meta['step'])
+        self.samples = int(meta['samples'])
+        self.metrics = meta['metrics']
+        self.incidents = meta.get('incidents', [])
+        self._arrays = {}
+
+    def labels(self, name: str) -> list[dict]:
+        return self.metrics[name]['labels'] if name in self.metrics else []
+
+    def values(self, name: str, rows, lo: int, hi: int) -> np.ndarray:
+        """float64 samples [lo, hi) for the given rows; columns before 0 are NaN"""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(self.path / self.metrics[name]['file'], mmap_mode='r')
+        out = np.full((len(rows), hi - lo), np.nan)
+        if len(rows):
+            start = max(lo, 0)
+            out[:, start - lo:] = self._arrays[name][rows, start:hi]
+        return out
+
+    @property
+    def series_count(self) -> int:
+        return sum(len(m['labels']) for m in self.metrics.values())
+
+
+class DatasetWriter:
+    """Create a Dataset directory, one memory-mapped array per metric"""
+
+    def __init__(self, path, start: float, step: float, samples: int):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.start, self.step, self.samples = start, step, samples
+        self.metrics = {}
+        self.incidents = []
+
+    def add(self, name: str, labels: list[dict]) -> np.ndarray:
+        """Writable (series x samples) array for `name`; counters are kept in float64"""
+        dtype = np.float64 if name.endswith(COUNTER_SUFFIXES) else np.float32
+        filename = f"m{len(self.metrics):03d}.npy"
+        self.metrics[name] = {'file': filename, 'labels': labels}
+        return np.lib.format.open_memmap(self.path / filename, mode='w+', dtype=dtype,
+                                         shape=(len(labels), self.samples))
+
+    def close(self):
+        meta = {'start': self.start, 'step': self.step, 'samples': self.samples,
+                'metrics': self.metrics, 'incidents': self.incidents}
+        (self.path / 'meta.json').write_text(json.dumps(meta))
+
+
+# ---------------------------------------------------------------------------
+# Vectorized evaluation
+# ---------------------------------------------------------------------------
+
+class Vector(NamedTuple):
+    labels: list            # one dict per row
+    values: np.ndarray      # (rows, samples), NaN = no value at that sample
+
+
+class RangeVector(NamedTuple):
+    labels: list
+    values: np.ndarray      # raw samples, NaN = no sample
+    window: int             # samples per range
+
+
+def shift(values: np.ndarray, k: int, fill=0) -> np.ndarray:
+    """values moved k samples later along the time axis"""
+    if k <= 0:
+        return values
+    out = np.empty_like(values)
+    out[:, :k] = fill
+    out[:, k:] = values[:, :-k]
+    return out
+
+
+def last_sample_index(values: np.ndarray) -> np.ndarray:
+    """Index of the latest non-NaN sample at or before each position (-1 if none)"""
+    positions = np.where(np.isfinite(values), np.arange(values.shape[1]), -1)
+    return np.maximum.accumulate(positions, axis=1)
+
+
+def lookback(values: np.ndarray, max_age: int) -> np.ndarray:
+    """Instant-vector values: the latest sample no older than the lookback delta"""
+    if not values.size or np.isfinite(values).all():
+        return values
+    last = last_sample_index(values)
+    filled = np.take_along_axis(values, np.maximum(last, 0), axis=1)
+    stale = (last < 0) | (np.arange(values.shape[1]) - last > max_age)
+    filled[stale] = np.nan
+    return filled
+
+
+def drop_name(labels: list) -> list:
+    return [{k: v for k, v in l.items() if k != '__name__'} for l in labels]
+
+
+def group_rows(keys: list) -> tuple:
+    """(row order, group start offsets, unique keys) for reduceat-style grouping"""
+    ids = {}
+    group_of = np.array([ids.setdefault(key, len(ids)) for key in keys], dtype=np.int64)
+    order = np.argsort(group_of, kind='stable')
+    sorted_ids = group_of[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]]) if len(keys) else np.array([], int)
+    return order, starts, list(ids)
+
+
+class Evaluator:
+    """Evaluates parsed expressions over one chunk of a Dataset
+
+    All vectors share the chunk's time axis; series are never dropped, a
+    missing value is NaN, so every rule returns the same rows in every chunk
+    and per-chunk results line up.
+    """
+
+    def __init__(self, dataset: Dataset, lo: int, hi: int, recorded: dict, row_cache: dict):
+        self.dataset = dataset
+        self.lo, self.hi = lo, hi
+        self.step = dataset.step
+        self.recorded = recorded        # name -> Vector for this chunk
+        self.row_cache = row_cache      # selector -> (rows, labels), shared across chunks
+
+    def evaluate(self, node):
+        method = getattr(self, f"eval_{type(node).__name__.lower()}")
+        return method(node)
+
+    def eval_number(self, node):
+        return node.value
+
+    def select(self, node: Selector) -> tuple:
+        """(source name, row indexes, labels) of the series a selector matches"""
+        key = (node.name, node.matchers)
+        if key not in self.row_cache:
+            matchers = [(label, op, re.compile(value) if op in ('=~', '!~') else value)
+                        for label, op, value in node.matchers]
+            names = [node.name] if node.name else list(self.dataset.metrics) + list(self.recorded)
+            found = []
+            for name in names:
+                candidates = (self.recorded[name].labels if name in self.recorded
+                              else self.dataset.labels(name))
+                rows = [i for i, labels in enumerate(candidates)
+                        if labels_match({'__name__': name, **labels}, matchers)]
+                if rows:
+                    found.append((name, rows, [{'__name__': name, **candidates[i]} for i in rows]))
+            self.row_cache[key] = found
+        return self.row_cache[key]
+
+    def eval_selector(self, node):
+        labels, blocks = [], []
+        for name, rows, row_labels in self.select(node):
+            if name in self.recorded:
+                block = self.recorded[name].values[rows]
+            else:
+                block = self.dataset.values(name, rows, self.lo, self.hi)
+            labels += row_labels
+            blocks.append(block)
+        values = np.vstack(blocks) if blocks else np.empty((0, self.hi - self.lo))
+        if node.range:
+            return RangeVector(labels, values, max(1, int(round(node.range / self.step))))
+        return Vector(labels, lookback(values, int(LOOKBACK_DELTA / self.step)))
+
+    def eval_unary(self, node):
+        value = self.evaluate(node.expr)
+        if isinstance(value, Vector):
+            return Vector(drop_name(value.labels), -value.values)
+        return -value
+
+    def eval_call(self, node):
+        args = [self.evaluate(arg) for arg in node.args]
+        func = node.func
+        if func in RANGE_FUNCTIONS:
+            if len(args) != 1 or not isinstance(args[0], RangeVector):
+                raise RuleError(f"{func}() expects one range vector")
+            return range_function(func, args[0], self.step)
+        if func == 'histogram_quantile':
+            if len(args) != 2 or not isinstance(args[0], float) or not isinstance(args[1], Vector):
+                raise RuleError("histogram_quantile() expects a scalar and an instant vector")
+            return histogram_quantile(args[0], args[1])
+        vector = args[0]
+        if not isinstance(vector, Vector):
+            raise RuleError(f"{func}() expects an instant vector")
+        if func == 'abs':
+            return Vector(drop_name(vector.labels), np.abs(vector.values))
+        return Vector(drop_name(vector.labels),
+                      (np.fmax if func == 'clamp_min' else np.fmin)(vector.values, args[1]))
+
+    def eval_aggregate(self, node):
+        vector = self.evaluate(node.expr)
+        if not isinstance(vector, Vector):
+            raise RuleError(f"{node.op}() expects an instant vector")
+        return aggregate(node.op, vector, node.by, node.without)
+
+    def eval_binary(self, node):
+        lhs, rhs = self.evaluate(node.lhs), self.evaluate(node.rhs)
+        if isinstance(lhs, RangeVector) or isinstance(rhs, RangeVector):
+            raise RuleError("range vectors cannot be operands")
+        if not isinstance(lhs, Vector) and not isinstance(rhs, Vector):
+            if node.op in COMPARISONS and not node.bool:
+                raise RuleError("comparisons between scalars need bool")
+            return float(apply_operator(node.op, np.float64(lhs), np.float64(rhs)))
+        if node.op in SET_OPERATORS:
+            if not (isinstance(lhs, Vector) and isinstance(rhs, Vector)):
+                raise RuleError(f"{node.op} needs vectors on both sides")
+            return set_operation(node, lhs, rhs)
+        if isinstance(lhs, Vector) and isinstance(rhs, Vector):
+            return vector_binary(node, lhs, rhs)
+        vector, scalar = (lhs, rhs) if isinstance(lhs, Vector) else (rhs, lhs)
+        left, right = (vector.values, scalar) if vector is lhs else (scalar, vector.values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = apply_operator(node.op, left, right)
+        if node.op in COMPARISONS:
+            if node.bool:
+                return Vector(drop_name(vector.labels), np.where(np.isnan(vector.values), np.nan, result))
+            return Vector(vector.labels, np.where(result, vector.values, np.nan))
+        return Vector(drop_name(vector.labels), result)
+
+
+def labels_match(labels: dict, matchers: list) -> bool:
+    for label, op, value in matchers:
+        actual = labels.get(label, '')
+        if op == '=' and actual != value or op == '!=' and actual == value:
+            return False
+        if op in ('=~', '!~') and (value.fullmatch(actual) is not None) != (op == '=~'):
+            return False
+    return True
+
+
+def apply_operator(op: str, left, right):
+    if op == '+':
+        return left + right
+    if op == '-':
+        return left - right
+    if op == '*':
+        return left * right
+    if op == '/':
+        return left / right
+    if op == '%':
+        return np.fmod(left, right)
+    if op == '^':
+        return np.power(left, right)
+    return {'==': np.equal, '!=': np.not_equal, '<': np.less, '>': np.greater,
+            '<=': np.less_equal, '>=': np.greater_equal}[op](left, right)
+
+
+def range_function(func: str, vector: RangeVector, step: float) -> Vector:
+    """rate()/increase()/*_over_time() for every sample at once
+
+    Windows are (t - range, t]. rate() divides the counter increase between
+    the first and last sample in the window by their distance, which is what
+    Prometheus' extrapolation amounts to on regularly scraped series.
+    """
+    values, window = vector.values, vector.window
+    labels = drop_name(vector.labels)
+    if not values.size:
+        return Vector(labels, values)
+    valid = np.isfinite(values)
+    gap_free = bool(valid.all())
+    if gap_free:
+        # Usual case for scraped series: window sizes only depend on the position
+        in_window = np.minimum(np.arange(1, values.shape[1] + 1), window)[None, :]
+    else:
+        counts = np.cumsum(valid, axis=1)
+        in_window = counts - shift(counts, window)
+
+    if func in ('rate', 'increase', 'irate'):
+        if gap_free:
+            filled = values
+        else:
+            last = last_sample_index(values)
+            filled = np.take_along_axis(values, np.maximum(last, 0), axis=1)
+        delta = np.empty_like(filled)
+        delta[:, 0] = 0.0
+        np.subtract(filled[:, 1:], filled[:, :-1], out=delta[:, 1:])
+        # A counter going down was reset; the new value is the increase since
+        resets = delta < 0
+        delta[resets] = filled[resets]
+        if not gap_free:
+            delta[~valid | np.isnan(delta)] = 0.0
+        if func == 'irate':
+            if gap_free:
+                result = delta / step
+            else:
+                before = shift(last, 1, -1)
+                gap = (np.arange(values.shape[1]) - np.take_along_axis(before, np.maximum(last, 0), axis=1)) * step
+                result = delta / gap
+                result[~valid] = np.nan
+            result[np.broadcast_to(in_window < 2, result.shape)] = np.nan
+            return Vector(labels, result)
+        # Increase from the window's first sample to its last
+        increase = np.cumsum(delta, axis=1)
+        if window > 1:
+            increase[:, window - 1:] -= increase[:, :values.shape[1] - window + 1].copy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            increase /= (in_window - 1) * step
+        if func == 'increase':
+            increase *= window * step
+        increase[np.broadcast_to(in_window < 2, increase.shape)] = np.nan
+        return Vector(labels, increase)
+
+    if func in ('min_over_time', 'max_over_time'):
+        padded = np.concatenate([np.full((values.shape[0], window - 1), np.nan), values], axis=1)
+        windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=1)
+        reducer = np.fmin if func == 'min_over_time' else np.fmax
+        return Vector(labels, reducer.reduce(windows, axis=-1))
+
+    in_window = np.broadcast_to(in_window, values.shape)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=1)
+    total = sums - shift(sums, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = {'sum_over_time': total, 'avg_over_time': total / in_window,
+                  'count_over_time': in_window.astype(float)}[func]
+    return Vector(labels, np.where(in_window > 0, result, np.nan))
+
+
+def aggregate(op: str, vector: Vector, by, without) -> Vector:
+    """sum/avg/min/max/count by (...) with one reduceat per operation"""
+    if by is not None:
+        keys = [tuple((l, labels[l]) for l in by if labels.get(l)) for labels in vector.labels]
+    else:
+        dropped = set(without or ()) | {'__name__'}
+        keys = [tuple(sorted((k, v) for k, v in labels.items() if k not in dropped))
+                for labels in vector.labels]
+    if not keys:
+        return Vector([], vector.values[:0])
+    order, starts, groups = group_rows(keys)
+    values = vector.values[order]
+    valid = np.isfinite(values)
+    count = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+    if op == 'count':
+        result = count.astype(float)
+    elif op in ('min', 'max'):
+        result = (np.fmin if op == 'min' else np.fmax).reduceat(values, starts, axis=0)
+    else:
+        result = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+        if op == 'avg':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = result / count
+    result[count == 0] = np.nan
+    return Vector([dict(key) for key in groups], result)
+
+
+def match_key(labels: dict, on, ignoring) -> tuple:
+    if on is not None:
+        return tuple((l, labels.get(l, '')) for l in on)
+    dropped = set(ignoring or ()) | {'__name__'}
+    return tuple(sorted((k, v) for k, v in labels.items() if k not in dropped))
+
+
+def result_labels(labels: dict, node: Binary, keep_name: bool) -> dict:
+    if node.on is not None:
+        return {k: v for k, v in labels.items() if k in node.on}
+    dropped = set(node.ignoring or ())
+    if not keep_name:
+        dropped.add('__name__')
+    return {k: v for k, v in labels.items() if k not in dropped}
+
+
+def vector_binary(node: Binary, lhs: Vector, rhs: Vector) -> Vector:
+    """One-to-one vector matching, as Prometheus does without group_left/right"""
+    right_index = {}
+    for i, labels in enumerate(rhs.labels):
+        key = match_key(labels, node.on, node.ignoring)
+        if key in right_index:
+            raise RuleError(f"many-to-many matching: duplicate series for {dict(key)} on the right-hand side")
+        right_index[key] = i
+    pairs = [(i, right_index[key]) for i, labels in enumerate(lhs.labels)
+             if (key := match_key(labels, node.on, node.ignoring)) in right_index]
+    left_rows = np.array([p[0] for p in pairs], dtype=np.int64)
+    right_rows = np.array([p[1] for p in pairs], dtype=np.int64)
+    left, right = lhs.values[left_rows], rhs.values[right_rows]
+    keep_name = node.op in COMPARISONS and not node.bool
+    labels = [result_labels(lhs.labels[i], node, keep_name) for i in left_rows]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = apply_operator(node.op, left, right)
+    if node.op in COMPARISONS:
+        present = np.isfinite(left) & np.isfinite(right)
+        if node.bool:
+            return Vector(labels, np.where(present, result.astype(float), np.nan))
+        return Vector(labels, np.where(present & result, left, np.nan))
+    return Vector(labels, result)
+
+
+def presence_by_key(vector: Vector, node: Binary) -> dict:
+    """match key -> bool array, whether any series with that key has a value"""
+    keys = [match_key(labels, node.on, node.ignoring) for labels in vector.labels]
+    if not keys:
+        return {}
+    order, starts, groups = group_rows(keys)
+    present = np.logical_or.reduceat(np.isfinite(vector.values[order]), starts, axis=0)
+    return dict(zip(groups, present))
+
+
+def set_operation(node: Binary, lhs: Vector, rhs: Vector) -> Vector:
+    """and / or / unless, decided per sample"""
+    never = np.zeros(lhs.values.shape[1], dtype=bool)
+    if node.op == 'or':
+        left_present = presence_by_key(lhs, node)
+        masked = rhs.values.copy()
+        for i, labels in enumerate(rhs.labels):
+            masked[i, left_present.get(match_key(labels, node.on, node.ignoring), never)] = np.nan
+        return Vector(lhs.labels + rhs.labels, np.vstack([lhs.values, masked]))
+    right_present = presence_by_key(rhs, node)
+    mask = np.array([right_present.get(match_key(labels, node.on, node.ignoring), never)
+                     for labels in lhs.labels]).reshape(lhs.values.shape)
+    if node.op == 'unless':
+        mask = ~mask
+    return Vector(lhs.labels, np.where(mask, lhs.values, np.nan))
+
+
+def histogram_quantile(q: float, vector: Vector) -> Vector:
+    """Linear interpolation within the bucket holding the q-th observation"""
+    groups = {}
+    for i, labels in enumerate(vector.labels):
+        if 'le' not in labels:
+            continue
+        key = tuple(sorted((k, v) for k, v in labels.items() if k not in ('le', '__name__')))
+        groups.setdefault(key, []).append((float(labels['le']), i))
+    out_labels, out_values = [], []
+    samples = vector.values.shape[1]
+    for key, buckets in groups.items():
+        buckets.sort()
+        bounds = np.array([b[0] for b in buckets])
+        counts = vector.values[[b[1] for b in buckets]]
+        if not math.isinf(bounds[-1]) or len(bounds) < 2:
+            out_labels.append(dict(key))
+            out_values.append(np.full(samples, np.nan))
+            continue
+        counts = np.maximum.accumulate(np.nan_to_num(counts), axis=0)
+        total = counts[-1]
+        rank = q * total
+        index = np.argmax(counts >= rank, axis=0)
+        columns = np.arange(samples)
+        upper = bounds[index]
+        lower = np.where(index > 0, bounds[np.maximum(index - 1, 0)], 0.0)
+        count_upper = counts[index, columns]
+        count_lower = np.where(index > 0, counts[np.maximum(index - 1, 0), columns], 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = lower + (upper - lower) * (rank - count_lower) / (count_upper - count_lower)
+        # The +Inf bucket answers with the highest finite bound
+        result = np.where(index == len(bounds) - 1, bounds[-2], result)
+        result = np.where((index == 0) & (bounds[0] <= 0), bounds[0], result)
+        missing = np.isnan(vector.values[[b[1] for b in buckets]]).any(axis=0) | (total == 0)
+        result[missing] = np.nan
+        if q < 0 or q > 1:
+            result[:] = -np.inf if q < 0 else np.inf
+        out_labels.append(dict(key))
+        out_values.append(result)
+    if not out_values:
+        return Vector([], vector.values[:0])
+    return Vector(out_labels, np.vstack(out_values))
+
+
+# ---------------------------------------------------------------------------
+# Rules
+# ---------------------------------------------------------------------------
+
+def load_rules(path) -> list[dict]:
+    """Flatten the rules ConfigMap (or a plain rules file) in evaluation order"""
+    documents = list(yaml.safe_load_all(Path(path).read_text()))
+    contents = []
+    for document in documents:
+        if document and document.get('kind') == 'ConfigMap':
+            contents += [yaml.safe_load(text) for text in document.get('data', {}).values()]
+        elif document and 'groups' in document:
+            contents.append(document)
+    rules = []
+    for content in contents:
+        for group in content.get('groups', []):
+            interval = parse_duration(group['interval']) if 'interval' in group else DEFAULT_EVALUATION_INTERVAL
+            for rule in group.get('rules', []):
+                kind = 'record' if 'record' in rule else 'alert'
+                rules.append({
+                    'group': group['name'], 'kind': kind, 'name': rule[kind], 'expr': str(rule['expr']).strip(),
+                    'interval': interval, 'for': parse_duration(rule['for']) if 'for' in rule else 0.0,
+                    'labels': rule.get('labels', {}), 'annotations': rule.get('annotations', {}),
+                })
+    return rules
+
+
+TEMPLATE_RE = re.compile(r'\{\{\s*(.*?)\s*\}\}')
+TEMPLATE_LABEL_RE = re.compile(r'\$labels\.([a-zA-Z_][a-zA-Z0-9_]*)')
+
+
+def humanize(value: float) -> str:
+    for prefix, size in (('T', 1e12), ('G', 1e9), ('M', 1e6), ('k', 1e3)):
+        if abs(value) >= size:
+            return f"{value / size:.4g}{prefix}"
+    return f"{value:.4g}"
+
+
+def render(template: str, labels: dict, value: float) -> str:
+    """Expand the {{ $labels.x }} / {{ $value }} subset of alert templates"""
+    def expand(match):
+        expression, *pipes = [part.strip() for part in match.group(1).split('|')]
+        if expression == '$value':
+            result = value
+            for pipe in pipes:
+                if pipe == 'humanizePercentage':
+                    return f"{value * 100:.4g}%"
+                if pipe == 'humanize':
+                    return humanize(value)
+            return f"{result:.4g}"
+        label = TEMPLATE_LABEL_RE.fullmatch(expression)
+        return labels.get(label.group(1), '') if label else match.group(0)
+    return TEMPLATE_RE.sub(expand, template)
+
+
+def lint(rules: list[dict], dataset: Optional[Dataset] = None) -> list[tuple]:
+    """(severity, rule, message) for problems found without evaluating anything"""
+    problems = []
+    recorded = set()
+    seen_alerts = set()
+    for rule in rules:
+        name = rule['name']
+        if rule['kind'] == 'record':
+            if name in recorded:
+                problems.append(('error', name, "recorded more than once"))
+            if name.count(':') < 2:
+                problems.append(('warning', name, "recording rule names should be level:metric:operations"))
+            recorded.add(name)
+        else:
+            if (rule['group'], name) in seen_alerts:
+                problems.append(('warning', name, "duplicate alert in the same group"))
+            seen_alerts.add((rule['group'], name))
+        try:
+            node = parse(rule['expr'])
+        except RuleError as e:
+            problems.append(('error', name, str(e)))
+            continue
+        for child in walk(node):
+            if isinstance(child, Selector) and child.name and ':' in child.name and child.name not in recorded:
+                defined_later = any(r['kind'] == 'record' and r['name'] == child.name for r in rules)
+                if not defined_later:
+                    problems.append(('error', name, f"reads {child.name}, which no rule records"))
+            if isinstance(child, Selector) and dataset is not None and child.name \
+                    and ':' not in child.name and child.name not in dataset.metrics:
+                problems.append(('warning', name, f"no series named {child.name} in the data"))
+        if rule['kind'] == 'alert':
+            available = output_labels(node)
+            templates = list(rule['annotations'].values()) + [str(v) for v in rule['labels'].values()]
+            used = {label for text in templates for label in TEMPLATE_LABEL_RE.findall(str(text))}
+            if available is not None:
+                for label in sorted(used - available):
+                    problems.append(('warning', name, f"templates use $labels.{label}, "
+                                                      f"which the expression never returns"))
+            if rule['for'] and rule['for'] < rule['interval']:
+                problems.append(('warning', name, f"for: {format_duration(rule['for'])} is shorter than "
+                                                  f"the group interval {format_duration(rule['interval'])}"))
+    return problems
+
+
+def simulate(rules: list[dict], dataset: Dataset, chunk_seconds: float) -> dict:
+    """Evaluate every rule over the whole dataset; returns per-alert results
+
+    Each chunk is evaluated with enough leading samples (warm-up) for the
+    longest range selector, plus the same again for recorded series that
+    feed range selectors themselves.
+    """
+    parsed = [(rule, parse(rule['expr'])) for rule in rules]
+    longest = max([n.range for _, node in parsed for n in walk(node) if isinstance(n, Selector)] + [0.0])
+    warmup = int(math.ceil(2 * (longest + LOOKBACK_DELTA) / dataset.step))
+    chunk = max(1, int(chunk_seconds / dataset.step))
+    row_cache = {}
+    alerts = {rule['name']: {'rule': rule, 'labels': None, 'values': []}
+              for rule, _ in parsed if rule['kind'] == 'alert'}
+
+    for lo in range(0, dataset.samples, chunk):
+        hi = min(lo + chunk, dataset.samples)
+        evaluator = Evaluator(dataset, lo - warmup, hi, {}, row_cache)
+        for rule, node in parsed:
+            result = evaluator.evaluate(node)
+            if not isinstance(result, Vector):
+                result = Vector([{}], np.full((1, hi - lo + warmup), float(result)))
+            if rule['kind'] == 'record':
+                evaluator.recorded[rule['name']] = Vector(drop_name(result.labels), result.values)
+                continue
+            # Alerts are evaluated once per group interval, on the global grid
+            every = max(1, int(round(rule['interval'] / dataset.step)))
+            first = -(-lo // every) * every
+            ticks = np.arange(first, hi, every) - (lo - warmup)
+            state = alerts[rule['name']]
+            if state['labels'] is None:
+                state['labels'] = result.labels
+                state['every'] = every
+                state['first_tick'] = first
+            state['values'].append(result.values[:, ticks].astype(np.float32))
+
+    report = {}
+    for name, state in alerts.items():
+        rule = state['rule']
+        values = np.hstack(state['values']) if state['values'] else np.empty((0, 0), np.float32)
+        active = np.isfinite(values)
+        # How long each series has been active at each tick (pending -> firing after `for`)
+        ticks = np.arange(values.shape[1])
+        last_inactive = np.maximum.accumulate(np.where(active, -1, ticks), axis=1)
+        active_for = (ticks - last_inactive - 1) * state.get('every', 1) * dataset.step
+        firing = active & (active_for >= rule['for'])
+        report[name] = {'rule': rule, 'labels': state['labels'] or [], 'values': values, 'firing': firing,
+                        'tick_seconds': state.get('every', 1) * dataset.step,
+                        'first_time': dataset.start + state.get('first_tick', 0) * dataset.step}
+    return report
+
+
+def episodes(result: dict) -> list[dict]:
+    """Contiguous firing periods: series labels, start/end timestamps, peak value"""
+    firing = result['firing']
+    if not firing.size:
+        return []
+    padded = np.zeros((firing.shape[0], firing.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = firing
+    edges = np.diff(padded, axis=1)
+    starts = np.argwhere(edges == 1)
+    ends = np.argwhere(edges == -1)
+    found = []
+    for (row, start), (_, end) in zip(starts, ends):
+        window = result['values'][row, start:end]
+        found.append({
+            'labels': result['labels'][row],
+            'start': result['first_time'] + start * result['tick_seconds'],
+            'end': result['first_time'] + (end - 1) * result['tick_seconds'],
+            'ongoing': end == firing.shape[1],
+            'peak': float(window[np.nanargmax(np.abs(window))]),
+        })
+    found.sort(key=lambda e: e['start'])
+    return found
+
+
+# ---------------------------------------------------------------------------
+# Data sources
+# ---------------------------------------------------------------------------
+
+CHALLENGES = ('header-leak', 'file-disclosure', 'hidden-params', 'secret-leak')
+INFRA_PODS = (('monitoring', 'prometheus-0'), ('monitoring', 'grafana-0'), ('monitoring', 'status-page-0'),
+              ('kube-system', 'coredns-0'), ('kube-system', 'traefik-0'), ('kube-system', 'metrics-server-0'),
+              ('kube-system', 'local-path-provisioner-0'))
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, math.inf)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, math.inf)
+STATUSES = ('200', '404', '429', '500')
+STATUS_SHARE = np.array([0.93, 0.05, 0.015, 0.005])
+
+
+def le_label(bound: float) -> str:
+    return '+Inf' if math.isinf(bound) else repr(bound)
+
+
+def lognormal_cdf(bounds, median: float, sigma: float = 0.8) -> np.ndarray:
+    """Share of observations at or below each bucket bound"""
+    bounds = np.asarray(bounds, dtype=float)
+    with np.errstate(divide='ignore'):
+        z = (np.log(bounds) - math.log(median)) / (sigma * math.sqrt(2))
+    return 0.5 * (1 + np.vectorize(math.erf)(z))
+
+
+def generate(path, days: float, step: float, replicas: int, seed: int, start: Optional[float]):
+    """Write a synthetic lab cluster with a few injected incidents to `path`"""
+    rng = np.random.default_rng(seed)
+    samples = int(days * 86400 / step)
+    if start is None:
+        start = (time.time() // 86400 - math.ceil(days)) * 86400
+    writer = DatasetWriter(path, start, step, samples)
+    t = start + np.arange(samples) * step
+
+    pods = [(namespace, pod, None) for namespace, pod in INFRA_PODS]
+    pods += [('default', f'python-metrics-demo-{r}', 'demo') for r in range(2)]
+    pods += [(challenge, f'{challenge}-{r}', challenge) for challenge in CHALLENGES for r in range(replicas)]
+    pod_count = len(pods)
+    challenge_pods = [i for i, p in enumerate(pods) if p[2] in CHALLENGES]
+    demo_pods = [i for i, p in enumerate(pods) if p[2] == 'demo']
+
+    cpu_limit = np.full(pod_count, 0.2)
+    memory_limit = np.full(pod_count, 256 * 2 ** 20)
+    diurnal = 1 + 0.6 * np.sin(2 * np.pi * (t - start) / 86400)
+
+    def window(duration: float) -> slice:
+        begin = int(rng.integers(int(3600 / step), samples - int(duration / step) - 1))
+        return slice(begin, begin + int(duration / step))
+
+    def incident(kind: str, where: slice, **labels):
+        writer.incidents.append({'kind': kind, 'start': start + where.start * step,
+                                 'end': start + where.stop * step, **labels})
+
+    # Per-pod CPU (cores) and working set (bytes), with spikes and a leak
+    cpu = cpu_limit[:, None] * (0.15 + 0.1 * rng.random((pod_count, 1))) * diurnal
+    cpu = cpu * (1 + 0.1 * rng.standard_normal((pod_count, samples)))
+    memory = memory_limit[:, None] * (0.3 + 0.1 * rng.random((pod_count, 1))) * np.ones(samples)
+    restarts = np.zeros((pod_count, samples))
+    for _ in range(3):
+        victim = int(rng.choice(challenge_pods))
+        where = window(1200)
+        cpu[victim, where] = cpu_limit[victim] * 0.95
+        incident('cpu_spike', where, namespace=pods[victim][0], pod=pods[victim][1])
+    victim = int(rng.choice(challenge_pods))
+    where = window(7200)
+    memory[victim, where] = np.linspace(memory[victim, where.start], memory_limit[victim] * 0.97, where.stop - where.start)
+    restarts[victim, where.stop:] += 1
+    incident('memory_leak', where, namespace=pods[victim][0], pod=pods[victim][1])
+    victim = int(rng.choice(challenge_pods))
+    where = window(1800)
+    restarts[victim, where] += np.cumsum(np.arange(where.stop - where.start) % int(120 / step) == 0)
+    restarts[victim, where.stop:] += restarts[victim, where.stop - 1]
+    incident('crash_loop', where, namespace=pods[victim][0], pod=pods[victim][1])
+    cpu = np.clip(cpu, 0, None)
+
+    container_labels = [{'namespace': ns, 'pod': pod, 'container': container, 'job': 'kubernetes-cadvisor'}
+                        for ns, pod, _ in pods for container in ('app', '')]
+    usage = writer.add('container_cpu_usage_seconds_total', container_labels)
+    usage[0::2] = np.cumsum(cpu * step, axis=1)
+    usage[1::2] = usage[0::2]
+    writer.add('container_memory_working_set_bytes', container_labels)[:] = np.repeat(memory, 2, axis=0)
+    writer.add('container_spec_memory_limit_bytes', container_labels)[:] = np.repeat(memory_limit, 2)[:, None]
+    writer.add('container_spec_cpu_quota', container_labels)[:] = np.repeat(cpu_limit * 100000, 2)[:, None]
+    writer.add('container_spec_cpu_period', container_labels)[:] = 100000
+    writer.add('kube_pod_container_status_restarts_total',
+               [{'namespace': ns, 'pod': pod, 'container': 'app'} for ns, pod, _ in pods])[:] = restarts
+    phases = writer.add('kube_pod_status_phase', [{'namespace': ns, 'pod': pod, 'phase': phase}
+                                                  for ns, pod, _ in pods for phase in ('Running', 'Pending')])
+    phases[0::2], phases[1::2] = 1, 0
+    writer.add('kube_pod_info', [{'namespace': ns, 'pod': pod} for ns, pod, _ in pods])[:] = 1
+    conditions = writer.add('kube_node_status_condition', [{'node': 'node-0', 'condition': 'Ready', 'status': s}
+                                                           for s in ('true', 'false')])
+    conditions[0], conditions[1] = 1, 0
+
+    # Scrape targets; one challenge pod goes down for a while
+    targets = [{'job': 'ctf-challenges' if app in CHALLENGES else 'kubernetes-pods',
+                'kubernetes_namespace': ns, 'kubernetes_pod_name': pod}
+               for ns, pod, app in pods if app is not None]
+    up = writer.add('up', targets + [{'job': 'kubelet', 'instance': 'node-0'}])
+    up[:] = 1
+    victim = int(rng.integers(len(demo_pods), len(targets)))
+    where = window(900)
+    up[victim, where] = 0
+    incident('target_down', where, **targets[victim])
+
+    # Disk filling up on the node
+    size = 50 * 2 ** 30
+    where = window(3 * 3600)
+    avail = np.full(samples, size * 0.4)
+    avail[where] = size * np.linspace(0.4, 0.05, where.stop - where.start)
+    fs_labels = [{'instance': 'node-0', 'mountpoint': '/'}]
+    writer.add('node_filesystem_avail_bytes', fs_labels)[:] = avail
+    writer.add('node_filesystem_size_bytes', fs_labels)[:] = size
+    incident('disk_filling', where, instance='node-0')
+
+    # python-metrics-demo: error burst and slow period
+    rps = 2 * diurnal[None, :] * np.ones((len(demo_pods), 1))
+    error_share = np.full(samples, 0.01)
+    errors_at = window(900)
+    error_share[errors_at] = 0.2
+    incident('error_burst', errors_at, job='kubernetes-pods')
+    slow_at = window(900)
+    incident('high_latency', slow_at, job='kubernetes-pods')
+    demo = [{'job': 'kubernetes-pods', 'kubernetes_namespace': pods[i][0], 'kubernetes_pod_name': pods[i][1]}
+            for i in demo_pods]
+    requests_total = writer.add('http_requests_total', [{**d, 'method': 'GET', 'status': s}
+                                                        for d in demo for s in ('200', '500')])
+    requests_total[0::2] = np.cumsum(rps * (1 - error_share) * step, axis=1)
+    requests_total[1::2] = np.cumsum(rps * error_share * step, axis=1)
+    buckets = writer.add('http_request_duration_seconds_bucket', [{**d, 'method': 'GET', 'le': le_label(b)}
+                                                                  for d in demo for b in DEFAULT_BUCKETS])
+    normal, slow = lognormal_cdf(DEFAULT_BUCKETS, 0.05), lognormal_cdf(DEFAULT_BUCKETS, 1.5)
+    share = np.where(np.isin(np.arange(samples), np.arange(slow_at.start, slow_at.stop))[None, :],
+                     slow[:, None], normal[:, None])
+    for d in range(len(demo)):
+        buckets[d * len(DEFAULT_BUCKETS):(d + 1) * len(DEFAULT_BUCKETS)] = np.cumsum(rps[d] * step * share, axis=1)
+
+    # Challenge pods: per-status request counters and latency buckets
+    ctf = [{'job': 'ctf-challenges', 'challenge': pods[i][2], 'namespace': pods[i][0], 'endpoint': 'index',
+            'method': 'GET', 'kubernetes_namespace': pods[i][0], 'kubernetes_pod_name': pods[i][1]}
+           for i in challenge_pods]
+    ctf_rps = (0.5 + rng.random((len(ctf), 1))) * diurnal[None, :]
+    ctf_total = writer.add('ctf_http_requests_total', [{**c, 'status': s} for c in ctf for s in STATUSES])
+    for k, status_share in enumerate(STATUS_SHARE):
+        ctf_total[k::len(STATUSES)] = np.cumsum(ctf_rps * status_share * step, axis=1)
+    ctf_buckets = writer.add('ctf_http_request_duration_seconds_bucket',
+                             [{**c, 'le': le_label(b)} for c in ctf for b in LATENCY_BUCKETS])
+    ctf_share = lognormal_cdf(LATENCY_BUCKETS, 0.004)
+    counts = np.cumsum(ctf_rps * step, axis=1)
+    for k, fraction in enumerate(ctf_share):
+        ctf_buckets[k::len(LATENCY_BUCKETS)] = counts * fraction
+
+    writer.close()
+    return writer
+
+
+def record(path, url: str, rules: list[dict], start: float, end: float, step: float):
+    """Fetch the raw series every rule reads from a Prometheus server into `path`"""
+    samples = int((end - start) // step) + 1
+    writer = DatasetWriter(path, start, step, samples)
+    recorded = {rule['name'] for rule in rules if rule['kind'] == 'record'}
+    selectors = {}
+    for rule in rules:
+        for node in walk(parse(rule['expr'])):
+            if isinstance(node, Selector) and node.name and node.name not in recorded:
+                selectors.setdefault(node.name, [])
+    # Prometheus returns at most 11000 points per series per query
+    span = 10000 * step
+    for name in sorted(selectors):
+        series = {}
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(end, chunk_start + span - step)
+            response = requests.get(f"{url.rstrip('/')}/api/v1/query_range", timeout=120, params={
+                'query': name, 'start': chunk_start, 'end': chunk_end, 'step': step})
+            response.raise_for_status()
+            for result in response.json()['data']['result']:
+                labels = result['metric']
+                labels.pop('__name__', None)
+                key = tuple(sorted(labels.items()))
+                series.setdefault(key, []).extend(result['values'])
+            chunk_start = chunk_end + step
+        array = writer.add(name, [dict(key) for key in series])
+        array[:] = np.nan
+        for row, points in enumerate(series.values()):
+            stamps = np.array([float(p[0]) for p in points])
+            columns = np.round((stamps - start) / step).astype(int)
+            array[row, columns] = [float(p[1]) for p in points]
+        print(f"  {name}: {len(series)} series")
+    writer.close()
+    return writer
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def print_problems(problems: list[tuple]):
+    for severity, name, message in problems:
+        print(f"  {severity:<8}{name}: {message}")
+
+
+def print_report(report: dict, max_episodes: int, only: Optional[str]):
+    quiet = []
+    for name, result in report.items():
+        if only and name != only:
+            continue
+        rule = result['rule']
+        found = episodes(result)
+        if not found:
+            quiet.append(name)
+            continue
+        firing_seconds = result['firing'].sum() * result['tick_seconds']
+        series = len({tuple(sorted(e['labels'].items())) for e in found})
+        print(f"\n{name} (for {format_duration(rule['for'])}, every {format_duration(rule['interval'])}): "
+              f"{len(found)} episodes on {series} series, {format_duration(firing_seconds)} firing")
+        for episode in found[:max_episodes]:
+            duration = episode['end'] - episode['start'] + result['tick_seconds']
+            labels = ' '.join(f"{k}={v}" for k, v in sorted(episode['labels'].items()))
+            end = 'ongoing' if episode['ongoing'] else format_time(episode['end'])[11:]
+            print(f"  {format_time(episode['start'])} -> {end} ({format_duration(duration)})  "
+                  f"peak {episode['peak']:.4g}  {labels}")
+            description = rule['annotations'].get('description')
+            if description:
+                print(f"    {render(description, episode['labels'], episode['peak'])}")
+        if len(found) > max_episodes:
+            print(f"  ... {len(found) - max_episodes} more")
+    if quiet:
+        print(f"\nNever fired: {', '.join(quiet)}")
+
+
+def report_json(report: dict) -> list[dict]:
+    return [{'alert': name, 'episodes': [{**e, 'start': format_time(e['start']), 'end': format_time(e['end']),
+                                          'ongoing': bool(e['ongoing'])} for e in episodes(result)]}
+            for name, result in report.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lint and simulate the Prometheus alert rules offline')
+    parser.add_argument('--rules', default=str(DEFAULT_RULES), help='Rules ConfigMap or rules file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    lint_parser = commands.add_parser('lint', help='Check the rules without evaluating them')
+    lint_parser.add_argument('data', nargs='?', help='Dataset directory to check metric names against')
+
+    run_parser = commands.add_parser('run', help='Replay a dataset through the rules')
+    run_parser.add_argument('data', help='Dataset directory (from generate or record)')
+    run_parser.add_argument('--alert', help='Only report this alert')
+    run_parser.add_argument('--chunk', default='6h', help='Time range evaluated at once (default: 6h)')
+    run_parser.add_argument('--max-episodes', type=int, default=10, help='Episodes listed per alert')
+    run_parser.add_argument('--json', action='store_true', help='Print firing episodes as JSON')
+
+    gen_parser = commands.add_parser('generate', help='Write a synthetic dataset with injected incidents')
+    gen_parser.add_argument('data', help='Output directory')
+    gen_parser.add_argument('--days', type=float, default=7, help='Days of samples (default: 7)')
+    gen_parser.add_argument('--step', type=float, default=15, help='Seconds between samples (default: 15)')
+    gen_parser.add_argument('--replicas', type=int, default=10, help='Pods per challenge (default: 10)')
+    gen_parser.add_argument('--seed', type=int, default=1, help='Random seed')
+
+    rec_parser = commands.add_parser('record', help='Record the series the rules read from Prometheus')
+    rec_parser.add_argument('data', help='Output directory')
+    rec_parser.add_argument('--url', default='http://localhost:9090', help='Prometheus URL')
+    rec_parser.add_argument('--hours', type=float, default=24, help='How far back to record (default: 24)')
+    rec_parser.add_argument('--step', type=float, default=15, help='Seconds between samples (default: 15)')
+    args = parser.parse_args()
+
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, yaml.YAMLError, RuleError) as e:
+        print(f"Error: cannot load rules from {args.rules}: {e}")
+        return 1
+
+    if args.command == 'generate':
+        started = time.perf_counter()
+        writer = generate(args.data, args.days, args.step, args.replicas, args.seed, None)
+        count = sum(len(m['labels']) for m in writer.metrics.values())
+        print(f"Wrote {count} series x {writer.samples} samples to {args.data} "
+              f"in {time.perf_counter() - started:.1f}s")
+        print("Injected incidents:")
+        for item in writer.incidents:
+            labels = ' '.join(f"{k}={v}" for k, v in item.items() if k not in ('kind', 'start', 'end'))
+            print(f"  {format_time(item['start'])} -> {format_time(item['end'])[11:]}  {item['kind']:<12} {labels}")
+        return 0
+
+    if args.command == 'record':
+        end = time.time() // args.step * args.step
+        try:
+            record(args.data, args.url, rules, end - args.hours * 3600, end, args.step)
+        except Exception as e:
+            print(f"Error: recording from {args.url} failed: {e}")
+            return 1
+        return 0
+
+    dataset = Dataset(args.data) if args.data else None
+    problems = lint(rules, dataset)
+    errors = [p for p in problems if p[0] == 'error']
+    if args.command == 'lint':
+        print(f"{len(rules)} rules: {len(errors)} errors, {len(problems) - len(errors)} warnings")
+        print_problems(problems)
+        return 1 if errors else 0
+
+    if errors:
+        print("Rules have errors:")
+        print_problems(errors)
+        return 1
+    started = time.perf_counter()
+    report = simulate(rules, dataset, parse_duration(args.chunk))
+    elapsed = time.perf_counter() - started
+    if args.json:
+        if args.alert:
+            report = {name: result for name, result in report.items() if name == args.alert}
+        print(json.dumps(report_json(report), indent=2))
+        return 0
+    end = dataset.start + (dataset.samples - 1) * dataset.step
+    print(f"Data: {format_time(dataset.start)} -> {format_time(end)} UTC, {format_duration(dataset.step)} step, "
+          f"{dataset.series_count} series")
+    print(f"Evaluated {len(rules)} rules in {elapsed:.1f}s")
+    if problems:
+        print_problems(problems)
+    print_report(report, args.max_episodes, args.alert)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Regenerate each challenge's app-code ConfigMap from its source files
+The deployments mount configmap-app-code.yaml at /app, so app.py and the
+shared modules it imports from challenges/common must be copied into it.
+Example apps deployed the same way are listed in EXAMPLE_APPS, and the
+status page's code (with the shared modules it imports) and template
+ConfigMaps and the code ConfigMaps of the challenge exporter and the
+in-cluster test Job are regenerated too.
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CHALLENGES_DIR = REPO_ROOT / 'challenges' / 'beginner'
+COMMON_DIR = REPO_ROOT / 'challenges' / 'common'
+
+# Example app directory -> files mounted from its configmap-app-code.yaml
+EXAMPLE_APPS = {
+    REPO_ROOT / 'examples' / 'python-metrics-app': ['app.py', 'gunicorn.conf.py', 'requirements.txt'],
+}
+
+STATUS_PAGE_DIR = REPO_ROOT / 'status-page'
+TOOLS_DIR = REPO_ROOT / 'tools'
+EXPORTER_CONFIGMAP = REPO_ROOT / 'monitoring' / 'challenge-exporter' / 'configmap-app.yaml'
+TEST_JOB_CONFIGMAP = REPO_ROOT / 'monitoring' / 'challenge-tests' / 'configmap-app.yaml'
+
+IMPORT_RE = re.compile(r'^(?:from|import)\s+(\w+)', re.MULTILINE)
+
+
+def shared_modules(source: str) -> list[Path]:
+    """Shared modules imported by an app (in order of first import)"""
+    modules = []
+    for name in IMPORT_RE.findall(source):
+        path = COMMON_DIR / f'{name}.py'
+        if path.exists() and path not in modules:
+            modules.append(path)
+    return modules
+
+
+def render_configmap(header: str, files: list[Path]) -> str:
+    """Render the ConfigMap with one literal block per file"""
+    lines = [header]
+    for path in files:
+        lines.append(f'  {path.name}: |\n')
+        for line in path.read_text().rstrip('\n').split('\n'):
+            lines.append(f'    {line}\n' if line else '\n')
+        lines.append('\n')
+    return ''.join(lines)
+
+
+def sync_configmap(configmap: Path, files: list[Path], check: bool = False) -> bool:
+    """Rewrite (or, with check, verify) one ConfigMap; returns True if up to date"""
+    current = configmap.read_text()
+    # Keep apiVersion/kind/metadata as written, regenerate everything under data:
+    header = current.split('\ndata:\n', 1)[0] + '\ndata:\n'
+    rendered = render_configmap(header, files)
+
+    if rendered == current:
+        return True
+    if not check:
+        configmap.write_text(rendered)
+        print(f"Updated {configmap.relative_to(REPO_ROOT)}")
+    else:
+        print(f"Out of date: {configmap.relative_to(REPO_ROOT)}")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Regenerate the app-code ConfigMaps of the challenges, example apps, status page, exporter '
+                    'and test Job'
+    )
+    parser.add_argument(
+        '--check',
+        action='store_true',
+        help='Only report ConfigMaps that are out of date (exit 1 if any)'
+    )
+    args = parser.parse_args()
+
+    up_to_date = True
+    for challenge_dir in sorted(p for p in CHALLENGES_DIR.iterdir() if p.is_dir()):
+        configmap = challenge_dir / 'configmap-app-code.yaml'
+        app = challenge_dir / 'app.py'
+        if configmap.exists() and app.exists():
+            up_to_date &= sync_configmap(configmap, [app] + shared_modules(app.read_text()), args.check)
+
+    # Status page: app.py plus every module next to it, the shared modules they
+    # import from challenges/common, and the template
+    modules = sorted(STATUS_PAGE_DIR.glob('*.py'), key=lambda p: (p.name != 'app.py', p.name))
+    shared = []
+    for module in modules:
+        shared += [path for path in shared_modules(module.read_text()) if path not in shared]
+    up_to_date &= sync_configmap(STATUS_PAGE_DIR / 'configmap-app.yaml', modules + shared, args.check)
+    up_to_date &= sync_configmap(STATUS_PAGE_DIR / 'configmap-template.yaml',
+                                 [STATUS_PAGE_DIR / 'templates' / 'index.html'], args.check)
+
+    # Challenge exporter: the exporter, utils.py and the testers it imports
+    # (the deployment maps the testers back into challenge_testers/)
+    testers = sorted((TOOLS_DIR / 'challenge_testers').glob('*.py'))
+    exporter_files = [TOOLS_DIR / 'challenge-exporter.py', TOOLS_DIR / 'utils.py'] + testers
+    up_to_date &= sync_configmap(EXPORTER_CONFIGMAP, exporter_files, args.check)
+
+    # In-cluster test Job: the same layout around test-in-cluster.py
+    test_job_files = [TOOLS_DIR / 'test-in-cluster.py', TOOLS_DIR / 'utils.py'] + testers
+    up_to_date &= sync_configmap(TEST_JOB_CONFIGMAP, test_job_files, args.check)
+
+    for app_dir, names in EXAMPLE_APPS.items():
+        up_to_date &= sync_configmap(app_dir / 'configmap-app-code.yaml',
+                                     [app_dir / name for name in names], args.check)
+
+    return 0 if up_to_date or not args.check else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,77 +9,92 @@ import argparse
 import time
 from pathlib import Path
 
-# Try to import tqdm for progress bars, fallback to simple progress if not available
-try:
-    from tqdm import tqdm
-    HAS_TQDM = True
-except ImportError:
-    HAS_TQDM = False
-    # Simple progress bar fallback
-    class tqdm:
-        def __init__(self, iterable=None, total=None, desc=None, unit=None, **kwargs):
-            self.iterable = iterable or range(total or 1)
-            self.total = total or len(self.iterable) if hasattr(self.iterable, '__len__') else 1
-            self.desc = desc or ""
-            self.current = 0
-            self.start_time = time.time()
-        
-        def __iter__(self):
-            return iter(self.iterable)
-        
-        def update(self, n=1):
-            self.current += n
-            elapsed = time.time() - self.start_time
-            percent = (self.current / self.total) * 100 if self.total > 0 else 0
-            bar_length = 30
-            filled = int(bar_length * self.current / self.total) if self.total > 0 else 0
-            bar = '█' * filled + '░' * (bar_length - filled)
-            print(f"\r{self.desc} [{bar}] {percent:.1f}% ({self.current}/{self.total})", end='', flush=True)
-        
-        def __enter__(self):
-            return self
-        
-        def __exit__(self, *args):
-            print()  # New line after progress bar
-        
-        def set_description(self, desc):
-            self.desc = desc
-        
-        def close(self):
-            """Close method for compatibility"""
-            print()  # New line after progress bar
+
+# Simple progress bar fallback for when tqdm is not installed
+class SimpleProgressBar:
+    def __init__(self, iterable=None, total=None, desc=None, unit=None, **kwargs):
+        self.iterable = iterable or range(total or 1)
+        self.total = total or len(self.iterable) if hasattr(self.iterable, '__len__') else 1
+        self.desc = desc or ""
+        self.current = 0
+        self.start_time = time.time()
+    
+    def __iter__(self):
+        return iter(self.iterable)
+    
+    def update(self, n=1):
+        self.current += n
+        elapsed = time.time() - self.start_time
+        percent = (self.current / self.total) * 100 if self.total > 0 else 0
+        bar_length = 30
+        filled = int(bar_length * self.current / self.total) if self.total > 0 else 0
+        bar = '█' * filled + '░' * (bar_length - filled)
+        print(f"\r{self.desc} [{bar}] {percent:.1f}% ({self.current}/{self.total})", end='', flush=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        print()  # New line after progress bar
+    
+    def set_description(self, desc):
+        self.desc = desc
+    
+    def close(self):
+        """Close method for compatibility"""
+        print()  # New line after progress bar
+
+
+def make_progress_bar(**kwargs):
+    """A tqdm progress bar, or SimpleProgressBar without tqdm (imported here: it takes ~50ms)"""
+    try:
+        from tqdm import tqdm
+    except ImportError:
+        return SimpleProgressBar(**kwargs)
+    return tqdm(**kwargs)
+
 
 # Add tools directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from utils import check_kubectl, TestResult, check_namespace_exists
-from challenge_testers import header_leak, file_disclosure, hidden_params
+from utils import check_kubectl, TestResult, check_namespace_exists, pod_identities
+import test_history
+import importlib
 import subprocess
 
 
-# Challenge registry
+# Challenge registry. Testers are named as 'module.function' in challenge_testers
+# and imported when the challenge is tested, so --help and argument errors
+# don't pay for requests and every tester module
 CHALLENGES = {
     'header-leak': {
         'name': 'Header Information Disclosure',
         'namespace': 'header-leak',
-        'tester': header_leak.test_header_leak_challenge,
+        'tester': 'header_leak.test_header_leak_challenge',
         'path': 'challenges/beginner/header-leak',
     },
     'file-disclosure': {
         'name': 'File Disclosure / Path Traversal',
         'namespace': 'file-disclosure',
-        'tester': file_disclosure.test_file_disclosure_challenge,
+        'tester': 'file_disclosure.test_file_disclosure_challenge',
         'path': 'challenges/beginner/file-disclosure',
     },
     'hidden-params': {
         'name': 'Hidden Parameters / Auth Bypass',
         'namespace': 'hidden-params',
-        'tester': hidden_params.test_hidden_params_challenge,
+        'tester': 'hidden_params.test_hidden_params_challenge',
         'path': 'challenges/beginner/hidden-params',
     },
 }
 
 
+def load_tester(challenge_id: str):
+    """Import and return the tester function of a challenge"""
+    module_name, function_name = CHALLENGES[challenge_id]['tester'].rsplit('.', 1)
+    module = importlib.import_module(f'challenge_testers.{module_name}')
+    return getattr(module, function_name)
+
+
 def deploy_challenge(challenge_id: str, verbose: bool = False) -> bool:
     """Deploy a challenge using its deploy script or kubectl"""
     if challenge_id not in CHALLENGES:
@@ -152,8 +167,22 @@ def deploy_challenge(challenge_id: str, verbose: bool = False) -> bool:
         return False
 
 
-def test_challenge(challenge_id: str, verbose: bool = False, progress_bar=None) -> TestResult:
-    """Test a specific challenge"""
+def challenge_cache_key(challenge_id: str):
+    """Cache key of a challenge's files and running pods, or None while its pods aren't all ready"""
+    challenge = CHALLENGES[challenge_id]
+    pods = pod_identities(challenge['namespace'])
+    if not pods:
+        return None
+    return test_history.cache_key(Path(__file__).parent.parent / challenge['path'], pods)
+
+
+def test_challenge(challenge_id: str, verbose: bool = False, progress_bar=None, history: str = None,
+                   force: bool = False) -> TestResult:
+    """Test a specific challenge
+
+    With a history file, a challenge whose cache key matches a passing result
+    there is not re-tested (unless force).
+    """
     if challenge_id not in CHALLENGES:
         result = TestResult(challenge_id)
         result.failure(f"Unknown challenge: {challenge_id}")
@@ -174,13 +203,31 @@ def test_challenge(challenge_id: str, verbose: bool = False, progress_bar=None)
         print(f"Challenge ID: {challenge_id}")
         print(f"Namespace: {challenge['namespace']}")
     
+    cache_key = challenge_cache_key(challenge_id) if history else None
+    cached_run = None
+    if cache_key and not force:
+        cached_run = test_history.cached_pass(history, challenge_id, cache_key)
+    if cached_run is not None:
+        result = TestResult(challenge['name'])
+        result.success(f"Unchanged since run #{cached_run}, not re-tested (--force to re-test)")
+        result.challenge_id = challenge_id
+        result.cache_key = cache_key
+        result.cached_run = cached_run
+        if verbose:
+            print(f"✓ {result.message}")
+        elif progress_bar:
+            progress_bar.update(1)
+        else:
+            print(" ✓ (cached)")
+        return result
+    
     if verbose:
         print("Step 1: Checking service availability...")
     
     start_time = time.time()
     
     # Run the test - pass verbose flag to tester
-    tester_func = challenge['tester']
+    tester_func = load_tester(challenge_id)
     # Check if tester function accepts verbose parameter
     import inspect
     sig = inspect.signature(tester_func)
@@ -190,6 +237,9 @@ def test_challenge(challenge_id: str, verbose: bool = False, progress_bar=None)
         result = tester_func()
     
     elapsed = time.time() - start_time
+    result.challenge_id = challenge_id
+    result.cache_key = cache_key
+    result.timings['total'] = elapsed
     
     if not verbose:
         if progress_bar:
@@ -223,7 +273,8 @@ def test_challenge(challenge_id: str, verbose: bool = False, progress_bar=None)
     return result
 
 
-def test_all_challenges(verbose: bool = False, auto_deploy: bool = False) -> list[TestResult]:
+def test_all_challenges(verbose: bool = False, auto_deploy: bool = False, history: str = None,
+                        force: bool = False) -> list[TestResult]:
     """Test all challenges"""
     results = []
     
@@ -344,7 +395,7 @@ def test_all_challenges(verbose: bool = False, auto_deploy: bool = False) -> lis
     
     # Create progress bar if not verbose
     if not verbose:
-        progress_bar = tqdm(
+        progress_bar = make_progress_bar(
             total=total_challenges,
             desc="Progress",
             unit="challenge",
@@ -358,7 +409,7 @@ def test_all_challenges(verbose: bool = False, auto_deploy: bool = False) -> lis
             if verbose:
                 print(f"\n[{idx}/{total_challenges}]")
             
-            result = test_challenge(challenge_id, verbose, progress_bar)
+            result = test_challenge(challenge_id, verbose, progress_bar, history, force)
             results.append(result)
             
             # Small delay for readability in verbose mode
@@ -381,6 +432,7 @@ def print_summary(results: list[TestResult], verbose: bool = False):
     
     passed = sum(1 for r in results if r.passed)
     failed = len(results) - passed
+    cached = sum(1 for r in results if r.cached_run is not None)
     
     if verbose:
         print("\nDetailed Results:")
@@ -400,7 +452,8 @@ def print_summary(results: list[TestResult], verbose: bool = False):
             print(result)
     
     print("\n" + "-"*60)
-    print(f"Total: {len(results)} | Passed: {passed} | Failed: {failed}")
+    print(f"Total: {len(results)} | Passed: {passed} | Failed: {failed}"
+          + (f" | Cached: {cached}" if cached else ""))
     
     if passed == len(results):
         print("Success Rate: 100%")
@@ -426,10 +479,79 @@ def print_summary(results: list[TestResult], verbose: bool = False):
         return 1
 
 
+def record_history(results: list[TestResult], started_at: float, path: str):
+    """Append the run to the test history; a history problem never fails the run"""
+    if all(r.cached_run is not None for r in results):
+        return
+    try:
+        run_id = test_history.record_run(results, started_at, path)
+    except Exception as e:
+        print(f"Warning: could not record the run in {path}: {e}")
+        return
+    print(f"Run #{run_id} recorded in {path} (compare: python3 tools/test-challenges.py compare)")
+
+
+def print_comparison(args) -> int:
+    """Print the last runs vs the runs before them; 1 if a regression or new flakiness was found"""
+    if not Path(args.history).exists():
+        print(f"No runs recorded in {args.history}")
+        return 0
+    # --challenge works before or after 'compare'
+    challenge = args.compare_challenge or args.challenge
+    report = test_history.compare(args.history, last=args.last, baseline=args.baseline, alpha=args.alpha,
+                                  min_change=args.min_change, challenge=challenge)
+    if not report:
+        print(f"No runs of {challenge} recorded in {args.history}" if challenge
+              else f"No runs recorded in {args.history}")
+        return 0
+    
+    print("="*60)
+    print(f"Last {args.last} run(s) vs the {args.baseline} before (p < {args.alpha:g}, "
+          f"latency at least +{args.min_change * 100:.0f}%)")
+    print("="*60)
+    flagged = 0
+    for entry in report:
+        recent, baseline = entry['recent'], entry['baseline']
+        print(f"\n{entry['challenge']}: {recent['runs'] - recent['failed']}/{recent['runs']} passed recently, "
+              f"{baseline['runs'] - baseline['failed']}/{baseline['runs']} before")
+        if entry['phases']:
+            print(f"  {'phase':<10}{'median':>9}{'p90':>9}{'before':>9}{'p90':>9}")
+        for phase, stats in entry['phases'].items():
+            cells = []
+            for window in ('recent', 'baseline'):
+                if window in stats:
+                    cells.append(f"{stats[window]['median']:>8.2f}s{stats[window]['p90']:>8.2f}s")
+                else:
+                    cells.append(f"{'-':>9}{'-':>9}")
+            print(f"  {phase:<10}{''.join(cells)}")
+        for finding in entry['findings']:
+            flagged += 1
+            print(f"  ✗ {finding['type']}: {finding['detail']} (p={finding['p']:.3f})")
+        if baseline['runs'] < 3:
+            print("  (not enough earlier runs to compare yet)")
+    
+    print("\n" + "-"*60)
+    if flagged:
+        print(f"✗ {flagged} regression(s) found")
+        return 1
+    print("✓ No significant regressions")
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Test CTF challenges to verify vulnerabilities work correctly'
     )
+    parser.add_argument(
+        '--history',
+        default=str(test_history.HISTORY_PATH),
+        help=f'SQLite file runs are recorded in (default: $CTF_TEST_HISTORY or {test_history.HISTORY_PATH})'
+    )
+    parser.add_argument(
+        '--no-history',
+        action='store_true',
+        help="Don't record this run or skip challenges unchanged since a passing one"
+    )
     parser.add_argument(
         '--challenge',
         choices=list(CHALLENGES.keys()),
@@ -440,27 +562,58 @@ def main():
         action='store_true',
         help='Show verbose output'
     )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Re-test challenges whose files and pods are unchanged since they last passed'
+    )
     parser.add_argument(
         '--deploy',
         action='store_true',
         help='Automatically deploy challenges before testing if they are not already deployed'
     )
+    commands = parser.add_subparsers(dest='command')
+    compare_parser = commands.add_parser(
+        'compare',
+        help='Compare the last runs with earlier ones: latency regressions and new flakiness per challenge'
+    )
+    compare_parser.add_argument('--last', type=int, default=5, help='Recent runs per challenge (default: 5)')
+    compare_parser.add_argument('--baseline', type=int, default=20,
+                                help='Earlier runs they are compared with (default: 20)')
+    compare_parser.add_argument('--alpha', type=float, default=0.05, help='Significance level (default: 0.05)')
+    compare_parser.add_argument('--min-change', type=float, default=0.2,
+                                help='Smallest median slowdown reported, as a fraction (default: 0.2)')
+    # Its own dest: a subparser default would overwrite a top-level --challenge
+    compare_parser.add_argument('--challenge', dest='compare_challenge', choices=list(CHALLENGES.keys()),
+                                help='Only this challenge')
     
     args = parser.parse_args()
     
+    if args.command == 'compare':
+        return print_comparison(args)
+    
+    # Without history nothing is recorded, and nothing is looked up either:
+    # no cache keys (a kubectl call per challenge) and no skipped challenges
+    history = None if args.no_history else args.history
+    started_at = time.time()
     if args.challenge:
         # Test single challenge
         print("="*60)
         print("CTF Challenge Testing Toolkit")
         print("="*60)
-        result = test_challenge(args.challenge, args.verbose, None)
+        result = test_challenge(args.challenge, args.verbose, None, history, args.force)
         if not args.verbose:
             print(f"\n{result}")
+        if history:
+            record_history([result], started_at, history)
         return 0 if result.passed else 1
     else:
         # Test all challenges
-        results = test_all_challenges(args.verbose, args.deploy)
-        return print_summary(results, args.verbose)
+        results = test_all_challenges(args.verbose, args.deploy, history, args.force)
+        exit_code = print_summary(results, args.verbose)
+        if results and history:
+            record_history(results, started_at, history)
+        return exit_code
 
 
 if __name__ == '__main__':
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+In-cluster challenge test run
+Finds every challenge Service by label (tier=challenge, in any namespace, so
+team copies are tested too) and runs the health and exploit checks from
+challenge_testers against every ready pod IP of its Endpoints at once,
+instead of one replica behind a NodePort and kube-proxy. The Service's app
+label picks the exploit check. Meant to run as the challenge-tests Job
+(monitoring/challenge-tests/); results are printed as one JSON document on
+stdout and optionally written to a ConfigMap. Outside the cluster, the API
+is reached through kubectl (pod IPs are routable from the k3s node itself)
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+import requests
+
+# Add tools directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from challenge_testers import header_leak, file_disclosure, hidden_params
+
+TEST_CONCURRENCY = int(os.getenv('TEST_CONCURRENCY', '16'))
+TEST_TIMEOUT = float(os.getenv('TEST_TIMEOUT', '5'))
+
+SERVICE_ACCOUNT_DIR = Path('/var/run/secrets/kubernetes.io/serviceaccount')
+
+# Endpoints carry their Service's labels; one list call finds them all
+CHALLENGE_SELECTOR = os.getenv('CHALLENGE_SELECTOR', 'tier=challenge')
+
+# Exploit check per challenge, by the app label of its Service. Challenges
+# without one (secret-leak) are only health checked
+CHALLENGES = {
+    'header-leak': header_leak.exploit_header_leak,
+    'file-disclosure': file_disclosure.exploit_file_disclosure,
+    'hidden-params': hidden_params.exploit_hidden_params,
+}
+
+
+class KubeAPI:
+    """Kubernetes API through the pod's service account, or kubectl outside the cluster"""
+
+    def __init__(self):
+        self.in_cluster = 'KUBERNETES_SERVICE_HOST' in os.environ and (SERVICE_ACCOUNT_DIR / 'token').exists()
+        if self.in_cluster:
+            host = os.environ['KUBERNETES_SERVICE_HOST']
+            port = os.environ.get('KUBERNETES_SERVICE_PORT', '443')
+            self.base = f"https://{host}:{port}"
+            self.session = requests.Session()
+            self.session.verify = str(SERVICE_ACCOUNT_DIR / 'ca.crt')
+            self.session.headers['Authorization'] = f"Bearer {(SERVICE_ACCOUNT_DIR / 'token').read_text().strip()}"
+
+    def get(self, path: str):
+        """Object at an API path, or None if it does not exist"""
+        if self.in_cluster:
+            response = self.session.get(self.base + path, timeout=10)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
+        result = subprocess.run(['kubectl', 'get', '--raw', path], capture_output=True, text=True, timeout=10)
+        if result.returncode != 0:
+            if 'NotFound' in result.stderr:
+                return None
+            raise RuntimeError(result.stderr.strip() or f"kubectl get --raw {path} failed")
+        return json.loads(result.stdout)
+
+    def write_configmap(self, namespace: str, name: str, data: dict):
+        """Create or replace a ConfigMap"""
+        body = {
+            'apiVersion': 'v1',
+            'kind': 'ConfigMap',
+            'metadata': {'name': name, 'namespace': namespace, 'labels': {'app': 'challenge-tests'}},
+            'data': data,
+        }
+        if not self.in_cluster:
+            subprocess.run(['kubectl', 'apply', '-f', '-'], input=json.dumps(body), capture_output=True,
+                           text=True, timeout=10, check=True)
+            return
+        path = f"{self.base}/api/v1/namespaces/{namespace}/configmaps"
+        response = self.session.put(f"{path}/{name}", json=body, timeout=10)
+        if response.status_code == 404:
+            response = self.session.post(path, json=body, timeout=10)
+        response.raise_for_status()
+
+
+def discover(api: KubeAPI, selector: str) -> dict:
+    """Challenge Services by "namespace/name": their challenge, ready pod targets and not ready count"""
+    endpoints_list = api.get(f"/api/v1/endpoints?labelSelector={quote(selector)}") or {}
+    found = {}
+    for endpoints in endpoints_list.get('items') or []:
+        metadata = endpoints['metadata']
+        challenge_id = (metadata.get('labels') or {}).get('app') or metadata['name']
+        service = f"{metadata['namespace']}/{metadata['name']}"
+        targets, not_ready = [], 0
+        for subset in endpoints.get('subsets') or []:
+            ports = subset.get('ports') or []
+            port = next((p['port'] for p in ports if p.get('name') == 'http'), ports[0]['port'] if ports else None)
+            not_ready += len(subset.get('notReadyAddresses') or [])
+            if port is None:
+                continue
+            for address in subset.get('addresses') or []:
+                targets.append({
+                    'challenge': challenge_id,
+                    'service': service,
+                    'pod': (address.get('targetRef') or {}).get('name'),
+                    'node': address.get('nodeName'),
+                    'url': f"http://{address['ip']}:{port}",
+                })
+        found[service] = {'challenge': challenge_id, 'targets': targets, 'not_ready': not_ready}
+    return found
+
+
+def test_target(target: dict, timeout: float) -> dict:
+    """Health and exploit check of one pod (health only without a check), over its own session"""
+    check = CHALLENGES.get(target['challenge'])
+    session = requests.Session()
+    report = dict(target, up=False, passed=False)
+    try:
+        start = time.perf_counter()
+        try:
+            response = session.get(f"{target['url']}/health", timeout=timeout)
+            report['up'] = response.status_code == 200
+            report['message'] = '' if report['up'] else f"health check returned {response.status_code}"
+        except requests.RequestException as e:
+            report['message'] = f"health check failed: {e}"
+        report['health_seconds'] = round(time.perf_counter() - start, 4)
+        if not report['up']:
+            return report
+        if check is None:
+            report['passed'] = True
+            report['message'] = 'up (no exploit check for this challenge)'
+            return report
+
+        start = time.perf_counter()
+        result = check(target['url'], session=session, timeout=timeout)
+        report['exploit_seconds'] = round(time.perf_counter() - start, 4)
+        # Flags stay out of the report: it ends up in logs and a ConfigMap
+        report['passed'] = result.passed
+        report['message'] = result.message
+        return report
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Test every ready pod of every challenge through its Endpoints, from inside the cluster'
+    )
+    parser.add_argument('--challenge', action='append',
+                        help='Only test the Services of these challenges (app label, repeatable)')
+    parser.add_argument('--namespace', action='append', help='Only test Services in these namespaces (repeatable)')
+    parser.add_argument('--selector', default=CHALLENGE_SELECTOR,
+                        help=f'Label selector of the challenge Services (default: {CHALLENGE_SELECTOR})')
+    parser.add_argument('--concurrency', type=int, default=TEST_CONCURRENCY, help='Pods tested at once')
+    parser.add_argument('--timeout', type=float, default=TEST_TIMEOUT, help='Per-request timeout')
+    parser.add_argument('--configmap', metavar='NAMESPACE/NAME',
+                        help='Also write the report to this ConfigMap (created or replaced)')
+    args = parser.parse_args()
+    if args.configmap and '/' not in args.configmap:
+        parser.error('--configmap must be NAMESPACE/NAME')
+
+    api = KubeAPI()
+    started = time.time()
+    try:
+        services = discover(api, args.selector)
+    except Exception as e:
+        print(f"Error: could not list endpoints ({args.selector}): {e}", file=sys.stderr)
+        return 1
+
+    summary, targets = {}, []
+    for service, found in sorted(services.items()):
+        namespace = service.split('/', 1)[0]
+        if args.challenge and found['challenge'] not in args.challenge:
+            continue
+        if args.namespace and namespace not in args.namespace:
+            continue
+        summary[service] = {'challenge': found['challenge'], 'ready_pods': len(found['targets']),
+                            'not_ready_pods': found['not_ready'], 'passed': 0, 'failed': 0}
+        if not found['targets']:
+            summary[service]['error'] = 'no ready endpoints'
+        targets.extend(found['targets'])
+    # A challenge with an exploit check but no Service at all is down, not untested
+    for challenge_id in args.challenge or ([] if args.namespace else CHALLENGES):
+        if not any(entry['challenge'] == challenge_id for entry in summary.values()):
+            summary[challenge_id] = {'challenge': challenge_id, 'ready_pods': 0, 'not_ready_pods': 0,
+                                     'passed': 0, 'failed': 0, 'error': f'no Service labeled {args.selector}'}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(args.concurrency, len(targets)))) as pool:
+        pods = list(pool.map(lambda target: test_target(target, args.timeout), targets))
+
+    for pod in pods:
+        summary[pod['service']]['passed' if pod['passed'] else 'failed'] += 1
+    passed = all(not entry.get('error') and not entry['failed'] for entry in summary.values())
+
+    report = {
+        'started_at': datetime.utcfromtimestamp(started).isoformat(),
+        'duration_seconds': round(time.time() - started, 3),
+        'passed': passed,
+        'challenges': summary,
+        'pods': pods,
+    }
+    print(json.dumps(report, indent=2))
+
+    # Human-readable summary on stderr, so stdout stays one JSON document
+    for service, entry in summary.items():
+        status = '✓' if not entry.get('error') and not entry['failed'] else '✗'
+        detail = f" ({entry['error']})" if entry.get('error') else ''
+        print(f"{status} {service}: {entry['passed']}/{entry['ready_pods']} ready pod(s) passed"
+              f"{detail}", file=sys.stderr)
+    for pod in pods:
+        if not pod['passed']:
+            print(f"  ✗ {pod['service']} {pod['pod']} ({pod['url']}): {pod['message']}", file=sys.stderr)
+
+    if args.configmap:
+        namespace, _, name = args.configmap.partition('/')
+        try:
+            api.write_configmap(namespace, name, {
+                'report.json': json.dumps(report, indent=2),
+                'passed': str(passed).lower(),
+            })
+        except Exception as e:
+            print(f"Error: could not write ConfigMap {args.configmap}: {e}", file=sys.stderr)
+            return 1
+
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
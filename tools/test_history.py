@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Test-run history for test-challenges.py
+Every run's per-challenge outcomes and per-phase timings (lookup, health,
+exploit, total) are appended to a SQLite file, and compare() contrasts each
+challenge's last few runs with the runs before them: an exact one-sided
+Mann-Whitney test on the phase timings of passing runs flags latency
+regressions, a one-sided Fisher test on the failure counts flags new
+flakiness. Only the standard library is used
+
+Results also carry a cache key (the challenge's files plus the identity of
+its running pods), so a run can skip a challenge whose key matches a
+passing result: nothing it depends on changed since
+"""
+
+import hashlib
+import math
+import os
+import socket
+import subprocess
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import sqlite3
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+DATA_HOME = Path(os.getenv('XDG_DATA_HOME') or Path.home() / '.local' / 'share')
+HISTORY_PATH = Path(os.getenv('CTF_TEST_HISTORY') or DATA_HOME / 'ctf-lab' / 'test-history.sqlite')
+
+# Phases reported by compare(), in this order; testers may record others
+PHASES = ('lookup', 'health', 'exploit', 'total')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    revision TEXT,
+    host TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    challenge TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    message TEXT,
+    cache_key TEXT
+);
+CREATE TABLE IF NOT EXISTS timings (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    challenge TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_by_challenge ON results (challenge, run_id);
+CREATE INDEX IF NOT EXISTS timings_by_challenge ON timings (challenge, phase, run_id);
+"""
+
+
+def connect(path: Path = HISTORY_PATH) -> 'sqlite3.Connection':
+    # Imported here: test-challenges.py --help doesn't need it
+    import sqlite3
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(str(path))
+    db.executescript(SCHEMA)
+    # Histories written before results had a cache key
+    if 'cache_key' not in {row[1] for row in db.execute('PRAGMA table_info(results)')}:
+        db.execute('ALTER TABLE results ADD COLUMN cache_key TEXT')
+    db.execute('CREATE INDEX IF NOT EXISTS results_by_key ON results (challenge, cache_key)')
+    return db
+
+
+def git_revision() -> Optional[str]:
+    """Short commit of the checkout the run tested (with -dirty for local changes), or None"""
+    try:
+        result = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=str(REPO_DIR),
+                                capture_output=True, text=True, timeout=5)
+    except Exception:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+def record_run(results, started_at: float, path: Path = HISTORY_PATH) -> int:
+    """Append one run (TestResults with challenge_id set) and return its id
+
+    Results taken from the cache were not re-tested and are left out.
+    """
+    db = connect(path)
+    try:
+        with db:
+            run_id = db.execute(
+                'INSERT INTO runs (started_at, duration, revision, host) VALUES (?, ?, ?, ?)',
+                (started_at, time.time() - started_at, git_revision(), socket.gethostname())).lastrowid
+            for result in results:
+                challenge = result.challenge_id or result.name
+                if result.cached_run is not None:
+                    continue
+                db.execute('INSERT INTO results (run_id, challenge, passed, message, cache_key) VALUES (?, ?, ?, ?, ?)',
+                           (run_id, challenge, int(result.passed), result.message, result.cache_key))
+                db.executemany('INSERT INTO timings (run_id, challenge, phase, seconds) VALUES (?, ?, ?, ?)',
+                               [(run_id, challenge, phase, seconds) for phase, seconds in result.timings.items()])
+        return run_id
+    finally:
+        db.close()
+
+
+def cache_key(challenge_dir: Path, pods: List[tuple]) -> str:
+    """Hash of every file of a challenge (app code, manifests, ConfigMaps) and its pods' identity
+
+    `pods` are (uid, image digests) tuples, as from utils.pod_identities():
+    a rebuilt image, a restarted or rescheduled pod, or an edited manifest
+    all give a new key.
+    """
+    digest = hashlib.sha256()
+    challenge_dir = Path(challenge_dir)
+    for path in sorted(challenge_dir.rglob('*')):
+        # Docs don't change what is deployed
+        if not path.is_file() or '__pycache__' in path.parts or path.suffix == '.md':
+            continue
+        digest.update(str(path.relative_to(challenge_dir)).encode() + b'\0')
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+    for uid, images in sorted(pods):
+        digest.update(f"{uid}\0{','.join(images)}\0".encode())
+    return digest.hexdigest()
+
+
+def cached_pass(path: Path, challenge: str, key: str) -> Optional[int]:
+    """Id of the run that last tested `challenge` with this cache key, if that result passed"""
+    if not Path(path).exists():
+        return None
+    db = connect(path)
+    try:
+        row = db.execute('SELECT run_id, passed FROM results WHERE challenge = ? AND cache_key = ? '
+                         'ORDER BY run_id DESC LIMIT 1', (challenge, key)).fetchone()
+    finally:
+        db.close()
+    return row[0] if row and row[1] else None
+
+
+def percentile(values: List[float], q: float) -> float:
+    """q-th percentile (0-100) with linear interpolation between the closest ranks"""
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def mann_whitney_greater(recent: List[float], baseline: List[float]) -> float:
+    """Exact one-sided p-value that `recent` tends to be larger than `baseline`
+
+    Permutation distribution of the rank sum of `recent` (midranks for
+    ties, doubled to stay integral), counted with a subset-sum table, so
+    it is exact for the small samples compared here.
+    """
+    combined = sorted((value, i < len(recent)) for i, value in enumerate(recent + baseline))
+    ranks = [0] * len(combined)
+    start = 0
+    while start < len(combined):
+        end = start
+        while end + 1 < len(combined) and combined[end + 1][0] == combined[start][0]:
+            end += 1
+        for i in range(start, end + 1):
+            ranks[i] = start + end + 2  # twice the midrank (ranks start at 1)
+        start = end + 1
+    observed = sum(rank for rank, (_, is_recent) in zip(ranks, combined) if is_recent)
+
+    size = len(recent)
+    # ways[k][s]: subsets of k ranks summing to s
+    ways = [dict() for _ in range(size + 1)]
+    ways[0][0] = 1
+    for rank in ranks:
+        for k in range(size, 0, -1):
+            for total, count in ways[k - 1].items():
+                ways[k][total + rank] = ways[k].get(total + rank, 0) + count
+    at_least = sum(count for total, count in ways[size].items() if total >= observed)
+    return at_least / math.comb(len(ranks), size)
+
+
+def fisher_greater(recent_failed: int, recent_runs: int, baseline_failed: int, baseline_runs: int) -> float:
+    """One-sided Fisher exact p-value that the recent runs fail more often than the baseline"""
+    failed = recent_failed + baseline_failed
+    runs = recent_runs + baseline_runs
+    total = math.comb(runs, recent_runs)
+    return sum(math.comb(failed, k) * math.comb(runs - failed, recent_runs - k)
+               for k in range(recent_failed, min(failed, recent_runs) + 1)) / total
+
+
+def compare(path: Path = HISTORY_PATH, last: int = 5, baseline: int = 20, alpha: float = 0.05,
+            min_change: float = 0.2, challenge: Optional[str] = None) -> List[Dict]:
+    """Per-challenge comparison of its last `last` runs with the `baseline` runs before them
+
+    Returns one dict per challenge that has runs (none for a `challenge`
+    never recorded) with the outcome counts, per-phase median/p90 of
+    both windows and the findings: 'latency' for a phase
+    whose recent timings are significantly (p < alpha) and at least
+    min_change slower at the median, 'flaky' / 'failing' when the recent
+    runs fail significantly more often.
+    """
+    db = connect(path)
+    try:
+        if challenge:
+            challenges = [challenge]
+        else:
+            challenges = [row[0] for row in db.execute('SELECT DISTINCT challenge FROM results ORDER BY challenge')]
+        report = []
+        for name in challenges:
+            rows = db.execute('SELECT run_id, passed FROM results WHERE challenge = ? ORDER BY run_id DESC LIMIT ?',
+                              (name, last + baseline)).fetchall()
+            recent_rows, baseline_rows = rows[:last], rows[last:]
+            entry = {
+                'challenge': name,
+                'recent': {'runs': len(recent_rows), 'failed': sum(1 for _, p in recent_rows if not p)},
+                'baseline': {'runs': len(baseline_rows), 'failed': sum(1 for _, p in baseline_rows if not p)},
+                'phases': {},
+                'findings': [],
+            }
+            # A challenge asked for by name may have no runs at all
+            if not recent_rows:
+                continue
+            report.append(entry)
+
+            if baseline_rows:
+                p = fisher_greater(entry['recent']['failed'], len(recent_rows),
+                                   entry['baseline']['failed'], len(baseline_rows))
+                if entry['recent']['failed'] and p < alpha:
+                    kind = 'failing' if entry['recent']['failed'] == len(recent_rows) else 'flaky'
+                    entry['findings'].append({
+                        'type': kind, 'p': p,
+                        'detail': f"{entry['recent']['failed']}/{len(recent_rows)} recent runs failed vs "
+                                  f"{entry['baseline']['failed']}/{len(baseline_rows)} before",
+                    })
+
+            # Latency is compared on passing runs only: a failed run stops early or times out
+            recent_ids = {run_id for run_id, passed in recent_rows if passed}
+            baseline_ids = {run_id for run_id, passed in baseline_rows if passed}
+            samples = {}
+            oldest = rows[-1][0]
+            for run_id, phase, seconds in db.execute(
+                    'SELECT run_id, phase, seconds FROM timings WHERE challenge = ? AND run_id >= ?', (name, oldest)):
+                window = 'recent' if run_id in recent_ids else 'baseline' if run_id in baseline_ids else None
+                if window:
+                    samples.setdefault(phase, {'recent': [], 'baseline': []})[window].append(seconds)
+
+            for phase in sorted(samples, key=lambda ph: (PHASES.index(ph) if ph in PHASES else len(PHASES), ph)):
+                windows = samples[phase]
+                stats = {window: {'n': len(values), 'median': percentile(values, 50), 'p90': percentile(values, 90)}
+                         for window, values in windows.items() if values}
+                entry['phases'][phase] = stats
+                if len(windows['recent']) < 3 or len(windows['baseline']) < 3:
+                    continue
+                before, after = stats['baseline']['median'], stats['recent']['median']
+                if after < before * (1 + min_change):
+                    continue
+                p = mann_whitney_greater(windows['recent'], windows['baseline'])
+                if p < alpha:
+                    change = f"+{(after / before - 1) * 100:.0f}%" if before > 0 else 'from 0'
+                    entry['findings'].append({
+                        'type': 'latency', 'phase': phase, 'p': p,
+                        'detail': f"{phase} median {after:.2f}s vs {before:.2f}s ({change})",
+                    })
+        return report
+    finally:
+        db.close()
@@ -5,10 +5,14 @@ Shared utilities for challenge testing
 
 import subprocess
 import time
-import requests
-from typing import Optional, Dict, Any
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Optional, Dict, Any
 import json
 
+if TYPE_CHECKING:
+    # Imported where used: requests (~70ms) is not needed for --help or the kubectl checks
+    import requests
+
 
 def check_kubectl() -> bool:
     """Check if kubectl is available and cluster is accessible"""
@@ -76,6 +80,33 @@ def check_namespace_exists(namespace: str) -> bool:
         return False
 
 
+def pod_identities(namespace: str) -> Optional[list]:
+    """(uid, image digests) of every pod in a namespace, or None unless all are running and ready"""
+    try:
+        result = subprocess.run(
+            ['kubectl', 'get', 'pods', '-n', namespace, '-o', 'json'],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        if result.returncode != 0:
+            return None
+        pods = json.loads(result.stdout).get('items', [])
+    except Exception:
+        return None
+    
+    identities = []
+    for pod in pods:
+        status = pod.get('status', {})
+        ready = any(c.get('type') == 'Ready' and c.get('status') == 'True' for c in status.get('conditions', []))
+        if status.get('phase') != 'Running' or not ready:
+            return None
+        # imageID is the digest the node actually runs (image is only the tag)
+        images = tuple(sorted(c.get('imageID') or c.get('image', '') for c in status.get('containerStatuses', [])))
+        identities.append((pod['metadata']['uid'], images))
+    return identities or None
+
+
 def wait_for_service(namespace: str, service_name: str, timeout: int = 60) -> Optional[str]:
     """Get the NodePort for a service"""
     # First check if namespace exists
@@ -107,6 +138,8 @@ def wait_for_service(namespace: str, service_name: str, timeout: int = 60) -> Op
 
 def check_service_health(url: str, timeout: int = 10, retries: int = 3, retry_delay: int = 2) -> tuple:
     """Check if a service is responding with retries. Returns (is_healthy, error_message)"""
+    import requests
+
     last_error = None
     
     for attempt in range(retries):
@@ -205,7 +238,7 @@ def wait_for_pod_ready_in_namespace(namespace: str, label_selector: str = None,
     return False
 
 
-def extract_flag_from_response(response: requests.Response) -> Optional[str]:
+def extract_flag_from_response(response: 'requests.Response') -> Optional[str]:
     """Extract flag from various response formats"""
     # Try JSON response
     try:
@@ -263,6 +296,12 @@ class TestResult:
         self.message = ""
         self.flag = None
         self.details: Dict[str, Any] = {}
+        # Set by test-challenges.py; seconds spent per phase (lookup, health, exploit, total)
+        self.challenge_id: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        # Cache key the result was tested under, or the run it was taken from (not re-tested)
+        self.cache_key: Optional[str] = None
+        self.cached_run: Optional[int] = None
     
     def success(self, message: str = "", flag: Optional[str] = None):
         self.passed = True
@@ -273,6 +312,15 @@ class TestResult:
         self.passed = False
         self.message = message
     
+    @contextmanager
+    def timed(self, phase: str):
+        """Add the time spent in the block to timings[phase], also when it returns early"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] = self.timings.get(phase, 0.0) + time.perf_counter() - start
+    
     def __str__(self):
         status = "✓ PASS" if self.passed else "✗ FAIL"
         result = f"{status} - {self.name}"